@@ -1,38 +1,71 @@
-from fastapi import APIRouter, Depends, HTTPException, Path, Body
+from fastapi import APIRouter, Depends, HTTPException, Path, Body, Query, Response
 from typing import List, Dict, Optional
 from datetime import datetime, timezone
 from app.models.user import User
-from app.models.channel import Channel, Section, Unit, Activity, Lesson, ChannelInfo, Tier, Coupon
+from app.models.channel import Channel, ChannelListItem, Section, Unit, Activity, Lesson, ChannelInfo, Tier, Coupon
 from beanie import PydanticObjectId
 from pydantic import BaseModel, Field
 from app.utils.user import get_user_id
-from app.models.play import PlayerProgress, progress, ProgressUpdateRequest, SubscribeChannelRequest
+from app.models.play import PlayerProgress, SubscriptionSummary, progress, ProgressUpdateRequest, SubscribeChannelRequest
 from app.models import Response_Model
+from app.services.channel_repository import load_channel
+from app.utils.outline import (
+    publish_outline_version, get_outline_version, build_progress_level, migrate_progress
+)
+from app.utils.pagination import cursor_filter, paginate, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER
+from app.utils.cache import ResponseCache, MISSING, channel_tag, creator_tag
+from app.utils.log import get_logger
 from fastapi import status
+from collections import defaultdict
+import asyncio
 
 api = APIRouter()
+logger = get_logger(__name__)
+
+# Public creator pages: channel listings keyed by (creator id, cursor, limit), subscription page by creator id
+creator_channels_cache = ResponseCache('creator_channels')
+subscription_info_cache = ResponseCache('subscription_info')
 
 
 
 @api.get("/channels/{creator_id}/")
 async def get_creator_channels(
+    response: Response,
     creator_id: str = Path(..., description="The ID of the creator"),
+    cursor: Optional[str] = Query(None, description="Return channels after this cursor (X-Next-Cursor of the previous page)"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; all channels when omitted"),
     player_id: str = Depends(get_user_id)
 
     ):
-    """Fetch channels for a specific creator."""
+    """Fetch channels for a specific creator (list fields only, without outline_content)."""
     try:
-        # Find all channels for this creator
-        channels = await Channel.find({"user_id": PydanticObjectId(creator_id), "published": True}).to_list()
-        print(channels)
+        cache_key = (creator_id, cursor, limit)
+        cached = await creator_channels_cache.get(cache_key)
+        if cached is MISSING:
+            # Find all channels for this creator
+            query = Channel.find(
+                cursor_filter({"user_id": PydanticObjectId(creator_id), "published": True}, cursor)
+            ).project(ChannelListItem)
+            channels = await paginate(query, response, limit)
+            cached = await creator_channels_cache.set(
+                cache_key,
+                {"channels": channels, "next_cursor": response.headers.get(NEXT_CURSOR_HEADER)},
+                tags=[creator_tag(creator_id), *(channel_tag(channel.channel_id) for channel in channels)]
+            )
+        elif cached["next_cursor"]:
+            response.headers[NEXT_CURSOR_HEADER] = cached["next_cursor"]
+
         return Response_Model(
             success=True,
-            data=channels,
+            data=cached["channels"],
             message={"en": "Channels fetched successfully."},
             error="OK"
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
+        logger.exception("failed to fetch creator channels", extra={"creator_id": creator_id})
         return Response_Model(
             success=False,
             data=None,
@@ -49,9 +82,17 @@ async def get_channel_subscription_info(
     """
     For the creator returns all the channels' [channel info + sub tier + coupons].
     Position in subscription page.
+    Channel info, tiers and coupons are fetched with one $in query each and grouped in memory;
+    the result is cached per creator until a tier, coupon or channel of the creator changes.
     """
+    cached = await subscription_info_cache.get(creator_id)
+    if cached is not MISSING:
+        return cached
+
     # Find all channels for this creator
-    channels = await Channel.find({"user_id": PydanticObjectId(creator_id), "published": True}).to_list()
+    channels = await Channel.find(
+        {"user_id": PydanticObjectId(creator_id), "published": True}
+    ).project(ChannelListItem).to_list()
     if not channels:
         return Response_Model(
             success=True,
@@ -59,14 +100,25 @@ async def get_channel_subscription_info(
             message={"en": "No published channels found for this creator."},
             error="OK"
         )
+
+    # ChannelInfo/Tier/Coupon are keyed by channel.channel_id (the ChannelInfo id), not the Channel _id
+    channel_ids = [channel.channel_id for channel in channels]
+    channel_infos, tiers, coupons = await asyncio.gather(
+        ChannelInfo.find({"_id": {"$in": [PydanticObjectId(cid) for cid in channel_ids]}}).to_list(),
+        Tier.find({"channel_id": {"$in": channel_ids}}).to_list(),
+        Coupon.find({"channel_id": {"$in": channel_ids}}).to_list(),
+    )
+    info_by_channel = {str(info.id): info for info in channel_infos}
+    tiers_by_channel = defaultdict(list)
+    for tier in tiers:
+        tiers_by_channel[tier.channel_id].append(tier)
+    coupons_by_channel = defaultdict(list)
+    for coupon in coupons:
+        coupons_by_channel[coupon.channel_id].append(coupon)
+
     result = []
     for channel in channels:
-        channel_id = str(channel.id)
-        # Fetch related info for each channel
-        channel_info = await ChannelInfo.find_one({"channel_id": channel_id})
-        tiers = await Tier.find({"channel_id": channel_id}).to_list()
-        coupons = await Coupon.find({"channel_id": channel_id}).to_list()
-
+        channel_id = channel.channel_id
         result.append({
             "channel": {
                 "id": channel_id,
@@ -74,17 +126,22 @@ async def get_channel_subscription_info(
                 "description": channel.description,
                 "creator_id": creator_id
             },
-            "channel_info": channel_info,
-            "tiers": tiers,
-            "coupons": coupons,
+            "channel_info": info_by_channel.get(channel_id),
+            "tiers": tiers_by_channel[channel_id],
+            "coupons": coupons_by_channel[channel_id],
         })
 
-    return Response_Model(
+    response = Response_Model(
         success=True,
         data=result,
         message={"en": "Channels and subscription info fetched successfully."},
         error="OK"
     )
+    return await subscription_info_cache.set(
+        creator_id,
+        response,
+        tags=[creator_tag(creator_id), *(channel_tag(channel_id) for channel_id in channel_ids)]
+    )
 
 
 @api.get("/subscriptions/")
@@ -102,12 +159,15 @@ async def get_user_subscribed_channels(
     - List of all subscribed channels with subscription details
     """
     try:
-        # Find all PlayerProgress records for this user (subscriptions)
-        user_subscriptions = await PlayerProgress.find(
-            {"player_id": player_id}
-        ).to_list()
+        # Lean, index-covered subscription rows keyed by channel for an O(1) join
+        subscriptions = {
+            sub.channel_id: sub
+            for sub in await PlayerProgress.find(
+                {"player_id": player_id}
+            ).project(SubscriptionSummary).to_list()
+        }
         
-        if not user_subscriptions:
+        if not subscriptions:
             return Response_Model(
                 success=True,
                 data=[],
@@ -115,23 +175,16 @@ async def get_user_subscribed_channels(
                 error="OK"
             )
         
-        # Extract channel_ids from subscriptions
-        subscribed_channel_ids = [progress.channel_id for progress in user_subscriptions]
-        
         # Find all channels that user has subscribed to
         subscribed_channels = await Channel.find({
-            "channel_id": {"$in": subscribed_channel_ids},
+            "channel_id": {"$in": list(subscriptions)},
             "published": True
-        }).to_list()
+        }).project(ChannelListItem).to_list()
         
         # Enhance channel data with subscription details
         result = []
         for channel in subscribed_channels:
-            # Find the corresponding subscription for this channel
-            subscription = next(
-                (sub for sub in user_subscriptions if sub.channel_id == channel.channel_id),
-                None
-            )
+            subscription = subscriptions.get(channel.channel_id)
             
             channel_data = {
                 "channel_id": channel.channel_id,
@@ -159,6 +212,7 @@ async def get_user_subscribed_channels(
         )
         
     except Exception as e:
+        logger.exception("failed to fetch subscribed channels", extra={"player_id": player_id})
         return Response_Model(
             success=False,
             data=None,
@@ -178,6 +232,7 @@ async def subscribe_to_channel(
     - Create PlayerProgress record for this player/channel pair (subscription + progress tracking)
     - Instantiate PlayerProgress for this channel/user
     - Fill progress with ids, count, is_free, completed (no content, just status)
+    - Reference the channel's current OutlineVersion instead of snapshotting the outline
     """
     
 
@@ -194,7 +249,7 @@ async def subscribe_to_channel(
         )
     
     # Check if channel exists
-    channel = await Channel.find_one({"channel_id": channel_id})
+    channel = await load_channel(channel_id)
     if not channel:
         return Response_Model(
             success=False,
@@ -202,6 +257,14 @@ async def subscribe_to_channel(
             message={"en": "Channel not found!"},
             error="NOT_FOUND"
         )
+    # Drafts are never versioned nor shown to learners
+    if not channel.published:
+        return Response_Model(
+            success=False,
+            data=None,
+            message={"en": "Channel is not published"},
+            error="NOT_FOUND"
+        )
     
     # Check if already subscribed
     existing_subscription = await PlayerProgress.find_one({
@@ -215,43 +278,18 @@ async def subscribe_to_channel(
         await existing_subscription.save()
         subscription = existing_subscription
     else:
-        # Build progress_level from channel.outline_content (matching the expected structure)
-        outline = channel.outline_content.get("sections", [])
-        
-        # Create progress_level structure that matches the expected format
-        progress_sections = []
-        for section in outline:
-            progress_units = []
-            for unit in section.get("units", []):
-                progress_activities = []
-                for activity in unit.get("activities", []):
-                    progress_content = []
-                    for content in activity.get("content", []):
-                        progress_content.append({
-                            "id": content["id"],
-                            "name": content.get("name", ""),
-                            "completed": False,
-                            "type": content.get("type", "lesson")
-                        })
-                    progress_activities.append({
-                        "id": activity["id"],
-                        "name": activity.get("name", ""),
-                        "completed": False,
-                        "content": progress_content
-                    })
-                progress_units.append({
-                    "id": unit["id"], 
-                    "name": unit.get("name", ""),
-                    "completed": False,
-                    "activities": progress_activities
-                })
-            progress_sections.append({
-                "id": section["id"],
-                "name": section.get("name", ""),
-                "completed": False, 
-                "units": progress_units
+        # Reference the channel's immutable outline version instead of copying the outline per learner
+        # (the one migrate_progress moves learners to); the rebuild versions every outline of a
+        # published channel, so only older channels lack one
+        outline = None
+        if channel.outline_version:
+            outline = await get_outline_version(channel.channel_id, channel.outline_version)
+        if outline is None:
+            outline = await publish_outline_version(channel)
+            await channel.set({
+                "outline_version": channel.outline_version,
+                "outline_hash": channel.outline_hash
             })
-        
 
         # Create new PlayerProgress (this serves as both subscription and progress tracking)
         subscription = PlayerProgress(
@@ -259,8 +297,8 @@ async def subscribe_to_channel(
             channel_id=str(channel_id),       # Convert ObjectId to string  
             full_access=payload.full_access,
             hearts_earned=0,
-            content=channel.outline_content,
-            progress_level={"sections": progress_sections},  # Proper dict structure
+            outline_version=outline.version,
+            progress_level=build_progress_level(outline.outline_content),
             created_at=datetime.now(timezone.utc),
             updated_at=datetime.now(timezone.utc)
         )
@@ -287,8 +325,10 @@ async def get_user_content_progress(
     channel_id: str, 
     player_id: str = Depends(get_user_id)
 ):
-    """Fetch the PlayerProgress document for the user and channel."""
-    print(channel_id, player_id)
+    """
+    Fetch the PlayerProgress document for the user and channel.
+    Progress built against an older outline version is migrated to the latest one first.
+    """
     user_progress = await PlayerProgress.find_one({
         "player_id": str(player_id),
         "channel_id": str(channel_id)
@@ -300,6 +340,13 @@ async def get_user_content_progress(
             message={"en": "User progress not found"},
             error="NOT_FOUND"
         )
+
+    channel = await load_channel(str(channel_id))
+    if channel:
+        outline = await migrate_progress(user_progress, channel)
+        if outline:
+            # Served from the shared version; never persisted per learner
+            user_progress.content = outline.outline_content
     return Response_Model(
         success=True,
         data=user_progress,
@@ -314,7 +361,11 @@ async def update_user_progress(
     payload: ProgressUpdateRequest,
     player_id: str = Depends(get_user_id)
 ):
-    """Update specific fields of a PlayerProgress for a given channel."""
+    """
+    Update specific fields of a PlayerProgress for a given channel.
+    The submitted progress_level is merged by id onto the channel's current outline version, so a
+    client still holding an older tree cannot store an outdated shape.
+    """
     user_progress = await PlayerProgress.find_one({
         "player_id": str(player_id),
         "channel_id": str(channel_id)
@@ -326,7 +377,12 @@ async def update_user_progress(
             message={"en": "User progress not found"},
             error="NOT_FOUND"
         )
-    user_progress.progress_level = payload.progress_level
+    channel = await load_channel(str(channel_id))
+    outline = await migrate_progress(user_progress, channel) if channel else None
+    if outline:
+        user_progress.progress_level = build_progress_level(outline.outline_content, payload.progress_level)
+    else:
+        user_progress.progress_level = payload.progress_level
     user_progress.updated_at = datetime.now(timezone.utc)
     user_progress.hearts_earned = payload.hearts_earned
     await user_progress.save()
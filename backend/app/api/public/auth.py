@@ -26,11 +26,11 @@ from app.models.user import (
 )
 from app.messages import handle_exception
 from app.messages.user import User_Error, User_Message
-from app.utils.user import get_user_id
+from app.utils.user import get_user_id, revoke_user_sessions
 from app.utils.security import (
-    get_password_hash, verify_password, create_tokens,
+    get_password_hash_async, verify_password_async, create_tokens,
     verify_token, handle_failed_login, reset_failed_login,
-    is_account_locked, create_access_token
+    is_account_locked, create_access_token, hash_token, verify_token_hash
 )
 from app.utils.email import send_verification_email, send_welcome_email
 from app.settings import (
@@ -89,9 +89,9 @@ async def sign_up(
             last_name=payload.last_name,
             role=payload.role,
             provider=AuthProvider.LOCAL,
-            hashed_password=get_password_hash(payload.password),
+            hashed_password=await get_password_hash_async(payload.password),
             is_email_verified=False,
-            verification_code=verification_code,
+            verification_code=hash_token(verification_code),
             verification_code_created_at=datetime.utcnow(),
             verification_code_expires_at=code_expires,
             created_at=datetime.utcnow()
@@ -191,7 +191,7 @@ async def verify_email(
                 detail="Verification code has expired. Please request a new one."
             )
 
-        if user.verification_code != payload.verification_code:
+        if not verify_token_hash(payload.verification_code, user.verification_code):
             print("Invalid verification code")
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -211,7 +211,7 @@ async def verify_email(
         # Update user with tokens
         user.access_token = access_token
         user.access_token_expires_at = access_expires
-        user.refresh_token = refresh_token
+        user.refresh_token = hash_token(refresh_token)
         user.refresh_token_expires_at = refresh_expires
         user.last_login = datetime.utcnow()
         
@@ -282,7 +282,7 @@ async def resend_verification(
         verification_code = generate_verification_code()
         code_expires = datetime.utcnow() + timedelta(hours=24)
 
-        user.verification_code = verification_code
+        user.verification_code = hash_token(verification_code)
         user.verification_code_created_at = datetime.utcnow()
         user.verification_code_expires_at = code_expires
         await user.save()
@@ -339,7 +339,7 @@ async def sign_in(
             )
             
         # Verify password
-        if not verify_password(payload.password, user.hashed_password):
+        if not await verify_password_async(payload.password, user.hashed_password):
             raise HTTPException(
                 status_code=401,
                 detail=FailResponse(
@@ -374,7 +374,7 @@ async def sign_in(
         # Update user with new tokens
         user.access_token = access_token
         user.access_token_expires_at = access_expires
-        user.refresh_token = refresh_token
+        user.refresh_token = hash_token(refresh_token)
         user.refresh_token_expires_at = refresh_expires
         user.last_login = datetime.utcnow()
         await user.save()
@@ -495,7 +495,7 @@ async def verify_google_login(
         print("Updating user with new tokens...")
         user.access_token = access_token
         user.access_token_expires_at = access_expires
-        user.refresh_token = refresh_token
+        user.refresh_token = hash_token(refresh_token)
         user.refresh_token_expires_at = refresh_expires
         user.last_login = datetime.utcnow()
         await user.save()
@@ -785,19 +785,8 @@ async def refresh_token(
     """
     try:
         print("\n=== Refresh Token Debug ===")
-        print(f"Received refresh token: {payload.refresh_token[:20]}...")
-
-        # Get user by refresh token
-        user = await User.find_one({"refresh_token": payload.refresh_token})
-        if not user:
-            print("No user found with this refresh token")
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid refresh token"
-            )
-
-        print(f"Found user: {user.id}")
 
+        # Signature first: a stored hash sent back as the token is not a valid JWT
         try:
             token_data = verify_token(payload.refresh_token, "refresh")
             print("Refresh token verified successfully")
@@ -808,6 +797,17 @@ async def refresh_token(
                 detail="Invalid refresh token"
             )
 
+        # Refresh tokens are stored hashed (scripts/hash_refresh_tokens.py hashes older plain ones)
+        user = await User.find_one({"refresh_token": hash_token(payload.refresh_token)})
+        if not user:
+            print("No user found with this refresh token")
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid refresh token"
+            )
+
+        print(f"Found user: {user.id}")
+
         # Generate new access token
         access_token, access_expires = create_access_token({"sub": str(user.id)})
         print(f"Generated new access token, expires at: {access_expires}")
@@ -822,7 +822,7 @@ async def refresh_token(
         token_data = Token(
             access_token=access_token,
             access_token_expires_at=access_expires,
-            refresh_token=user.refresh_token,  # Keep existing refresh token
+            refresh_token=payload.refresh_token,  # Keep existing refresh token
             refresh_token_expires_at=user.refresh_token_expires_at,
             token_type="bearer"
         )
@@ -880,6 +880,7 @@ async def logout(
         user.refresh_token = None
         user.refresh_token_expires_at = None
         await user.save()
+        await revoke_user_sessions(user)
         print("All tokens invalidated")
 
         print("=== End Logout Debug ===\n")
@@ -939,9 +940,8 @@ async def send_password_reset_code(
         code_expires = datetime.utcnow() + timedelta(hours=1)  # minutes=2
         await send_verification_email(user.email, reset_code)
         
-        print(f"Reset code: {reset_code}")
         # Store reset code
-        user.verification_code = reset_code
+        user.verification_code = hash_token(reset_code)
         user.verification_code_created_at = datetime.utcnow()
         user.verification_code_expires_at = code_expires
         await user.save()
@@ -1023,7 +1023,7 @@ async def update_password(
                 detail="Reset code has expired. Please request a new one."
             )
 
-        if user.verification_code != payload.verification_code:
+        if not verify_token_hash(payload.verification_code, user.verification_code):
             print("Invalid reset code")
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -1031,17 +1031,18 @@ async def update_password(
             )
 
         # Update password and clear verification code
-        user.hashed_password = get_password_hash(payload.password)
+        user.hashed_password = await get_password_hash_async(payload.password)
         user.verification_code = None
         user.verification_code_expires_at = None
         user.verification_code_created_at = None
         await user.save()
+        await revoke_user_sessions(user)
         print("Password updated and verification code cleared")
         access_token, access_expires, refresh_token, refresh_expires = create_tokens(str(user.id))
         
         user.access_token = access_token
         user.access_token_expires_at = access_expires
-        user.refresh_token = refresh_token
+        user.refresh_token = hash_token(refresh_token)
         user.refresh_token_expires_at = refresh_expires
         user.last_login = datetime.utcnow()
         await user.save()
@@ -0,0 +1,186 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Type
+
+from beanie import Document
+from bson import ObjectId
+
+from app.models.channel import (
+    Channel, ChannelInfo, PublishChannel, OutlineVersion, OutlineNode,
+    FreeAccess, Tier, Coupon
+)
+from app.models.job import Job
+from app.models.play import PlayerProgress
+from app.api.studio.channel.clone import Progress
+from app.services.channel_repository import forget_channel
+from app.settings import BULK_WRITE_BATCH_SIZE, MONGO_TRANSACTIONS, CHANNEL_SWEEP_DELAY
+from app.utils.jobs import job_handler, JobContext, submit_job
+from app.utils.outline import CONTENT_TREE
+from app.utils.log import get_logger
+
+
+logger = get_logger(__name__)
+
+# Records keyed by channel_id, deleted after the content and before the ChannelInfo itself
+CHANNEL_RECORDS: List[Type[Document]] = [
+    FreeAccess, Tier, Coupon, PublishChannel, OutlineVersion, OutlineNode, PlayerProgress, Channel
+]
+
+CASCADE_STEPS = len(CONTENT_TREE) + len(CHANNEL_RECORDS) + 1
+
+
+def chunks(values: List[Any], size: int = BULK_WRITE_BATCH_SIZE):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+async def collect_outline_ids(channel_id: str, session=None) -> Dict[Type[Document], List[str]]:
+    """Ids of every outline node of the channel, walking CONTENT_TREE parents first (one query per level)."""
+    ids: Dict[Type[Document], List[str]] = {}
+    for model, parent_field, parent in CONTENT_TREE:
+        if model.__name__.endswith("Outline"):
+            parent_ids = ids[parent] if parent else [channel_id]
+            found = await model.get_motor_collection().distinct(
+                "_id", {parent_field: {"$in": parent_ids}}, session=session
+            )
+            ids[model] = [str(_id) for _id in found]
+    return ids
+
+
+async def _delete_channel(channel_id: str, progress: Optional[Progress] = None, session=None) -> Dict[str, int]:
+    ids = await collect_outline_ids(channel_id, session)
+    counts: Dict[str, int] = {}
+    step = 0
+
+    async def advance():
+        nonlocal step
+        step += 1
+        if progress:
+            await progress(step, CASCADE_STEPS)
+
+    # Children before parents: an interrupted run leaves every remaining node reachable,
+    # so deleting the channel again picks up where it stopped.
+    for model, parent_field, parent in reversed(CONTENT_TREE):
+        parent_ids = ids[parent] if parent else [channel_id]
+        deleted = 0
+        for chunk in chunks(parent_ids):
+            result = await model.get_motor_collection().delete_many({parent_field: {"$in": chunk}}, session=session)
+            deleted += result.deleted_count
+        counts[model.get_motor_collection().name] = deleted
+        await advance()
+
+    for model in CHANNEL_RECORDS:
+        result = await model.get_motor_collection().delete_many({"channel_id": channel_id}, session=session)
+        counts[model.get_motor_collection().name] = result.deleted_count
+        await advance()
+
+    await ChannelInfo.get_motor_collection().delete_one({"_id": ObjectId(channel_id)}, session=session)
+    await advance()
+    return counts
+
+
+async def delete_channel_cascade(channel_id: str, progress: Optional[Progress] = None) -> Dict[str, int]:
+    """
+    Delete a channel with all of its outline, content, settings, publish records, outline versions
+    and learner progress, using one delete_many per collection and level.
+    With MONGO_TRANSACTIONS everything is deleted atomically; otherwise the deletion is ordered
+    so that it can simply be run again after a failure. Returns deleted counts per collection.
+    """
+    if not MONGO_TRANSACTIONS:
+        counts = await _delete_channel(channel_id, progress)
+    else:
+        client = ChannelInfo.get_motor_collection().database.client
+        async with await client.start_session() as session:
+            async def run(session):
+                # with_transaction may retry the whole callback on transient errors
+                return await _delete_channel(channel_id, progress, session)
+            counts = await session.with_transaction(run)
+
+    forget_channel(channel_id)
+    logger.info("channel deleted", extra={"channel_id": channel_id, **counts})
+    return counts
+
+
+async def sweep_deleted_channel(channel_id: str) -> Dict[str, int]:
+    """
+    Delete what writes racing with a channel delete left under the deleted channel's ids (a section
+    added while the cascade ran...). Only that channel's tree is walked; nothing is done if the
+    ChannelInfo exists (the delete failed and will be retried).
+    """
+    if await ChannelInfo.get_motor_collection().find_one({"_id": ObjectId(channel_id)}, {"_id": 1}):
+        return {}
+    counts = await _delete_channel(channel_id)
+    if any(counts.values()):
+        logger.info("deleted channel swept", extra={"channel_id": channel_id, **counts})
+    return counts
+
+
+@job_handler('sweep_deleted_channel')
+async def run_sweep_deleted_channel_job(ctx: JobContext):
+    return await sweep_deleted_channel(ctx.params["channel_id"])
+
+
+async def schedule_channel_sweep(channel_id: str, user_id: str) -> Job:
+    """
+    Queue a sweep of a just-deleted channel, started CHANNEL_SWEEP_DELAY later so that the writes
+    in flight during the delete have landed. Writes later than that are left to sweep_orphans.
+    """
+    return await submit_job('sweep_deleted_channel', user_id, {"channel_id": channel_id}, delay=CHANNEL_SWEEP_DELAY)
+
+
+async def referenced_parents(collection, parent_field: str, match: Dict[str, Any]):
+    """Distinct parent values of a collection, streamed (distinct() fails past 16 MB of values)."""
+    async for row in collection.aggregate([
+        {"$match": match},
+        {"$group": {"_id": f"${parent_field}"}},
+    ], allowDiskUse=True):
+        if row["_id"] is not None:
+            yield row["_id"]
+
+
+async def sweep_orphans(grace: timedelta = timedelta(hours=1)) -> Dict[str, int]:
+    """
+    Delete content whose parent no longer exists (left behind by older deletes or failed writes),
+    across the whole database: run by hand (scripts/sweep_orphans.py), never from the request path.
+    CONTENT_TREE is walked parents first, so nodes orphaned by this sweep are removed in the same run.
+    Documents created within `grace` are left alone, since clones and imports may write children
+    before their parents. Parent values that are not ObjectIds are reported, never deleted.
+    """
+    counts: Dict[str, int] = {}
+    skipped = 0
+    # ObjectIds embed their creation time
+    older = {"_id": {"$lt": ObjectId.from_datetime(datetime.utcnow() - grace)}}
+    parents = [(model, field, parent or ChannelInfo) for model, field, parent in CONTENT_TREE]
+    parents += [(model, "channel_id", ChannelInfo) for model in CHANNEL_RECORDS]
+    for model, parent_field, parent in parents:
+        collection = model.get_motor_collection()
+        batch: List[Any] = []
+        deleted = 0
+
+        async def sweep_batch(values: List[Any]) -> int:
+            nonlocal skipped
+            valid = [value for value in values if isinstance(value, (str, ObjectId)) and ObjectId.is_valid(value)]
+            skipped += len(values) - len(valid)
+            found = await parent.get_motor_collection().distinct(
+                "_id", {"_id": {"$in": [ObjectId(value) for value in valid]}}
+            )
+            existing = {str(_id) for _id in found}
+            orphaned = [value for value in valid if str(value) not in existing]
+            if not orphaned:
+                return 0
+            result = await collection.delete_many({parent_field: {"$in": orphaned}, **older})
+            return result.deleted_count
+
+        async for value in referenced_parents(collection, parent_field, older):
+            batch.append(value)
+            if len(batch) >= BULK_WRITE_BATCH_SIZE:
+                deleted += await sweep_batch(batch)
+                batch = []
+        if batch:
+            deleted += await sweep_batch(batch)
+        counts[collection.name] = deleted
+
+    if skipped:
+        logger.warning("orphan sweep skipped parent values that are not ObjectIds", extra={"values": skipped})
+    if any(counts.values()):
+        logger.info("orphans swept", extra=counts)
+    return counts
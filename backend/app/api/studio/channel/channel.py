@@ -1,12 +1,19 @@
-from fastapi import APIRouter, Response, Depends, Path, Body, HTTPException
-from typing import List, Union
+from fastapi import APIRouter, Request, Response, Depends, Path, Body, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, List, Optional, Union
 from app.utils.user import get_user_id
 from app.models.channel import (
-    ChannelInfo, Channel, PublishChannel
+    ChannelInfo, Channel, ChannelListItem, PublishChannel
 )
 from beanie import PydanticObjectId
 import asyncio
-from app.api.studio.channel.middlewares import get_channel_content_outline_stats
+import json
+from app.api.studio.channel.middlewares import wait_for_outline
+from app.services.channel_repository import load_owned_channel
+from app.utils.pagination import cursor_filter, paginate, MAX_PAGE_SIZE
+from app.utils.jobs import job_handler, JobContext, submit_job, get_user_job, stream_job
+from app.models.job import JobResponse
+from app.api.studio.channel.templates import template_registry
 
 
 
@@ -19,15 +26,22 @@ api = APIRouter()
 
 
 @api.get('/all_my_channels/')
-async def get_all_channels_basic_info(uid: str = Depends(get_user_id)):
+async def get_all_channels_basic_info(
+    response: Response,
+    cursor: Optional[str] = Query(None, description="Return channels after this cursor (X-Next-Cursor of the previous page)"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; all channels when omitted"),
+    uid: str = Depends(get_user_id)
+):
     """
     Return all channels for the user, excluding outline_content.
+    Only list fields are projected, so the outline is never loaded from MongoDB.
     """
     try:
         
-        channels = await Channel.find(
-            {"user_id": PydanticObjectId(uid)}
-        ).to_list()
+        query = Channel.find(
+            cursor_filter({"user_id": PydanticObjectId(uid)}, cursor)
+        ).project(ChannelListItem)
+        channels = await paginate(query, response, limit)
         
         # Build response for each channel using Channel model fields directly
         result = []
@@ -51,25 +65,33 @@ async def get_all_channels_basic_info(uid: str = Depends(get_user_id)):
                 "target_language": channel.target_language,
                 "avatar_file_id": channel.avatar_file_id,
                 "cover_image_file_id": channel.cover_image_file_id,
-                # "outline_content": channel.outline_content if channel else None,
             })
         
         return result
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @api.get('/{channel_id}/') # response_model=ChannelContentResponse
 async def get_channel_by_id(
     channel_id: str = Path(..., description="The ID of the channel"),
+    stale_ok: bool = Query(False, description="Return the stored outline even while a rebuild is pending"),
     uid: str = Depends(get_user_id),
 ):
     """
     Get channel's outline_content by channel ID.
+    The stored outline is returned as is when it is current (outline_revision == content_revision);
+    otherwise the pending rebuild is awaited first, unless stale_ok is set.
     """
 
     try:
-        channel = await get_channel_content_outline_stats(channel_id, uid)
+        channel = await load_owned_channel(channel_id, uid)
+        if not channel:
+            raise HTTPException(status_code=404, detail="Channel not found")
+        if not stale_ok:
+            channel = await wait_for_outline(channel)
 
         return {
                 "id": str(channel.id),
@@ -90,9 +112,13 @@ async def get_channel_by_id(
                 "target_language": channel.target_language,
                 "avatar_file_id": channel.avatar_file_id,
                 "cover_image_file_id": channel.cover_image_file_id,
+                "content_revision": channel.content_revision,
+                "outline_revision": channel.outline_revision,
                 "outline_content": channel.outline_content if channel else None
             }
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -123,7 +149,7 @@ async def generate_questions(
         from app.api.studio.channel.prompt_preparation import generate_questions_with_template
         
         # Generate questions using the template-based function
-        generated_questions = generate_questions_with_template(
+        generated_questions = await generate_questions_with_template(
             concept_prompt=initial_prompt,
             template_id=template_id,
             num_questions=num_questions,
@@ -142,10 +168,95 @@ async def generate_questions(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@job_handler('generate_questions')
+async def run_generate_questions_job(ctx: JobContext):
+    """Stream validated question batches into the job as they complete."""
+    from app.api.studio.channel.prompt_preparation import iter_question_batches
+
+    params = ctx.params
+    await ctx.set_progress(0, params["num_questions"])
+    async for batch in iter_question_batches(
+        concept_prompt=params["initial_prompt"],
+        template_id=params["template_id"],
+        num_questions=params["num_questions"],
+        difficulty=params["difficulty"]
+    ):
+        await ctx.emit(*batch)
+        await ctx.set_progress(len(ctx.job.items))
+    return {"num_questions": len(ctx.job.items)}
+
+@api.post('/generate-questions/jobs/', status_code=202, response_model=JobResponse)
+async def submit_generate_questions_job(
+    initial_prompt: str = Body(..., description="The concept/topic for question generation"),
+    template_id: int = Body(..., description="Template ID to use for question generation"),
+    difficulty: str = Body(default="intermediate", description="Difficulty level (easy, intermediate, hard)"),
+    num_questions: int = Body(default=1, ge=1, le=100, description="Number of questions to generate"),
+    user_id: str = Depends(get_user_id)
+):
+    """
+    Queue question generation as a background job and return it immediately.
+    Follow it with GET /jobs/{job_id}/stream/ (SSE or NDJSON) or poll GET /jobs/{job_id}/.
+    """
+    try:
+        template_registry.get(template_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    job = await submit_job('generate_questions', user_id, {
+        "initial_prompt": initial_prompt,
+        "template_id": template_id,
+        "difficulty": difficulty,
+        "num_questions": num_questions
+    })
+    return JobResponse(**job.model_dump())
+
+@api.get('/jobs/{job_id}/', response_model=JobResponse)
+async def get_job(
+    job_id: str = Path(..., description="The ID of the job"),
+    user_id: str = Depends(get_user_id)
+):
+    """Job status, progress and the results produced so far."""
+    job = await get_user_job(job_id, user_id)
+    return JobResponse(**job.model_dump())
+
+@api.get('/jobs/{job_id}/stream/')
+async def stream_job_results(
+    job_id: str = Path(..., description="The ID of the job"),
+    format: str = Query('sse', pattern='^(sse|ndjson)$', description="sse (text/event-stream) or ndjson"),
+    user_id: str = Depends(get_user_id)
+):
+    """
+    Stream a job: one `item` event per result as it is produced (already produced ones first),
+    then a final `done` event with the job status.
+    """
+    job = await get_user_job(job_id, user_id)
+    return stream_job(job, format)
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+async def relay_revision(request: Request, tokens: AsyncIterator[str]):
+    """Forward revision tokens as SSE; stop (and abort the completion) once the client is gone."""
+    revised = []
+    try:
+        async for token in tokens:
+            if await request.is_disconnected():
+                break
+            revised.append(token)
+            yield sse_event("token", {"text": token})
+        else:
+            yield sse_event("done", {"revised_text": "".join(revised).strip().strip('"').strip("'")})
+    except Exception as e:
+        yield sse_event("error", {"detail": str(e)})
+    finally:
+        await tokens.aclose()
+
 @api.post('/generate_prompt/')
 async def revise_text(
+    request: Request,
     text: str = Body(..., description="The text to be revised"),
-    module_type: str = Body(..., description="Module type: lesson, activity, unit, or section")
+    module_type: str = Body(..., description="Module type: lesson, activity, unit, or section"),
+    stream: bool = Query(False, description="Relay tokens as Server-Sent Events while they are generated")
 ):
     """
     Revise text grammatically and contextually based on its intended use.
@@ -153,12 +264,14 @@ async def revise_text(
     Args:
         text: The original text to be revised
         module_type: Where the text will be used (lesson, activity, unit, section)
+        stream: When true, respond with text/event-stream: `token` events ({"text": delta}),
+            then `done` ({"revised_text": ...}) or `error` ({"detail": ...})
     
     Returns:
         Dict containing the original text and revised text
     """
     try:
-        from app.api.studio.channel.prompt_preparation import generate_text_prompt
+        from app.api.studio.channel.prompt_preparation import generate_text_prompt, stream_text_prompt
         
         # Validate module_type
         valid_modules = ["lesson", "activity", "unit", "section"]
@@ -167,9 +280,16 @@ async def revise_text(
                 status_code=400, 
                 detail=f"Invalid module_type. Must be one of: {valid_modules}"
             )
+
+        if stream:
+            return StreamingResponse(
+                relay_revision(request, stream_text_prompt(text, module_type)),
+                media_type='text/event-stream',
+                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+            )
         
         # Revise the text contextually
-        revised_text = generate_text_prompt(
+        revised_text = await generate_text_prompt(
             text=text,
             context_type=module_type
         )
@@ -181,5 +301,7 @@ async def revise_text(
             "revised_text": revised_text
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,188 @@
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Type
+
+from beanie import Document, PydanticObjectId
+from bson import ObjectId
+
+from app.models.channel import (
+    Channel, ChannelInfo, PublishChannel, ActivityOutline,
+    FreeAccess, Tier, Coupon
+)
+from app.api.studio.channel.middlewares import get_channel_content_outline_stats
+from app.settings import BULK_WRITE_BATCH_SIZE
+from app.utils.outline import CONTENT_TREE
+from app.utils.log import get_logger
+
+
+logger = get_logger(__name__)
+
+Progress = Callable[[int, int], Awaitable[None]]
+
+# Outline steps + channel settings + the final rebuild
+CLONE_STEPS = len(CONTENT_TREE) + 2
+
+
+async def insert_batches(model: Type[Document], docs: List[Dict[str, Any]], batch_size: int = BULK_WRITE_BATCH_SIZE) -> int:
+    """insert_many raw documents in ordered batches; returns the number inserted."""
+    collection = model.get_motor_collection()
+    for start in range(0, len(docs), batch_size):
+        await collection.insert_many(docs[start:start + batch_size], ordered=True)
+    return len(docs)
+
+
+async def clone_collection(
+    model: Type[Document],
+    parent_field: str,
+    parent_ids: Dict[str, str],
+    id_map: Dict[str, str],
+    batch_size: int = BULK_WRITE_BATCH_SIZE
+) -> int:
+    """
+    Copy every document of `model` whose parent_field is a key of parent_ids (one $in query),
+    pointing the copies at the mapped parents. New ids are recorded in id_map (old -> new).
+    Documents are copied whole, so fields added to the models later are cloned too.
+    """
+    if not parent_ids:
+        return 0
+    collection = model.get_motor_collection()
+    cursor = collection.find({parent_field: {"$in": list(parent_ids)}}, batch_size=batch_size)
+
+    copied = 0
+    batch: List[Dict[str, Any]] = []
+    async for doc in cursor:
+        new_id = ObjectId()
+        id_map[str(doc["_id"])] = str(new_id)
+        doc["_id"] = new_id
+        doc[parent_field] = parent_ids[doc[parent_field]]
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            copied += await insert_batches(model, batch, batch_size)
+            batch = []
+    if batch:
+        copied += await insert_batches(model, batch, batch_size)
+    return copied
+
+
+async def clone_settings(source_channel_id: str, target_channel_id: str, activity_map: Dict[str, str]) -> Dict[str, int]:
+    """Copy free access, tiers and coupons; free-access activity ids are remapped to the copies."""
+    counts = {}
+
+    free_access = await FreeAccess.get_motor_collection().find_one({"channel_id": source_channel_id})
+    if free_access:
+        free_access["_id"] = ObjectId()
+        free_access["channel_id"] = target_channel_id
+        free_access["free_activities"] = [
+            activity_map[activity_id]
+            for activity_id in free_access.get("free_activities") or []
+            if activity_id in activity_map
+        ]
+        free_access["precentage_outline"] = {
+            activity_map[activity_id]: value
+            for activity_id, value in (free_access.get("precentage_outline") or {}).items()
+            if activity_id in activity_map
+        }
+        await FreeAccess.get_motor_collection().insert_one(free_access)
+    counts["free_access"] = int(bool(free_access))
+
+    tiers = await Tier.get_motor_collection().find({"channel_id": source_channel_id}).to_list(None)
+    for tier in tiers:
+        tier["_id"] = ObjectId()
+        tier["channel_id"] = target_channel_id
+    counts["tiers"] = await insert_batches(Tier, tiers)
+
+    coupons = await Coupon.get_motor_collection().find({"channel_id": source_channel_id}).to_list(None)
+    for coupon in coupons:
+        coupon["_id"] = ObjectId()
+        coupon["channel_id"] = target_channel_id
+        # Prefix to avoid conflicts
+        coupon["code"] = f"COPY_{coupon['code']}"
+    counts["coupons"] = await insert_batches(Coupon, coupons)
+    return counts
+
+
+async def create_channel_copy(source_info: ChannelInfo, user_id: str) -> ChannelInfo:
+    """Create the ChannelInfo / Channel / PublishChannel records of an (empty, unpublished) copy."""
+    channel_info = ChannelInfo(
+        user_id=user_id,
+        name=f"Copy of {source_info.name}",
+        description=source_info.description,
+        primary_language=source_info.primary_language,
+        target_language=source_info.target_language,
+        avatar_file_id=source_info.avatar_file_id,
+        cover_image_file_id=source_info.cover_image_file_id
+    )
+    await channel_info.insert()
+    channel_id = str(channel_info.id)
+
+    await Channel(
+        name=channel_info.name,
+        description=channel_info.description or "",
+        user_id=PydanticObjectId(user_id),
+        channel_id=channel_id,
+        primary_language=channel_info.primary_language,
+        target_language=channel_info.target_language,
+        avatar_file_id=channel_info.avatar_file_id,
+        cover_image_file_id=channel_info.cover_image_file_id,
+        # New duplicate starts unpublished
+        published=False,
+        channel_link=None
+    ).insert()
+    await PublishChannel(
+        user_id=user_id,
+        channel_id=channel_id,
+        published=False,
+        channel_link=None
+    ).insert()
+    return channel_info
+
+
+async def discard_copy(channel_id: str, id_maps: Dict[Type[Document], Dict[str, str]]) -> None:
+    """Remove whatever a failed clone managed to write."""
+    for model, id_map in id_maps.items():
+        new_ids = [ObjectId(new_id) for new_id in id_map.values()]
+        if new_ids:
+            await model.get_motor_collection().delete_many({"_id": {"$in": new_ids}})
+    for model in (FreeAccess, Tier, Coupon, PublishChannel, Channel):
+        await model.get_motor_collection().delete_many({"channel_id": channel_id})
+    await ChannelInfo.get_motor_collection().delete_one({"_id": ObjectId(channel_id)})
+
+
+async def clone_channel(
+    source_info: ChannelInfo,
+    user_id: str,
+    progress: Optional[Progress] = None,
+    batch_size: int = BULK_WRITE_BATCH_SIZE
+) -> ChannelInfo:
+    """
+    Duplicate a channel with all of its outline, content and settings.
+    Each source collection is read with one $in query on the parent ids and written with
+    ordered insert_many batches; the outline is rebuilt once at the end.
+    On failure the partial copy is removed and the error re-raised.
+    """
+    source_channel_id = str(source_info.id)
+    channel_info = await create_channel_copy(source_info, user_id)
+    channel_id = str(channel_info.id)
+
+    id_maps: Dict[Type[Document], Dict[str, str]] = {}
+    counts: Dict[str, int] = {}
+    try:
+        for step, (model, parent_field, parent) in enumerate(CONTENT_TREE):
+            parent_ids = id_maps[parent] if parent else {source_channel_id: channel_id}
+            id_map = id_maps.setdefault(model, {})
+            counts[model.get_motor_collection().name] = await clone_collection(model, parent_field, parent_ids, id_map, batch_size)
+            if progress:
+                await progress(step + 1, CLONE_STEPS)
+
+        counts.update(await clone_settings(source_channel_id, channel_id, id_maps[ActivityOutline]))
+        if progress:
+            await progress(CLONE_STEPS - 1, CLONE_STEPS)
+
+        await get_channel_content_outline_stats(channel_id, user_id)
+        if progress:
+            await progress(CLONE_STEPS, CLONE_STEPS)
+    except BaseException:
+        logger.exception("channel clone failed", extra={"source_channel_id": source_channel_id, "channel_id": channel_id})
+        await discard_copy(channel_id, id_maps)
+        raise
+
+    logger.info("channel cloned", extra={"source_channel_id": source_channel_id, "channel_id": channel_id, **counts})
+    return channel_info
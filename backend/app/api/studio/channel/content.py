@@ -1,5 +1,6 @@
-from fastapi import APIRouter, Response, Depends, Path, Body, HTTPException, Query
-from typing import List, Optional
+from fastapi import APIRouter, Request, Response, Depends, Path, Body, Header, HTTPException, Query
+from typing import Any, Dict, List, Literal, Optional
+from pydantic import ValidationError
 from app.utils.user import get_user_id
 from app.models.channel import (
     SectionRequest, SectionResponse,
@@ -9,15 +10,28 @@ from app.models.channel import (
     ActivityRequest, ActivityResponse,
     LessonRequest, LessonResponse, Lesson,
     QuestionRequest, QuestionResponse, Question,
-    ChannelInfo, Section,
+    Section,
     ActivityOutlineRequest, ActivityOutlineResponse, ActivityOutline,
     Activity,
     LessonOutlineRequest, LessonOutlineResponse, LessonOutline,
     QuizOutlineRequest, QuizOutlineResponse, QuizOutline,
+    OutlineReorderRequest, OutlineReorderResponse,
+    LessonImportRecord, QuestionImportRecord, ContentImportResponse,
 )
 from beanie import PydanticObjectId
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+import json
 import asyncio
-from app.api.studio.channel.middlewares import get_channel_content_outline_stats
+import hashlib
+from app.api.studio.channel.middlewares import schedule_outline_rebuild
+from app.api.studio.channel.templates import template_registry
+from app.services.channel_repository import load_owned_channel, load_owned_channel_info
+from app.services.dependencies import get_outline_repository
+from app.services.outline_repository import OutlineRepository
+from app.utils.jobs import get_user_job
+from app.utils.outline import plan_reorder
+from app.settings import BULK_WRITE_BATCH_SIZE, IMPORT_MAX_RECORDS
 
 api = APIRouter()
 
@@ -31,7 +45,8 @@ async def create_section_outline(
     channel_id: str = Path(..., description="The ID of the channel"),
     order: int = Path(..., description="The order of the section"),
     payload: SectionOutlineRequest = Body(...),
-    uid: str = Depends(get_user_id)
+    uid: str = Depends(get_user_id),
+    repo: OutlineRepository = Depends(get_outline_repository)
 ):
     """
     Create a new section outline with the provided payload and order.
@@ -39,10 +54,8 @@ async def create_section_outline(
     Returns the created section outline with its ID.
     """
     try:
-        # Verify channel exists
-        channel = await ChannelInfo.find_one({
-            "_id": PydanticObjectId(channel_id)
-        })
+        # Verify channel exists and belongs to user
+        channel = await load_owned_channel_info(channel_id, uid)
         if not channel:
             raise HTTPException(status_code=404, detail="Channel not found")
 
@@ -52,10 +65,12 @@ async def create_section_outline(
             name=payload.name,
             order=order
         )
-        await section_outline.insert()
-        await get_channel_content_outline_stats(channel_id, uid)
+        await repo.insert(section_outline)
+        await schedule_outline_rebuild(channel_id)
         return SectionOutlineResponse(**section_outline.model_dump())
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -64,7 +79,8 @@ async def update_section_outline(
     channel_id: str = Path(..., description="The ID of the channel"),
     section_outline_id: str = Path(..., description="The ID of the section outline"),
     payload: SectionOutlineRequest = Body(...),
-    uid: str = Depends(get_user_id)
+    uid: str = Depends(get_user_id),
+    repo: OutlineRepository = Depends(get_outline_repository)
 ):
     """
     Update a section outline.
@@ -72,14 +88,12 @@ async def update_section_outline(
     """
     print("################")
     try:
-        # Verify channel exists
-        channel = await ChannelInfo.find_one({
-            "_id": PydanticObjectId(channel_id)
-        })
+        # Verify channel exists and belongs to user
+        channel = await load_owned_channel_info(channel_id, uid)
         if not channel:
             raise HTTPException(status_code=404, detail="Channel not found")
         # Find and update the section outline
-        section_outline = await SectionOutline.find_one({
+        section_outline = await repo.get(SectionOutline, {
             "_id": PydanticObjectId(section_outline_id),
             "channel_id": channel_id
         })
@@ -90,10 +104,12 @@ async def update_section_outline(
         section_outline.name = payload.name
         section_outline.order = payload.order
 
-        await section_outline.save()
-        await get_channel_content_outline_stats(channel_id, uid)
+        await repo.save(section_outline)
+        await schedule_outline_rebuild(channel_id)
         return SectionOutlineResponse(**section_outline.model_dump())
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -101,22 +117,21 @@ async def update_section_outline(
 async def delete_section_outline(
     channel_id: str = Path(..., description="The ID of the channel"),
     section_outline_id: str = Path(..., description="The ID of the section outline"),
-    uid: str = Depends(get_user_id)
+    uid: str = Depends(get_user_id),
+    repo: OutlineRepository = Depends(get_outline_repository)
 ):
     """
     Delete a section outline.
     Validates channel existence and section outline existence.
     """
     try:
-        # Verify channel exists
-        channel = await ChannelInfo.find_one({
-            "_id": PydanticObjectId(channel_id)
-        })
+        # Verify channel exists and belongs to user
+        channel = await load_owned_channel_info(channel_id, uid)
         if not channel:
             raise HTTPException(status_code=404, detail="Channel not found")
 
         # Find and delete the section outline
-        section_outline = await SectionOutline.find_one({
+        section_outline = await repo.get(SectionOutline, {
             "_id": PydanticObjectId(section_outline_id),
             "channel_id": channel_id
         })
@@ -124,16 +139,18 @@ async def delete_section_outline(
             raise HTTPException(status_code=404, detail="Section outline not found")
 
         # Delete associated section content if it exists
-        section_content = await Section.find_one({
+        section_content = await repo.get(Section, {
             "section_outline_id": section_outline_id
         })
         if section_content:
-            await section_content.delete()
+            await repo.delete(section_content)
 
-        await section_outline.delete()
-        await get_channel_content_outline_stats(channel_id, uid)
+        await repo.delete(section_outline)
+        await schedule_outline_rebuild(channel_id)
         return {"message": "Section outline deleted successfully"}
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -145,7 +162,8 @@ async def create_section(
     channel_id: str = Path(..., description="The ID of the channel"),
     section_id: Optional[str] = Query(None, description="Optional: The ID of the section to update"),
     payload: SectionRequest = Body(...),
-    uid: str = Depends(get_user_id)
+    uid: str = Depends(get_user_id),
+    repo: OutlineRepository = Depends(get_outline_repository)
 ):
     """
     Create or update a section based on section_id.
@@ -155,15 +173,13 @@ async def create_section(
     """
     try:
         # Verify channel exists and belongs to user
-        channel = await ChannelInfo.find_one({
-            "_id": PydanticObjectId(channel_id),
-        })
+        channel = await load_owned_channel_info(channel_id, uid)
         if not channel:
             raise HTTPException(status_code=404, detail="Channel not found")
 
         if section_id:
             # Update existing section
-            section = await Section.find_one({
+            section = await repo.get(Section, {
                 "_id": PydanticObjectId(section_id)
             })
             if not section:
@@ -174,8 +190,8 @@ async def create_section(
             section.description = payload.description
             section.file_id = payload.file_id
 
-            await section.save()
-            await get_channel_content_outline_stats(channel_id, uid)
+            await repo.save(section)
+            await schedule_outline_rebuild(channel_id)
             return SectionResponse(**section.model_dump())
         else:
             # Create the new section
@@ -185,10 +201,12 @@ async def create_section(
                 description=payload.description,
                 file_id=payload.file_id,
             )
-            await section.insert()
-            await get_channel_content_outline_stats(channel_id, uid)
+            await repo.insert(section)
+            await schedule_outline_rebuild(channel_id)
             return SectionResponse(**section.model_dump())
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -201,7 +219,8 @@ async def create_unit_outline(
     channel_id: str = Path(..., description="The ID of the channel"),
     order: int = Path(..., description="The order of the unit"),
     payload: UnitOutlineRequest = Body(...),
-    uid: str = Depends(get_user_id)
+    uid: str = Depends(get_user_id),
+    repo: OutlineRepository = Depends(get_outline_repository)
 ):
     """
     Create a new unit outline with the provided payload and order.
@@ -209,10 +228,8 @@ async def create_unit_outline(
     Returns the created unit outline with its ID.
     """
     try:
-        # Verify channel exists
-        channel = await ChannelInfo.find_one({
-            "_id": PydanticObjectId(channel_id)
-        })
+        # Verify channel exists and belongs to user
+        channel = await load_owned_channel_info(channel_id, uid)
         if not channel:
             raise HTTPException(status_code=404, detail="Channel not found")
 
@@ -223,10 +240,12 @@ async def create_unit_outline(
             name=payload.name,
             order=order
         )
-        await unit_outline.insert()
-        await get_channel_content_outline_stats(channel_id, uid)
+        await repo.insert(unit_outline)
+        await schedule_outline_rebuild(channel_id)
         return UnitOutlineResponse(**unit_outline.model_dump())
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -235,7 +254,8 @@ async def update_unit_outline(
     channel_id: str = Path(..., description="The ID of the channel"),
     unit_outline_id: str = Path(..., description="The ID of the unit outline"),
     payload: UnitOutlineRequest = Body(...),
-    uid: str = Depends(get_user_id)
+    uid: str = Depends(get_user_id),
+    repo: OutlineRepository = Depends(get_outline_repository)
 ):
     """
     Update a unit outline.
@@ -243,16 +263,14 @@ async def update_unit_outline(
     Returns the updated unit outline with its ID.
     """
     try:
-        # Verify channel exists
-        channel = await ChannelInfo.find_one({
-            "_id": PydanticObjectId(channel_id)
-        })
+        # Verify channel exists and belongs to user
+        channel = await load_owned_channel_info(channel_id, uid)
         if not channel:
             raise HTTPException(status_code=404, detail="Channel not found")
 
         print("################" , payload, unit_outline_id, channel_id)
         # Find and update the unit outline
-        unit_outline = await UnitOutline.find_one({
+        unit_outline = await repo.get(UnitOutline, {
             "_id": PydanticObjectId(unit_outline_id)
         })
         if not unit_outline:
@@ -262,10 +280,12 @@ async def update_unit_outline(
         unit_outline.name = payload.name
         unit_outline.order = payload.order
 
-        await unit_outline.save()
-        await get_channel_content_outline_stats(channel_id, uid)
+        await repo.save(unit_outline)
+        await schedule_outline_rebuild(channel_id)
         return UnitOutlineResponse(**unit_outline.model_dump())
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -273,38 +293,39 @@ async def update_unit_outline(
 async def delete_unit_outline(
     channel_id: str = Path(..., description="The ID of the channel"),
     unit_outline_id: str = Path(..., description="The ID of the unit outline"),
-    uid: str = Depends(get_user_id)
+    uid: str = Depends(get_user_id),
+    repo: OutlineRepository = Depends(get_outline_repository)
 ):
     """
     Delete a unit outline.
     Validates channel existence and unit outline existence.
     """
     try:
-        # Verify channel exists
-        channel = await ChannelInfo.find_one({
-            "_id": PydanticObjectId(channel_id)
-        })
+        # Verify channel exists and belongs to user
+        channel = await load_owned_channel_info(channel_id, uid)
         if not channel:
             raise HTTPException(status_code=404, detail="Channel not found")
 
         # Find and delete the unit outline
-        unit_outline = await UnitOutline.find_one({
+        unit_outline = await repo.get(UnitOutline, {
             "_id": PydanticObjectId(unit_outline_id)
         })
         if not unit_outline:
             raise HTTPException(status_code=404, detail="Unit outline not found")
 
         # Delete associated unit content if it exists
-        unit_content = await Unit.find_one({
+        unit_content = await repo.get(Unit, {
             "unit_outline_id": unit_outline_id
         })
         if unit_content:
-            await unit_content.delete()
+            await repo.delete(unit_content)
 
-        await unit_outline.delete()
-        await get_channel_content_outline_stats(channel_id, uid)
+        await repo.delete(unit_outline)
+        await schedule_outline_rebuild(channel_id)
         return {"message": "Unit outline deleted successfully"}
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -316,7 +337,8 @@ async def create_unit(
     channel_id: str = Path(..., description="The ID of the channel"),
     unit_id: Optional[str] = Query(None, description="Optional: The ID of the unit to update"),
     payload: UnitRequest = Body(...),
-    uid: str = Depends(get_user_id)
+    uid: str = Depends(get_user_id),
+    repo: OutlineRepository = Depends(get_outline_repository)
 ):
     """
     Create or update a unit based on unit_id.
@@ -326,15 +348,13 @@ async def create_unit(
     """
     try:
         # Verify channel exists and belongs to user
-        channel = await ChannelInfo.find_one({
-            "_id": PydanticObjectId(channel_id),
-        })
+        channel = await load_owned_channel_info(channel_id, uid)
         if not channel:
             raise HTTPException(status_code=404, detail="Channel not found")
 
         if unit_id:
             # Update existing unit
-            unit = await Unit.find_one({
+            unit = await repo.get(Unit, {
                 "_id": PydanticObjectId(unit_id)
             })
             if not unit:
@@ -345,13 +365,13 @@ async def create_unit(
             unit.description = payload.description
             unit.file_id = payload.file_id
 
-            await unit.save()
-            await get_channel_content_outline_stats(channel_id, uid)
+            await repo.save(unit)
+            await schedule_outline_rebuild(channel_id)
             return UnitResponse(**unit.model_dump())
         else:
             # Create new unit
             # Check if a unit with the same name already exists in this section
-            existing_unit = await Unit.find_one({
+            existing_unit = await repo.get(Unit, {
                 "unit_outline_id": payload.unit_outline_id,
                 "name": payload.name
             })
@@ -365,10 +385,12 @@ async def create_unit(
                 description=payload.description,
                 file_id=payload.file_id
             )
-            await new_unit.insert()
-            await get_channel_content_outline_stats(channel_id, uid)
+            await repo.insert(new_unit)
+            await schedule_outline_rebuild(channel_id)
             return UnitResponse(**new_unit.model_dump())
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -382,7 +404,8 @@ async def create_activity_outline(
     channel_id: str = Path(..., description="The ID of the channel"),
     order: int = Path(..., description="The order of the activity"),
     payload: ActivityOutlineRequest = Body(...),
-    uid: str = Depends(get_user_id)
+    uid: str = Depends(get_user_id),
+    repo: OutlineRepository = Depends(get_outline_repository)
 ):
     """
     Create a new activity outline with the provided payload and order.
@@ -390,10 +413,8 @@ async def create_activity_outline(
     Returns the created activity outline with its ID.
     """
     try:
-        # Verify channel exists
-        channel = await ChannelInfo.find_one({
-            "_id": PydanticObjectId(channel_id)
-        })
+        # Verify channel exists and belongs to user
+        channel = await load_owned_channel_info(channel_id, uid)
         if not channel:
             raise HTTPException(status_code=404, detail="Channel not found")
         # Create the new activity outline
@@ -404,10 +425,12 @@ async def create_activity_outline(
             lesson_quiz_count=0,  # Initialize count to 0
             percentage=0  # Initialize percentage to 0
         )
-        await activity_outline.insert()
-        await get_channel_content_outline_stats(channel_id, uid)
+        await repo.insert(activity_outline)
+        await schedule_outline_rebuild(channel_id)
         return ActivityOutlineResponse(**activity_outline.model_dump())
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -416,7 +439,8 @@ async def update_activity_outline(
     channel_id: str = Path(..., description="The ID of the channel"),
     activity_outline_id: str = Path(..., description="The ID of the activity outline"),
     payload: ActivityOutlineRequest = Body(...),
-    uid: str = Depends(get_user_id)
+    uid: str = Depends(get_user_id),
+    repo: OutlineRepository = Depends(get_outline_repository)
 ):
     """
     Update an activity outline.
@@ -424,15 +448,13 @@ async def update_activity_outline(
     Returns the updated activity outline with its ID.
     """
     try:
-        # Verify channel exists
-        channel = await ChannelInfo.find_one({
-            "_id": PydanticObjectId(channel_id)
-        })
+        # Verify channel exists and belongs to user
+        channel = await load_owned_channel_info(channel_id, uid)
         if not channel:
             raise HTTPException(status_code=404, detail="Channel not found")
 
         # Find and update the activity outline
-        activity_outline = await ActivityOutline.find_one({
+        activity_outline = await repo.get(ActivityOutline, {
             "_id": PydanticObjectId(activity_outline_id)
         })
         if not activity_outline:
@@ -445,10 +467,12 @@ async def update_activity_outline(
         activity_outline.lesson_quiz_count = activity_outline.lesson_quiz_count
         activity_outline.percentage = activity_outline.percentage
 
-        await activity_outline.save()
-        await get_channel_content_outline_stats(channel_id, uid)
+        await repo.save(activity_outline)
+        await schedule_outline_rebuild(channel_id)
         return ActivityOutlineResponse(**activity_outline.model_dump())
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -456,38 +480,39 @@ async def update_activity_outline(
 async def delete_activity_outline(
     channel_id: str = Path(..., description="The ID of the channel"),
     activity_outline_id: str = Path(..., description="The ID of the activity outline"),
-    uid: str = Depends(get_user_id)
+    uid: str = Depends(get_user_id),
+    repo: OutlineRepository = Depends(get_outline_repository)
 ):
     """
     Delete an activity outline.
     Validates channel existence and activity outline existence.
     """
     try:
-        # Verify channel exists
-        channel = await ChannelInfo.find_one({
-            "_id": PydanticObjectId(channel_id)
-        })
+        # Verify channel exists and belongs to user
+        channel = await load_owned_channel_info(channel_id, uid)
         if not channel:
             raise HTTPException(status_code=404, detail="Channel not found")
 
         # Find and delete the activity outline
-        activity_outline = await ActivityOutline.find_one({
+        activity_outline = await repo.get(ActivityOutline, {
             "_id": PydanticObjectId(activity_outline_id)
         })
         if not activity_outline:
             raise HTTPException(status_code=404, detail="Activity outline not found")
 
         # Delete associated activity content if it exists
-        activity_content = await Activity.find_one({
+        activity_content = await repo.get(Activity, {
             "activity_outline_id": activity_outline_id
         })
         if activity_content:
-            await activity_content.delete()
+            await repo.delete(activity_content)
 
-        await activity_outline.delete()
-        await get_channel_content_outline_stats(channel_id, uid)
+        await repo.delete(activity_outline)
+        await schedule_outline_rebuild(channel_id)
         return {"message": "Activity outline deleted successfully"}
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -499,7 +524,8 @@ async def create_activity(
     channel_id: str = Path(..., description="The ID of the channel"),
     activity_id: Optional[str] = Query(None, description="Optional: The ID of the activity to update"),
     payload: ActivityRequest = Body(...),
-    uid: str = Depends(get_user_id)
+    uid: str = Depends(get_user_id),
+    repo: OutlineRepository = Depends(get_outline_repository)
 ):
     """
     Create or update an activity based on activity_id.
@@ -510,15 +536,13 @@ async def create_activity(
     """
     try:
         # Verify channel exists and belongs to user
-        channel = await ChannelInfo.find_one({
-            "_id": PydanticObjectId(channel_id),
-        })
+        channel = await load_owned_channel_info(channel_id, uid)
         if not channel:
             raise HTTPException(status_code=404, detail="Channel not found")
 
         if activity_id:
             # Update existing activity
-            activity = await Activity.find_one({
+            activity = await repo.get(Activity, {
                 "_id": PydanticObjectId(activity_id)
             })
             if not activity:
@@ -530,8 +554,8 @@ async def create_activity(
             activity.difficulty_level = payload.difficulty_level
             activity.is_launched = payload.is_launched
 
-            await activity.save()
-            await get_channel_content_outline_stats(channel_id, uid)
+            await repo.save(activity)
+            await schedule_outline_rebuild(channel_id)
             return ActivityResponse(**activity.model_dump())
         else:
             # Create new activity
@@ -542,10 +566,12 @@ async def create_activity(
                 difficulty_level=payload.difficulty_level,
                 is_launched=payload.is_launched
             )
-            await new_activity.insert()
-            await get_channel_content_outline_stats(channel_id, uid)
+            await repo.insert(new_activity)
+            await schedule_outline_rebuild(channel_id)
             return ActivityResponse(**new_activity.model_dump())
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -558,7 +584,8 @@ async def create_lesson_outline(
     channel_id: str = Path(..., description="The ID of the channel"),
     order: int = Path(..., description="The order of the lesson"),
     payload: LessonOutlineRequest = Body(...),
-    uid: str = Depends(get_user_id)
+    uid: str = Depends(get_user_id),
+    repo: OutlineRepository = Depends(get_outline_repository)
 ):
     """
     Create a new lesson outline with the provided payload and order.
@@ -566,10 +593,8 @@ async def create_lesson_outline(
     Returns the created lesson outline with its ID.
     """
     try:
-        # Verify channel exists
-        channel = await ChannelInfo.find_one({
-            "_id": PydanticObjectId(channel_id)
-        })
+        # Verify channel exists and belongs to user
+        channel = await load_owned_channel_info(channel_id, uid)
         if not channel:
             raise HTTPException(status_code=404, detail="Channel not found")
 
@@ -580,10 +605,12 @@ async def create_lesson_outline(
             order=order,
             lesson_count=0,  # Initialize count to 0
         )
-        await lesson_outline.insert()
-        await get_channel_content_outline_stats(channel_id, uid)
+        await repo.insert(lesson_outline)
+        await schedule_outline_rebuild(channel_id)
         return LessonOutlineResponse(**lesson_outline.model_dump())
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -592,7 +619,8 @@ async def update_lesson_outline(
     channel_id: str = Path(..., description="The ID of the channel"),
     lesson_outline_id: str = Path(..., description="The ID of the lesson outline"),
     payload: LessonOutlineRequest = Body(...),
-    uid: str = Depends(get_user_id)
+    uid: str = Depends(get_user_id),
+    repo: OutlineRepository = Depends(get_outline_repository)
 ):
     """
     Update a lesson outline.
@@ -600,15 +628,13 @@ async def update_lesson_outline(
     Returns the updated lesson outline with its ID.
     """
     try:
-        # Verify channel exists
-        channel = await ChannelInfo.find_one({
-            "_id": PydanticObjectId(channel_id)
-        })
+        # Verify channel exists and belongs to user
+        channel = await load_owned_channel_info(channel_id, uid)
         if not channel:
             raise HTTPException(status_code=404, detail="Channel not found")
 
         # Find and update the lesson outline
-        lesson_outline = await LessonOutline.find_one({
+        lesson_outline = await repo.get(LessonOutline, {
             "_id": PydanticObjectId(lesson_outline_id)
         })
         if not lesson_outline:
@@ -618,10 +644,12 @@ async def update_lesson_outline(
         lesson_outline.name = payload.name
         lesson_outline.order = payload.order
 
-        await lesson_outline.save()
-        await get_channel_content_outline_stats(channel_id, uid)
+        await repo.save(lesson_outline)
+        await schedule_outline_rebuild(channel_id)
         return LessonOutlineResponse(**lesson_outline.model_dump())
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -629,36 +657,37 @@ async def update_lesson_outline(
 async def delete_lesson_outline(
     channel_id: str = Path(..., description="The ID of the channel"),
     lesson_outline_id: str = Path(..., description="The ID of the lesson outline"),
-    uid: str = Depends(get_user_id)
+    uid: str = Depends(get_user_id),
+    repo: OutlineRepository = Depends(get_outline_repository)
 ):
     """
     Delete a lesson outline.
     Validates channel existence and lesson outline existence.
     """
     try:
-        # Verify channel exists
-        channel = await ChannelInfo.find_one({
-            "_id": PydanticObjectId(channel_id)
-        })
+        # Verify channel exists and belongs to user
+        channel = await load_owned_channel_info(channel_id, uid)
         if not channel:
             raise HTTPException(status_code=404, detail="Channel not found")
 
         # Find and delete the lesson outline
-        lesson_outline = await LessonOutline.find_one({
+        lesson_outline = await repo.get(LessonOutline, {
             "_id": PydanticObjectId(lesson_outline_id)
         })
         if not lesson_outline:
             raise HTTPException(status_code=404, detail="Lesson outline not found")
 
-        lesson_contents = await Lesson.find({"lesson_outline_id": lesson_outline_id}).to_list()
+        lesson_contents = await repo.find(Lesson, {"lesson_outline_id": lesson_outline_id})
         if lesson_contents:
             for lesson in lesson_contents:
-                await lesson.delete()
+                await repo.delete(lesson)
 
-        await lesson_outline.delete()
-        await get_channel_content_outline_stats(channel_id, uid)
+        await repo.delete(lesson_outline)
+        await schedule_outline_rebuild(channel_id)
         return {"message": "Lesson outline deleted successfully"}
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -671,7 +700,8 @@ async def create_lesson(
     channel_id: str = Path(..., description="The ID of the channel"),
     lesson_id: Optional[str] = Query(None, description="Optional: The ID of the lesson to update"),
     payload: List[LessonRequest] = Body(...),
-    uid: str = Depends(get_user_id)
+    uid: str = Depends(get_user_id),
+    repo: OutlineRepository = Depends(get_outline_repository)
 ):
     """
     Create or update multiple lessons based on lesson_id.
@@ -683,15 +713,13 @@ async def create_lesson(
     """
     try:
         # Verify channel exists and belongs to user
-        channel = await ChannelInfo.find_one({
-            "_id": PydanticObjectId(channel_id),
-        })
+        channel = await load_owned_channel_info(channel_id, uid)
         if not channel:
             raise HTTPException(status_code=404, detail="Channel not found")
 
         if lesson_id:
             # Update existing lesson
-            lesson = await Lesson.find_one({
+            lesson = await repo.get(Lesson, {
                 "_id": PydanticObjectId(lesson_id)
             })
             if not lesson:
@@ -706,14 +734,13 @@ async def create_lesson(
             lesson.is_launched = payload[0].is_launched
             lesson.is_free = payload[0].is_free
 
-            await lesson.save()
-            print('calling await get_channel_content_outline_stats')
-            await get_channel_content_outline_stats(channel_id, uid)
+            await repo.save(lesson)
+            await schedule_outline_rebuild(channel_id)
             return [LessonResponse(**lesson.model_dump())]
         else:
             # Create new lessons
             # Verify lesson outline exists from first lesson's data
-            lesson_outline = await LessonOutline.find_one({
+            lesson_outline = await repo.get(LessonOutline, {
                 "_id": PydanticObjectId(payload[0].lesson_outline_id)
             })
             if not lesson_outline:
@@ -732,16 +759,18 @@ async def create_lesson(
                     is_launched=lesson_data.is_launched,
                     is_free=lesson_data.is_free
                 )
-                await lesson.insert()
+                await repo.insert(lesson)
                 created_lessons.append(LessonResponse(**lesson.model_dump()))
 
             # Update lesson count in lesson outline
             lesson_outline.lesson_count = len(payload)
-            await lesson_outline.save()
+            await repo.save(lesson_outline)
 
-            await get_channel_content_outline_stats(channel_id, uid)
+            await schedule_outline_rebuild(channel_id)
             return created_lessons
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -749,31 +778,32 @@ async def create_lesson(
 async def delete_lesson(
     channel_id: str = Path(..., description="The ID of the channel"),
     lesson_id: str = Path(..., description="The ID of the lesson"),
-    uid: str = Depends(get_user_id)
+    uid: str = Depends(get_user_id),
+    repo: OutlineRepository = Depends(get_outline_repository)
 ):
     """
     Delete a lesson content.
     Validates channel existence and lesson existence.
     """
     try:
-        # Verify channel exists
-        channel = await ChannelInfo.find_one({
-            "_id": PydanticObjectId(channel_id)
-        })
+        # Verify channel exists and belongs to user
+        channel = await load_owned_channel_info(channel_id, uid)
         if not channel:
             raise HTTPException(status_code=404, detail="Channel not found")
 
         # Find and delete the lesson
-        lesson = await Lesson.find_one({
+        lesson = await repo.get(Lesson, {
             "_id": PydanticObjectId(lesson_id)
         })
         if not lesson:
             raise HTTPException(status_code=404, detail="Lesson not found")
 
-        await lesson.delete()
-        await get_channel_content_outline_stats(channel_id, uid)
+        await repo.delete(lesson)
+        await schedule_outline_rebuild(channel_id)
         return {"message": "Lesson deleted successfully"}
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -785,7 +815,8 @@ async def create_quiz_outline(
     channel_id: str = Path(..., description="The ID of the channel"),
     order: int = Path(..., description="The order of the quiz"),
     payload: QuizOutlineRequest = Body(...),
-    uid: str = Depends(get_user_id)
+    uid: str = Depends(get_user_id),
+    repo: OutlineRepository = Depends(get_outline_repository)
 ):
     """
     Create a new quiz outline with the provided payload and order.
@@ -793,10 +824,8 @@ async def create_quiz_outline(
     Returns the created quiz outline with its ID.
     """
     try:
-        # Verify channel exists
-        channel = await ChannelInfo.find_one({
-            "_id": PydanticObjectId(channel_id)
-        })
+        # Verify channel exists and belongs to user
+        channel = await load_owned_channel_info(channel_id, uid)
         if not channel:
             raise HTTPException(status_code=404, detail="Channel not found")
 
@@ -809,10 +838,12 @@ async def create_quiz_outline(
             is_free=payload.is_free,
             quiz_count=payload.quiz_count
         )
-        await quiz_outline.insert()
-        await get_channel_content_outline_stats(channel_id, uid)
+        await repo.insert(quiz_outline)
+        await schedule_outline_rebuild(channel_id)
         return QuizOutlineResponse(**quiz_outline.model_dump())
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -821,7 +852,8 @@ async def update_quiz_outline(
     channel_id: str = Path(..., description="The ID of the channel"),
     quiz_outline_id: str = Path(..., description="The ID of the quiz outline"),
     payload: QuizOutlineRequest = Body(...),
-    uid: str = Depends(get_user_id)
+    uid: str = Depends(get_user_id),
+    repo: OutlineRepository = Depends(get_outline_repository)
 ):
     """
     Update a quiz outline.
@@ -829,15 +861,13 @@ async def update_quiz_outline(
     Returns the updated quiz outline with its ID.
     """
     try:
-        # Verify channel exists
-        channel = await ChannelInfo.find_one({
-            "_id": PydanticObjectId(channel_id)
-        })
+        # Verify channel exists and belongs to user
+        channel = await load_owned_channel_info(channel_id, uid)
         if not channel:
             raise HTTPException(status_code=404, detail="Channel not found")
 
         # Find and update the quiz outline
-        quiz_outline = await QuizOutline.find_one({
+        quiz_outline = await repo.get(QuizOutline, {
             "_id": PydanticObjectId(quiz_outline_id)
         })
         if not quiz_outline:
@@ -850,10 +880,12 @@ async def update_quiz_outline(
         quiz_outline.is_free = payload.is_free
         quiz_outline.quiz_count = payload.quiz_count
 
-        await quiz_outline.save()
-        await get_channel_content_outline_stats(channel_id, uid)
+        await repo.save(quiz_outline)
+        await schedule_outline_rebuild(channel_id)
         return QuizOutlineResponse(**quiz_outline.model_dump())
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -861,37 +893,38 @@ async def update_quiz_outline(
 async def delete_quiz_outline(
     channel_id: str = Path(..., description="The ID of the channel"),
     quiz_outline_id: str = Path(..., description="The ID of the quiz outline"),
-    uid: str = Depends(get_user_id)
+    uid: str = Depends(get_user_id),
+    repo: OutlineRepository = Depends(get_outline_repository)
 ):
     """
     Delete a quiz outline.
     Validates channel existence and quiz outline existence.
     """
     try:
-        # Verify channel exists
-        channel = await ChannelInfo.find_one({
-            "_id": PydanticObjectId(channel_id)
-        })
+        # Verify channel exists and belongs to user
+        channel = await load_owned_channel_info(channel_id, uid)
         if not channel:
             raise HTTPException(status_code=404, detail="Channel not found")
 
         # Find and delete the quiz outline
-        quiz_outline = await QuizOutline.find_one({
+        quiz_outline = await repo.get(QuizOutline, {
             "_id": PydanticObjectId(quiz_outline_id)
         })
         if not quiz_outline:
             raise HTTPException(status_code=404, detail="Quiz outline not found")
 
-        await quiz_outline.delete()
+        await repo.delete(quiz_outline)
 
-        quiz_contents = await Question.find({"quiz_outline_id": quiz_outline_id}).to_list()
+        quiz_contents = await repo.find(Question, {"quiz_outline_id": quiz_outline_id})
         if quiz_contents:
             for quiz in quiz_contents:
-                await quiz.delete()
+                await repo.delete(quiz)
 
-        await get_channel_content_outline_stats(channel_id, uid)
+        await schedule_outline_rebuild(channel_id)
         return {"message": "Quiz outline deleted successfully"}
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -905,7 +938,8 @@ async def create_question(
     channel_id: str = Path(..., description="The ID of the channel"),
     quiz_id: Optional[str] = Query(None, description="Optional: The ID of the quiz to update"),
     payload: List[QuestionRequest] = Body(...),
-    uid: str = Depends(get_user_id)
+    uid: str = Depends(get_user_id),
+    repo: OutlineRepository = Depends(get_outline_repository)
 ):
     """
     Create or update multiple questions based on quiz_id.
@@ -917,15 +951,13 @@ async def create_question(
     """
     try:
         # Verify channel exists and belongs to user
-        channel = await ChannelInfo.find_one({
-            "_id": PydanticObjectId(channel_id),
-        })
+        channel = await load_owned_channel_info(channel_id, uid)
         if not channel:
             raise HTTPException(status_code=404, detail="Channel not found")
 
         if quiz_id:
             # Update existing quiz
-            quiz = await Question.find_one({
+            quiz = await repo.get(Question, {
                 "_id": PydanticObjectId(quiz_id)
             })
             if not quiz:
@@ -941,13 +973,13 @@ async def create_question(
             quiz.order = payload[0].order
             quiz.is_accepted = payload[0].is_accepted
 
-            await quiz.save()
-            await get_channel_content_outline_stats(channel_id, uid)
+            await repo.save(quiz)
+            await schedule_outline_rebuild(channel_id)
             return [QuestionResponse(**quiz.model_dump())]
         else:
             # Create new questions
             # Verify quiz outline exists from first question's data
-            quiz_outline = await QuizOutline.find_one({
+            quiz_outline = await repo.get(QuizOutline, {
                 "_id": PydanticObjectId(payload[0].quiz_outline_id)
             })
             if not quiz_outline:
@@ -967,16 +999,79 @@ async def create_question(
                     order=question_data.order,
                     is_accepted=question_data.is_accepted
                 )
-                await question.insert()
+                await repo.insert(question)
                 created_questions.append(QuestionResponse(**question.model_dump()))
 
             # Update question count in quiz outline
             quiz_outline.quiz_count = len(payload)
-            await quiz_outline.save()
+            await repo.save(quiz_outline)
 
-            await get_channel_content_outline_stats(channel_id, uid)
+            await schedule_outline_rebuild(channel_id)
             return created_questions
 
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api.post('/{channel_id}/questions/from-job/{job_id}/', response_model=List[QuestionResponse])
+async def create_questions_from_job(
+    channel_id: str = Path(..., description="The ID of the channel"),
+    job_id: str = Path(..., description="The ID of a generate_questions job"),
+    quiz_outline_id: str = Query(..., description="The quiz outline receiving the questions"),
+    indexes: Optional[List[int]] = Body(None, description="Optional: positions of the job's questions to keep; all when omitted"),
+    uid: str = Depends(get_user_id),
+    repo: OutlineRepository = Depends(get_outline_repository)
+):
+    """
+    Insert questions generated by a background job into a quiz outline, appended after its
+    existing questions with a single insert_many.
+    """
+    job = await get_user_job(job_id, uid)
+    if job.kind != 'generate_questions':
+        raise HTTPException(status_code=400, detail="Not a question generation job")
+    generated = job.items if indexes is None else [job.items[i] for i in indexes if 0 <= i < len(job.items)]
+    if not generated:
+        raise HTTPException(status_code=400, detail="No generated questions to insert")
+
+    try:
+        channel = await load_owned_channel(channel_id, uid)
+        if not channel:
+            raise HTTPException(status_code=404, detail="Channel not found")
+        if (await repo.channel_ids(QuizOutline, [quiz_outline_id])).get(quiz_outline_id) != channel_id:
+            raise HTTPException(status_code=404, detail="Quiz outline not found")
+        quiz_outline = await repo.get(QuizOutline, {
+            "_id": PydanticObjectId(quiz_outline_id)
+        })
+        if not quiz_outline:
+            raise HTTPException(status_code=404, detail="Quiz outline not found")
+
+        template = template_registry.get(job.params["template_id"]).example
+        last = await Question.find(
+            {"quiz_outline_id": quiz_outline_id}
+        ).sort("-order").first_or_none()
+        start = (last.order or 0) + 1 if last else 1
+
+        questions = [
+            Question(
+                quiz_outline_id=quiz_outline_id,
+                template=template,
+                generated_question=item,
+                order=start + i,
+                is_accepted=False
+            )
+            for i, item in enumerate(generated)
+        ]
+        await repo.insert_many(Question, questions)
+
+        quiz_outline.quiz_count = await Question.find({"quiz_outline_id": quiz_outline_id}).count()
+        await repo.save(quiz_outline)
+
+        await schedule_outline_rebuild(channel_id)
+        return [QuestionResponse(**question.model_dump()) for question in questions]
+
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -984,31 +1079,267 @@ async def create_question(
 async def delete_question(
     channel_id: str = Path(..., description="The ID of the channel"),
     question_id: str = Path(..., description="The ID of the question"),
-    uid: str = Depends(get_user_id)
+    uid: str = Depends(get_user_id),
+    repo: OutlineRepository = Depends(get_outline_repository)
 ):
     """
     Delete a question content.
     Validates channel existence and question existence.
     """
     try:
-        # Verify channel exists
-        channel = await ChannelInfo.find_one({
-            "_id": PydanticObjectId(channel_id)
-        })
+        # Verify channel exists and belongs to user
+        channel = await load_owned_channel_info(channel_id, uid)
         if not channel:
             raise HTTPException(status_code=404, detail="Channel not found")
 
         # Find and delete the question
-        question = await Question.find_one({
+        question = await repo.get(Question, {
             "_id": PydanticObjectId(question_id)
         })
         if not question:
             raise HTTPException(status_code=404, detail="Question not found")
 
-        await question.delete()
-        await get_channel_content_outline_stats(channel_id, uid)
+        await repo.delete(question)
+        await schedule_outline_rebuild(channel_id)
         return {"message": "Question deleted successfully"}
 
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+
+# -----------------
+# OUTLINE REORDER APIs
+# -----------------
+
+# Sibling collections per reorder level and the field pointing at their parent
+REORDER_LEVELS = {
+    "sections": [(SectionOutline, "channel_id")],
+    "units": [(UnitOutline, "section_outline_id")],
+    "activities": [(ActivityOutline, "unit_outline_id")],
+    "content": [(LessonOutline, "activity_outline_id"), (QuizOutline, "activity_outline_id")],
+    "lessons": [(Lesson, "lesson_outline_id")],
+    "questions": [(Question, "quiz_outline_id")],
+}
+
+# Outline model of the parent per reorder level (sections hang off the channel itself)
+REORDER_PARENTS = {
+    "units": SectionOutline,
+    "activities": UnitOutline,
+    "content": ActivityOutline,
+    "lessons": LessonOutline,
+    "questions": QuizOutline,
+}
+
+@api.post('/{channel_id}/outline/reorder/', response_model=OutlineReorderResponse)
+async def reorder_outline(
+    channel_id: str = Path(..., description="The ID of the channel"),
+    payload: OutlineReorderRequest = Body(...),
+    uid: str = Depends(get_user_id),
+    repo: OutlineRepository = Depends(get_outline_repository)
+):
+    """
+    Reorder all children of one parent (sections of the channel, units of a section, activities of
+    a unit, lessons and quizzes of an activity, lesson items or questions) in a single call.
+    `ids` must list every sibling in the new order. Only the moved documents are written, with one
+    bulk_write per collection, and the outline is rebuilt once.
+    """
+    try:
+        channel = await load_owned_channel(channel_id, uid)
+        if not channel:
+            raise HTTPException(status_code=404, detail="Channel not found")
+
+        parent_id = channel_id if payload.level == "sections" else payload.parent_id
+        if parent_id != channel_id:
+            # Checked against the outline collections: outline_content lags recent writes
+            owners = await repo.channel_ids(REORDER_PARENTS[payload.level], [parent_id])
+            if owners.get(parent_id) != channel_id:
+                raise HTTPException(status_code=404, detail="Parent outline not found")
+
+        collections = REORDER_LEVELS[payload.level]
+        current, owner = {}, {}
+        for model, parent_field in collections:
+            async for doc in model.get_motor_collection().find({parent_field: parent_id}, {"order": 1}):
+                current[str(doc["_id"])] = doc.get("order") or 0
+                owner[str(doc["_id"])] = model
+        if len(payload.ids) != len(set(payload.ids)) or set(payload.ids) != set(current):
+            raise HTTPException(status_code=409, detail="ids must list every sibling exactly once")
+
+        changes = plan_reorder(current, payload.ids)
+        for model, _ in collections:
+            await repo.set_fields(model, {
+                sibling: {"order": order}
+                for sibling, order in changes.items() if owner[sibling] is model
+            })
+
+        if changes:
+            await schedule_outline_rebuild(channel_id)
+        current.update(changes)
+        return OutlineReorderResponse(
+            updated=len(changes),
+            orders={sibling: current[sibling] for sibling in payload.ids}
+        )
+
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+
+# -----------------
+# BULK IMPORT APIs
+# -----------------
+
+# kind -> (record model, document, parent outline, parent field, parent count field)
+IMPORT_KINDS = {
+    "lessons": (LessonImportRecord, Lesson, LessonOutline, "lesson_outline_id", "lesson_count"),
+    "questions": (QuestionImportRecord, Question, QuizOutline, "quiz_outline_id", "quiz_count"),
+}
+
+def import_keys(records: List[Any], idempotency_key: Optional[str]) -> List[Optional[str]]:
+    """
+    The idempotency key of each record: its own idempotency_key, else one derived from the request's
+    Idempotency-Key and the record's content (its nth identical copy gets n), so a retry that re-sends
+    the records in another order, or without those already accepted, imports nothing twice.
+    """
+    keys: List[Optional[str]] = []
+    copies: Dict[str, int] = {}
+    for record in records:
+        if record.idempotency_key or not idempotency_key:
+            keys.append(record.idempotency_key)
+            continue
+        content = json.dumps(record.model_dump(mode="json", exclude={"idempotency_key"}), sort_keys=True)
+        digest = hashlib.sha256(content.encode("utf-8")).hexdigest()[:32]
+        copies[digest] = copies.get(digest, 0) + 1
+        keys.append(f"{idempotency_key}:{digest}:{copies[digest]}")
+    return keys
+
+async def read_import_records(request: Request) -> List[Any]:
+    """Raw records of a JSON array body, or of an NDJSON body (one object per line) read as it streams in."""
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" not in content_type and "jsonl" not in content_type:
+        try:
+            records = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+        if not isinstance(records, list):
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+        return records
+
+    records, buffer, line_number = [], b"", 0
+
+    def parse(line: bytes):
+        try:
+            return json.loads(line)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Line {line_number}: invalid JSON")
+
+    async for chunk in request.stream():
+        *lines, buffer = (buffer + chunk).split(b"\n")
+        for line in lines:
+            line_number += 1
+            if line.strip():
+                records.append(parse(line))
+        if len(records) > IMPORT_MAX_RECORDS:
+            break
+    line_number += 1
+    if buffer.strip():
+        records.append(parse(buffer))
+    return records
+
+@api.post('/{channel_id}/{kind}/import/', response_model=ContentImportResponse)
+async def import_content(
+    request: Request,
+    channel_id: str = Path(..., description="The ID of the channel"),
+    kind: Literal["lessons", "questions"] = Path(..., description="What the records are"),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", description="Key for the whole import; records without their own idempotency_key get one derived from it and their content"),
+    uid: str = Depends(get_user_id),
+    repo: OutlineRepository = Depends(get_outline_repository)
+):
+    """
+    Bulk import lessons or questions into any number of lesson/quiz outlines of the channel.
+    The body is a JSON array or NDJSON (Content-Type: application/x-ndjson) of LessonRequest /
+    QuestionRequest records. Every record is validated before anything is written; the documents
+    are then written with insert_many, the outline counters with one bulk_write and the outline is
+    rebuilt once. Records whose idempotency key was already imported into the same outline are skipped.
+    """
+    record_model, model, parent_model, parent_field, count_field = IMPORT_KINDS[kind]
+    try:
+        channel = await load_owned_channel(channel_id, uid)
+        if not channel:
+            raise HTTPException(status_code=404, detail="Channel not found")
+
+        raw_records = await read_import_records(request)
+        if not raw_records:
+            raise HTTPException(status_code=400, detail="No records to import")
+        if len(raw_records) > IMPORT_MAX_RECORDS:
+            raise HTTPException(status_code=413, detail=f"At most {IMPORT_MAX_RECORDS} records per import")
+
+        # Validate everything up front so an import is never half written because of bad input
+        records, errors = [], []
+        for index, raw in enumerate(raw_records):
+            try:
+                records.append(record_model.model_validate(raw))
+            except ValidationError as e:
+                errors += [{"index": index, "loc": list(err["loc"]), "msg": err["msg"]} for err in e.errors()]
+        if errors:
+            raise HTTPException(status_code=422, detail=errors[:100])
+
+        parent_ids = list({getattr(record, parent_field) for record in records})
+        # Checked against the outline collections: outline_content lags recent writes
+        owners = await repo.channel_ids(parent_model, parent_ids)
+        missing = [i for i in parent_ids if owners.get(i) != channel_id]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"{parent_model.__name__} not found in channel: {', '.join(missing[:20])}")
+
+        keys = import_keys(records, idempotency_key)
+        seen = set()
+        async for doc in model.get_motor_collection().find(
+            {parent_field: {"$in": parent_ids}, "import_key": {"$in": [key for key in keys if key]}},
+            {parent_field: 1, "import_key": 1}
+        ):
+            seen.add((doc[parent_field], doc["import_key"]))
+
+        ids: List[Optional[str]] = [None] * len(records)
+        pending = []
+        for index, (record, key) in enumerate(zip(records, keys)):
+            scope = (getattr(record, parent_field), key)
+            if key and scope in seen:
+                continue
+            seen.add(scope)
+            document = model(**record.model_dump(exclude={"idempotency_key"}), import_key=key)
+            ids[index] = str(document.id)
+            pending.append((index, document))
+
+        for start in range(0, len(pending), BULK_WRITE_BATCH_SIZE):
+            batch = pending[start:start + BULK_WRITE_BATCH_SIZE]
+            try:
+                await repo.insert_many(model, [document for _, document in batch], ordered=False)
+            except BulkWriteError as e:
+                # A concurrent retry of the same import won the race for these keys
+                write_errors = e.details.get("writeErrors", [])
+                if any(err.get("code") != 11000 for err in write_errors):
+                    raise
+                for err in write_errors:
+                    ids[batch[err["index"]][0]] = None
+
+        # Recount the touched outlines in one aggregation and store the counts with one bulk_write
+        await repo.set_fields(parent_model, {
+            row["_id"]: {count_field: row["count"]}
+            async for row in model.get_motor_collection().aggregate([
+                {"$match": {parent_field: {"$in": parent_ids}}},
+                {"$group": {"_id": f"${parent_field}", "count": {"$sum": 1}}},
+            ])
+        })
+
+        inserted = sum(1 for i in ids if i)
+        if inserted:
+            await schedule_outline_rebuild(channel_id)
+        return ContentImportResponse(inserted=inserted, skipped=len(records) - inserted, ids=ids)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
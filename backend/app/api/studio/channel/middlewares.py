@@ -1,10 +1,38 @@
+import asyncio
+from typing import Dict, Optional, Set
+
 from fastapi import APIRouter, Response, Depends, Path, Body, HTTPException
 from app.models.channel import (
     Question, Channel,
     SectionOutline, UnitOutline, ActivityOutline, LessonOutline, QuizOutline, 
-    Unit, Activity, Lesson, Section, PublishChannel, ChannelInfo
+    Unit, Activity, Lesson, Section
+)
+from app.services.channel_repository import load_channel, load_owned_channel, forget_channel
+from app.services.outline_repository import outline_repository
+from app.utils.outline import (
+    outline_hash, publish_outline_version, discard_outline_version, prune_outline_versions
 )
-from beanie import PydanticObjectId
+from app.utils.identity_map import identity_scope
+from app.utils.log import get_logger
+from app.utils.cache import purge, channel_tag, creator_tag
+from app.settings import OUTLINE_REBUILD_DELAY, OUTLINE_REBUILD_SYNC
+
+
+logger = get_logger(__name__)
+
+# Channel fields written by an outline rebuild. The ChannelInfo / PublishChannel copies
+# (published, languages, file ids...) are written through by the settings APIs instead.
+REBUILT_FIELDS = [
+    "outline_content", "outline_hash", "outline_version", "outline_revision",
+    "section_count", "unit_count", "activity_count", "lesson_count", "quiz_count",
+    "question_count", "total_lesson_quiz_count",
+]
+
+# Channels waiting for a rebuild in this process
+_dirty: Set[str] = set()
+_rebuilds: Dict[str, asyncio.Task] = {}
+# channel_id -> content_revision whose rebuild failed; not retried by readers until the next write
+_failed: Dict[str, int] = {}
 
 
 async def get_channel_content_outline_stats(
@@ -18,18 +46,15 @@ async def get_channel_content_outline_stats(
     """
     try:
         # Verify channel exists and belongs to user
-        channel = await Channel.find_one({
-            "channel_id": channel_id,
-            "user_id": PydanticObjectId(uid)
-        })
+        channel = await load_owned_channel(channel_id, uid)
         if not channel:
             raise HTTPException(status_code=404, detail="Channel not found")
+        # Writes after this point bump content_revision again and schedule another rebuild
+        revision = channel.content_revision
 
-        # Get all sections for this channel
-        
-        sections = await SectionOutline.find(
-            {"channel_id": channel_id}
-        ).sort("order").to_list()
+        # Whole channel in one pass (one query per level, or one query with OUTLINE_STORAGE=nodes)
+        tree = await outline_repository().load_tree(channel_id)
+        sections = tree.children(SectionOutline, channel_id)
 
         outline_content = []
         stats = {
@@ -46,40 +71,33 @@ async def get_channel_content_outline_stats(
         for section in sections:
             stats["section_count"] += 1
             # Get section content
-            section_content = await Section.find_one({"section_outline_id": str(section.id)})
+            section_content = tree.content(Section, str(section.id))
             
-            units = await UnitOutline.find(
-                {"section_outline_id": str(section.id)}
-            ).sort("order").to_list()
+            units = tree.children(UnitOutline, str(section.id))
 
             section_units = []
             for unit in units:
                 stats["unit_count"] += 1
                 # Get unit content
-                unit_content = await Unit.find_one({"unit_outline_id": str(unit.id)})
+                unit_content = tree.content(Unit, str(unit.id))
                 
-                activities = await ActivityOutline.find(
-                    {"unit_outline_id": str(unit.id)}
-                ).sort("order").to_list()
+                activities = tree.children(ActivityOutline, str(unit.id))
 
                 unit_activities = []
                 for activity in activities:
                     stats["activity_count"] += 1
                     # Get activity content
-                    activity_content = await Activity.find_one({"activity_outline_id": str(activity.id)})
+                    activity_content = tree.content(Activity, str(activity.id))
                     
                     # Get lessons with their content
-                    lesson_outlines = await LessonOutline.find(
-                        {"activity_outline_id": str(activity.id)}
-                    ).sort("order").to_list()
-                    print(lesson_outlines)
+                    lesson_outlines = tree.children(LessonOutline, str(activity.id))
 
                     content = []
                     for lesson_outline in lesson_outlines:
                         stats["lesson_count"] += 1
                         stats["total_lesson_quiz_count"] += 1
                         # Get lesson content
-                        lessons = await Lesson.find({"lesson_outline_id": str(lesson_outline.id)}).sort("order").to_list()
+                        lessons = tree.children(Lesson, str(lesson_outline.id))
                         content.append({
                             "id": str(lesson_outline.id),
                             "name": lesson_outline.name,
@@ -100,20 +118,15 @@ async def get_channel_content_outline_stats(
                                 for lesson in lessons
                             ]
                         })
-                        print("333333   ", content  )
 
                     # Get quizzes with their questions
-                    quiz_outlines = await QuizOutline.find(
-                        {"activity_outline_id": str(activity.id)}
-                    ).sort("order").to_list()
+                    quiz_outlines = tree.children(QuizOutline, str(activity.id))
 
                     for quiz_outline in quiz_outlines:
                         stats["quiz_count"] += 1
                         stats["total_lesson_quiz_count"] += 1
                         # Get quiz questions
-                        questions = await Question.find(
-                            {"quiz_outline_id": str(quiz_outline.id)}
-                        ).sort("order").to_list()
+                        questions = tree.children(Question, str(quiz_outline.id))
                         stats["question_count"] += len(questions)
 
                         content.append({
@@ -139,7 +152,6 @@ async def get_channel_content_outline_stats(
                                 for q in questions
                             ]
                         })
-                    print(content)
                     # Sort content by order
                     content.sort(key=lambda x: x["order"])
 
@@ -175,12 +187,6 @@ async def get_channel_content_outline_stats(
                 "description": section_content.description if section_content else None,
                 "file_id": section_content.file_id if section_content else None
             })
-        # print(3333333)
-        publish_channel = await PublishChannel.find_one({"channel_id": channel_id})
-        channel_link = publish_channel.channel_link if publish_channel else None
-        channel_info = await ChannelInfo.find_one({"_id": PydanticObjectId(channel_id)})
-        # print(44444, publish_channel)
-        # print(55555, channel_id, channel_info)
         # Update the channel's outline field and stats
         channel.outline_content = {"sections": outline_content}
         channel.section_count = stats["section_count"]
@@ -190,14 +196,141 @@ async def get_channel_content_outline_stats(
         channel.quiz_count = stats["quiz_count"]
         channel.question_count = stats["question_count"]
         channel.total_lesson_quiz_count = stats["total_lesson_quiz_count"]
-        channel.published = publish_channel.published if publish_channel else False
-        channel.channel_link = channel_link
-        channel.primary_language = channel_info.primary_language 
-        channel.target_language = channel_info.target_language
-        channel.avatar_file_id = channel_info.avatar_file_id
-        channel.cover_image_file_id = channel_info.cover_image_file_id
-        await channel.save()
+        previous_version = channel.outline_version
+        if channel.published:
+            # Learners only ever see published snapshots; drafts are not versioned
+            await publish_outline_version(channel, revision)
+        else:
+            channel.outline_hash = outline_hash(channel.outline_content)
+        channel.outline_revision = revision
+        # $set instead of save(): never overwrite a content_revision bumped meanwhile, and never
+        # replace an outline built by a newer rebuild that finished first
+        result = await Channel.get_motor_collection().update_one({
+            "_id": channel.id,
+            "outline_revision": {"$not": {"$gt": revision}}
+        }, {"$set": {
+            field: getattr(channel, field) for field in REBUILT_FIELDS
+        }})
+        # Read the Channel again next time, whether or not the update won
+        forget_channel(channel_id, Channel)
+        superseded = not result.matched_count
+        if superseded and channel.published and channel.outline_version != previous_version:
+            # A newer rebuild (another worker, or publish_channel) finished first: withdraw the
+            # version published from this older tree so it never outranks the Channel's
+            if await discard_outline_version(channel_id, channel.outline_version, revision):
+                logger.debug("superseded outline version discarded", extra={
+                    "channel_id": channel_id, "version": channel.outline_version, "content_revision": revision
+                })
+        elif channel.outline_version != previous_version:
+            try:
+                pruned = await prune_outline_versions(channel_id)
+                if pruned:
+                    logger.debug("outline versions pruned", extra={"channel_id": channel_id, "deleted": pruned})
+            except Exception:
+                # Retention only; the next published edit prunes again
+                logger.exception("outline version pruning failed", extra={"channel_id": channel_id})
+        if superseded:
+            # Callers get the newer rebuild's outline, not this older one
+            channel = await load_channel(channel_id) or channel
+        # Every content.py write funnels through this rebuild; drop cached listings/outlines
+        await purge(channel_tag(channel_id), creator_tag(uid))
+        logger.debug("channel outline rebuilt", extra={"channel_id": channel_id, **stats})
         return channel
 
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        logger.exception("channel outline rebuild failed", extra={"channel_id": channel_id})
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def _rebuild_when_quiet(channel_id: str) -> None:
+    """Rebuild a dirty channel once its writes pause; loops while new writes keep arriving."""
+    try:
+        while channel_id in _dirty:
+            await asyncio.sleep(OUTLINE_REBUILD_DELAY)
+            _dirty.discard(channel_id)
+            # Own identity map: the task outlives the request that scheduled it
+            async with identity_scope():
+                await rebuild_outline(channel_id)
+    finally:
+        _rebuilds.pop(channel_id, None)
+
+
+async def rebuild_outline(channel_id: str) -> Optional[Channel]:
+    """
+    Rebuild the channel's outline as its owner; the deferred task has no request user, and content
+    writes are only accepted from the owner. A failure is logged and recorded in _failed so that
+    readers stop retrying it; the next content write retries.
+    """
+    revision = None
+    try:
+        channel = await load_channel(channel_id)
+        if channel is None:
+            # Deleted meanwhile
+            return None
+        revision = channel.content_revision
+        channel = await get_channel_content_outline_stats(channel_id, str(channel.user_id))
+    except Exception as e:
+        _failed[channel_id] = revision
+        logger.error("channel outline left stale", extra={
+            "channel_id": channel_id, "content_revision": revision, "reason": str(e)
+        })
+        return None
+    _failed.pop(channel_id, None)
+    return channel
+
+
+def request_outline_rebuild(channel_id: str) -> asyncio.Task:
+    """Coalesce a rebuild of the channel into the (single) pending/running one of this process."""
+    _dirty.add(channel_id)
+    task = _rebuilds.get(channel_id)
+    if task is None:
+        task = _rebuilds[channel_id] = asyncio.create_task(_rebuild_when_quiet(channel_id))
+    return task
+
+
+async def schedule_outline_rebuild(channel_id: str) -> None:
+    """
+    Mark the channel's outline dirty after a content write and return without waiting for it.
+    Writes within OUTLINE_REBUILD_DELAY of each other share one rebuild, and a channel never has
+    two rebuilds running in this process. Readers compare Channel.outline_revision with
+    Channel.content_revision to know whether the outline is current.
+    """
+    await Channel.find_one({"channel_id": channel_id}).update({"$inc": {"content_revision": 1}})
+    forget_channel(channel_id, Channel)
+    if OUTLINE_REBUILD_SYNC:
+        await rebuild_outline(channel_id)
+        return
+    request_outline_rebuild(channel_id)
+
+
+async def wait_for_outline(channel: Channel) -> Channel:
+    """
+    The channel with a current outline: waits for (or starts) the rebuild when it is stale. A
+    channel whose last rebuild failed at this revision is returned stale instead of failing again.
+    """
+    if channel.outline_hash and channel.outline_revision >= channel.content_revision:
+        return channel
+    if _failed.get(channel.channel_id) == channel.content_revision:
+        return channel
+    await asyncio.shield(request_outline_rebuild(channel.channel_id))
+    forget_channel(channel.channel_id, Channel)
+    return await load_channel(channel.channel_id) or channel
+
+
+async def resume_outline_rebuilds() -> int:
+    """Schedule rebuilds of channels left dirty by a previous process (e.g. a restart mid-burst)."""
+    count = 0
+    async for doc in Channel.get_motor_collection().find(
+        {"$expr": {"$gt": ["$content_revision", {"$ifNull": ["$outline_revision", 0]}]}},
+        {"channel_id": 1}
+    ):
+        request_outline_rebuild(doc["channel_id"])
+        count += 1
+    return count
+
+
+async def flush_outline_rebuilds() -> None:
+    """Let pending rebuilds finish (at shutdown)."""
+    if _rebuilds:
+        await asyncio.gather(*_rebuilds.values(), return_exceptions=True)
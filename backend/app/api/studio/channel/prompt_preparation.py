@@ -1,9 +1,14 @@
-import time
+import asyncio
 import json
 import os
-from openai import OpenAI
-from typing import Dict, Any, List, Union
+import random
+import httpx
+from openai import AsyncOpenAI
+from typing import AsyncIterator, Dict, Any, List, Union
 from app.models.channel import QuestionResponse, PromptResponse
+from app.utils.cache import ResponseCache, MISSING
+from app.utils.log import get_logger
+from app.api.studio.channel.templates import template_registry, QuestionTemplate
 
 # Load environment variables from .env file
 try:
@@ -18,7 +23,36 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 if not OPENAI_API_KEY:
     raise ValueError("OPENAI_API_KEY environment variable is not set")
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+# Point at a local fake LLM server for testing, e.g. OPENAI_BASE_URL=http://localhost:8089/v1
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o")
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "20"))
+# Concurrent completions across the whole worker
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))
+# Larger requests are split into sub-requests of this many questions, generated concurrently
+QUESTIONS_PER_REQUEST = int(os.getenv("OPENAI_QUESTIONS_PER_REQUEST", "5"))
+GENERATION_CACHE_TTL = int(os.getenv("GENERATION_CACHE_TTL", "3600"))
+RETRY_BASE_SECONDS = 0.5
+RETRY_MAX_SECONDS = 8
+
+# One client (and so one keep-alive connection pool) shared by every request in the worker
+client = AsyncOpenAI(
+    api_key=OPENAI_API_KEY,
+    base_url=OPENAI_BASE_URL,
+    http_client=httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=OPENAI_MAX_CONNECTIONS
+        ),
+        timeout=httpx.Timeout(120, connect=10)
+    )
+)
+_llm_slots = asyncio.Semaphore(OPENAI_MAX_CONCURRENCY)
+
+# Generated question sets keyed by (template_id, concept, difficulty, n)
+generated_questions_cache = ResponseCache('generated_questions', maxsize=512, ttl=GENERATION_CACHE_TTL)
+
+logger = get_logger(__name__)
 
 import re
 
@@ -31,83 +65,160 @@ def clean_json_text(raw_text: str) -> str:
     cleaned = re.sub(r"\s*```$", "", cleaned.strip())
     return cleaned
 
-def generate_questions_with_template(
+QUESTION_SYSTEM_MSG = (
+    "You are a question generator for an educational app. "
+    "ALWAYS output valid JSON matching the EXACT template. "
+    "Do NOT add any explanations or text outside the JSON."
+)
+
+async def backoff(attempt: int) -> None:
+    """Sleep with exponential backoff and jitter without blocking the event loop."""
+    delay = min(RETRY_BASE_SECONDS * 2 ** (attempt - 1), RETRY_MAX_SECONDS)
+    await asyncio.sleep(delay * random.uniform(0.5, 1))
+
+async def chat_completion(messages: List[Dict[str, str]], **kwargs) -> str:
+    async with _llm_slots:
+        response = await client.chat.completions.create(
+            model=OPENAI_MODEL,
+            messages=messages,
+            **kwargs
+        )
+    return response.choices[0].message.content.strip()
+
+def split_batches(num_questions: int) -> List[int]:
+    """Sizes of the concurrent sub-requests, e.g. 12 -> [5, 5, 2]."""
+    full, rest = divmod(num_questions, QUESTIONS_PER_REQUEST)
+    return [QUESTIONS_PER_REQUEST] * full + ([rest] if rest else [])
+
+async def generate_questions_with_template(
     concept_prompt: str,
     template_id: int,
     num_questions: int,
     difficulty: str,
     max_retries: int = 3
 ) -> list:
-    system_msg = (
-        "You are a question generator for an educational app. "
-        "ALWAYS output valid JSON matching the EXACT template. "
-        "Do NOT add any explanations or text outside the JSON."
-    )
+    """
+    Generate num_questions questions following a template.
+    Requests above QUESTIONS_PER_REQUEST are fanned out as concurrent sub-requests.
+    Results are cached per (template_id, concept, difficulty, n).
+    """
+    cache_key = (template_id, concept_prompt.strip(), difficulty, num_questions)
+    cached = await generated_questions_cache.get(cache_key)
+    if cached is not MISSING:
+        return cached
+
+    template = template_registry.get(template_id)
+
+    sizes = split_batches(num_questions)
+    batches = await asyncio.gather(*(
+        generate_question_batch(concept_prompt, template, size, difficulty, index, len(sizes), max_retries)
+        for index, size in enumerate(sizes)
+    ))
+    result = [question for batch in batches for question in batch]
+    return await generated_questions_cache.set(cache_key, result)
+
+async def iter_question_batches(
+    concept_prompt: str,
+    template_id: int,
+    num_questions: int,
+    difficulty: str,
+    max_retries: int = 3
+) -> AsyncIterator[list]:
+    """
+    Like generate_questions_with_template, but yields each validated sub-request as soon as
+    it completes. The full set is cached once every batch has arrived.
+    """
+    cache_key = (template_id, concept_prompt.strip(), difficulty, num_questions)
+    cached = await generated_questions_cache.get(cache_key)
+    if cached is not MISSING:
+        yield cached
+        return
 
-    with open("app/api/studio/channel/template.json", "r", encoding="utf-8") as f:
-        templates = json.load(f)
-    template = next((item for item in templates if item["id"] == template_id), None)
-    if template is None:
-        raise ValueError(f"Template with id {template_id} not found.")
+    template = template_registry.get(template_id)
+    sizes = split_batches(num_questions)
+    tasks = [
+        asyncio.create_task(
+            generate_question_batch(concept_prompt, template, size, difficulty, index, len(sizes), max_retries)
+        )
+        for index, size in enumerate(sizes)
+    ]
+    result = []
+    try:
+        for next_batch in asyncio.as_completed(tasks):
+            batch = await next_batch
+            result.extend(batch)
+            yield batch
+    finally:
+        # A failed batch or a consumer that stopped early must not leave completions running
+        for task in tasks:
+            task.cancel()
+    await generated_questions_cache.set(cache_key, result)
 
+async def generate_question_batch(
+    concept_prompt: str,
+    template: QuestionTemplate,
+    num_questions: int,
+    difficulty: str,
+    batch_index: int = 0,
+    batch_count: int = 1,
+    max_retries: int = 3
+) -> list:
+    variation = (
+        f"This is batch {batch_index + 1} of {batch_count} generated in parallel; "
+        "make these questions distinct from the other batches."
+        if batch_count > 1 else ""
+    )
     user_msg = f"""
     Concept: {concept_prompt}
     Difficulty: {difficulty}
     Number of questions: {num_questions}
-    Follow this JSON template exactly: {template}
+    Follow this JSON template exactly: {template.prompt_fragment}
     Return a JSON array of {num_questions} questions.
+    {variation}
     """
     attempt = 0
 
     while attempt < max_retries:
         attempt += 1
-        print(f"Attempt #{attempt}...")
+        logger.debug("generating questions", extra={
+            "template_id": template.id, "batch": batch_index, "n": num_questions, "attempt": attempt
+        })
 
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": system_msg},
+        raw_text = await chat_completion(
+            [
+                {"role": "system", "content": QUESTION_SYSTEM_MSG},
                 {"role": "user", "content": user_msg}
             ],
             temperature=0.3
         )
 
-        raw_text = response.choices[0].message.content.strip()
-
         try:
             cleaned_text = clean_json_text(raw_text)
             result = json.loads(cleaned_text)
         except json.JSONDecodeError:
-            print("Invalid JSON returned. Retrying...")
-            time.sleep(1)
+            logger.info("invalid JSON from model, retrying", extra={"batch": batch_index, "attempt": attempt})
+            await backoff(attempt)
             continue
 
         if not isinstance(result, list) or len(result) != num_questions:
-            print("Output does not match required number of questions. Retrying...")
-            time.sleep(1)
+            logger.info("wrong number of questions from model, retrying", extra={"batch": batch_index, "attempt": attempt})
+            await backoff(attempt)
+            continue
+
+        errors = [error for question in result for error in template.validate(question)]
+        if errors:
+            logger.info("questions do not match the template schema, retrying", extra={
+                "template_id": template.id, "batch": batch_index, "attempt": attempt, "errors": errors[:5]
+            })
+            await backoff(attempt)
             continue
 
         return result
 
     raise ValueError(f"Failed to generate valid output after {max_retries} attempts.")
 
-def generate_text_prompt(
-    text: str,
-    context_type: str,
-    max_retries: int = 3
-) -> str:
-    """
-    Revise text grammatically and contextually based on where it will be used.
-    
-    Args:
-        text: The original text to be revised
-        context_type: Where the text will be used ("lesson", "activity", "unit", "section")
-        max_retries: Maximum number of retry attempts
-        
-    Returns:
-        String containing the revised text
-    """
-    
+def revision_messages(text: str, context_type: str) -> List[Dict[str, str]]:
+    """Chat messages asking for a revision of `text` for the given context."""
     context_guidelines = {
         "lesson": {
             "tone": "instructional and engaging",
@@ -173,29 +284,46 @@ def generate_text_prompt(
     
     Return only the revised text:
     """
+    return [
+        {"role": "system", "content": system_msg},
+        {"role": "user", "content": user_msg}
+    ]
+
+async def generate_text_prompt(
+    text: str,
+    context_type: str,
+    max_retries: int = 3
+) -> str:
+    """
+    Revise text grammatically and contextually based on where it will be used.
     
+    Args:
+        text: The original text to be revised
+        context_type: Where the text will be used ("lesson", "activity", "unit", "section")
+        max_retries: Maximum number of retry attempts
+        
+    Returns:
+        String containing the revised text
+    """
+
+    messages = revision_messages(text, context_type)
+
     attempt = 0
     while attempt < max_retries:
         attempt += 1
-        print(f"Revising {context_type} text - Attempt #{attempt}...")
+        logger.debug("revising text", extra={"context_type": context_type, "attempt": attempt})
         
         try:
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": system_msg},
-                    {"role": "user", "content": user_msg}
-                ],
+            revised_text = await chat_completion(
+                messages,
                 temperature=0.3,
                 max_tokens=1000
             )
             
-            revised_text = response.choices[0].message.content.strip()
-            
             # Basic validation - ensure we got meaningful content
             if len(revised_text) < 10:
-                print("Revised text too short. Retrying...")
-                time.sleep(1)
+                logger.info("revised text too short, retrying", extra={"attempt": attempt})
+                await backoff(attempt)
                 continue
             
             # Remove any quotation marks that might wrap the response
@@ -204,15 +332,37 @@ def generate_text_prompt(
             return revised_text
             
         except Exception as e:
-            print(f"Error on attempt {attempt}: {str(e)}")
+            logger.warning("text revision failed", extra={"attempt": attempt, "reason": str(e)})
             if attempt < max_retries:
-                time.sleep(1)
+                await backoff(attempt)
                 continue
             else:
                 raise
     
     raise ValueError(f"Failed to revise {context_type} text after {max_retries} attempts.")
 
+async def stream_text_prompt(text: str, context_type: str) -> AsyncIterator[str]:
+    """
+    generate_text_prompt as a stream of content deltas, without retries (tokens are already
+    with the client). Closing the iterator, e.g. when the client disconnects, aborts the
+    completion upstream.
+    """
+    messages = revision_messages(text, context_type)
+    async with _llm_slots:
+        stream = await client.chat.completions.create(
+            model=OPENAI_MODEL,
+            messages=messages,
+            temperature=0.3,
+            max_tokens=1000,
+            stream=True
+        )
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            await stream.response.aclose()
+
 # res = generate_questions_with_template(
 #     concept_prompt = "give questions about orther food in restaurant, should point out the role of present perfect and future perfect grammer",
 #     # concept_prompt = "concept of the question is about the weather",
@@ -1,5 +1,6 @@
-from fastapi import APIRouter, Response, Depends, Path, Body, HTTPException
-from typing import List, Dict, Any
+from fastapi import APIRouter, Request, Response, Depends, Path, Body, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import List, Dict, Any, Literal
 from app.utils.user import get_user_id
 from app.models.channel import (
     ChannelInfoRequest, ChannelInfoResponse,
@@ -15,9 +16,27 @@ from app.models.channel import (
 )
 from beanie import PydanticObjectId
 from app.api.studio.channel.middlewares import get_channel_content_outline_stats
+from app.services.channel_repository import (
+    load_channel, load_channel_info, load_owned_channel, load_owned_channel_info, load_publish_channel,
+    write_through
+)
+from app.services.dependencies import get_outline_repository
+from app.services.outline_repository import OutlineRepository
+from app.utils.cache import ResponseCache, MISSING, purge, channel_tag, creator_tag
+from app.utils.outline import activity_percentages, outline_hash
+from app.utils.jobs import job_handler, JobContext, submit_job
+from app.models.job import JobResponse
+from app.api.studio.channel.clone import clone_channel
+from app.api.studio.channel.cascade import delete_channel_cascade, schedule_channel_sweep
+from app.api.studio.channel.transfer import export_ndjson, export_tar, import_channel
 
 api = APIRouter()
 
+# Pricing reads, tagged with channel_tag so every write below drops them
+tiers_cache = ResponseCache('tiers')
+coupons_cache = ResponseCache('coupons')
+free_access_cache = ResponseCache('free_access')
+
 # -----------------
 # SETTINGS APIs
 # -----------------
@@ -71,6 +90,17 @@ async def create_channel(
     # The field_validator will automatically convert ObjectId to string
     return ChannelInfoResponse(**channel_info.model_dump())
 
+async def get_duplicable_channel(channel_id: str, user_id: str) -> ChannelInfo:
+    """The source ChannelInfo if the channel exists and belongs to user_id, else 404."""
+    source_channel_info = await load_channel_info(channel_id)
+    if not source_channel_info:
+        raise HTTPException(status_code=404, detail="Source channel not found")
+
+    source_channel = await load_owned_channel(channel_id, user_id)
+    if not source_channel:
+        raise HTTPException(status_code=404, detail="Source channel not found or access denied")
+    return source_channel_info
+
 @api.post('/{channel_id}/duplicate/', response_model=ChannelInfoResponse)
 async def duplicate_channel(
     channel_id: str,
@@ -79,285 +109,66 @@ async def duplicate_channel(
     """
     Duplicate an existing channel with all its content, structure, and settings.
     Creates a complete copy including outline structure, content, and settings.
+    Large channels should use POST /{channel_id}/duplicate/jobs/ instead.
     """
-    # Verify source channel exists and belongs to user
-    source_channel_info = await ChannelInfo.find_one({
-        "_id": PydanticObjectId(channel_id)
-    })
-    if not source_channel_info:
-        raise HTTPException(status_code=404, detail="Source channel not found")
-    
-    source_channel = await Channel.find_one({
-        "channel_id": channel_id,
-        "user_id": PydanticObjectId(user_id)
-    })
-    if not source_channel:
-        raise HTTPException(status_code=404, detail="Source channel not found or access denied")
+    source_channel_info = await get_duplicable_channel(channel_id, user_id)
+    new_channel_info = await clone_channel(source_channel_info, user_id)
+    return ChannelInfoResponse(**new_channel_info.model_dump())
 
-    # Create new channel info with modified name
-    new_channel_info = ChannelInfo(
-        user_id=user_id,
-        name=f"Copy of {source_channel_info.name}",
-        description=source_channel_info.description,
-        primary_language=source_channel_info.primary_language,
-        target_language=source_channel_info.target_language,
-        avatar_file_id=source_channel_info.avatar_file_id,
-        cover_image_file_id=source_channel_info.cover_image_file_id
-    )
-    await new_channel_info.insert()
-    new_channel_id = str(new_channel_info.id)
-
-    # Create new channel record
-    new_channel = Channel(
-        name=new_channel_info.name,
-        description=new_channel_info.description,
-        user_id=PydanticObjectId(user_id),
-        channel_id=new_channel_id,
-        outline_content={"sections": []},  # Will be populated during duplication
-        section_count=source_channel.section_count,
-        unit_count=source_channel.unit_count,
-        activity_count=source_channel.activity_count,
-        lesson_count=source_channel.lesson_count,
-        quiz_count=source_channel.quiz_count,
-        question_count=source_channel.question_count,
-        total_lesson_quiz_count=source_channel.total_lesson_quiz_count,
-        primary_language=source_channel_info.primary_language,
-        target_language=source_channel_info.target_language,
-        avatar_file_id=source_channel_info.avatar_file_id,
-        cover_image_file_id=source_channel_info.cover_image_file_id,
-        published=False,  # New duplicate starts unpublished
-        channel_link=None
-    )
-    await new_channel.insert()
+@job_handler('duplicate_channel')
+async def run_duplicate_channel_job(ctx: JobContext):
+    """Clone the channel, reporting one progress step per cloned collection."""
+    source_channel_info = await get_duplicable_channel(ctx.params["channel_id"], ctx.job.user_id)
+    new_channel_info = await clone_channel(source_channel_info, ctx.job.user_id, progress=ctx.set_progress)
+    return ChannelInfoResponse(**new_channel_info.model_dump())
 
-    # Create new publish channel record (default to unpublished)
-    new_publish_channel = PublishChannel(
-        user_id=user_id,
-        channel_id=new_channel_id,
-        published=False,
-        channel_link=None
-    )
-    await new_publish_channel.insert()
+@api.post('/{channel_id}/duplicate/jobs/', status_code=202, response_model=JobResponse)
+async def submit_duplicate_channel_job(
+    channel_id: str,
+    user_id: str = Depends(get_user_id)
+) -> JobResponse:
+    """
+    Queue a channel duplication as a background job and return it immediately.
+    Poll GET /studio/channel/jobs/{job_id}/ (or stream it); the job result is the new channel info.
+    """
+    await get_duplicable_channel(channel_id, user_id)
+    job = await submit_job('duplicate_channel', user_id, {"channel_id": channel_id})
+    return JobResponse(**job.model_dump())
 
-    # Duplicate outline structure and content
-    outline_content = source_channel.outline_content.get("sections", [])
-    new_outline_content = []
-    
-    for section in outline_content:
-        # Create new section outline
-        source_section_outline = await SectionOutline.find_one({"_id": PydanticObjectId(section["id"])})
-        if source_section_outline:
-            new_section_outline = SectionOutline(
-                channel_id=new_channel_id,
-                name=source_section_outline.name,
-                order=source_section_outline.order
-            )
-            await new_section_outline.insert()
-            new_section_id = str(new_section_outline.id)
-            
-            # Create new section content
-            source_section_content = await Section.find_one({"section_outline_id": section["id"]})
-            if source_section_content:
-                new_section_content = Section(
-                    section_outline_id=new_section_id,
-                    description=source_section_content.description,
-                    url=source_section_content.url
-                )
-                await new_section_content.insert()
-            
-            # Duplicate units
-            new_units = []
-            for unit in section.get("units", []):
-                source_unit_outline = await UnitOutline.find_one({"_id": PydanticObjectId(unit["id"])})
-                if source_unit_outline:
-                    new_unit_outline = UnitOutline(
-                        section_outline_id=new_section_id,
-                        name=source_unit_outline.name,
-                        order=source_unit_outline.order
-                    )
-                    await new_unit_outline.insert()
-                    new_unit_id = str(new_unit_outline.id)
-                    
-                    # Create new unit content
-                    source_unit_content = await Unit.find_one({"unit_outline_id": unit["id"]})
-                    if source_unit_content:
-                        new_unit_content = Unit(
-                            unit_outline_id=new_unit_id,
-                            description=source_unit_content.description,
-                            url=source_unit_content.url
-                        )
-                        await new_unit_content.insert()
-                    
-                    # Duplicate activities
-                    new_activities = []
-                    for activity in unit.get("activities", []):
-                        source_activity_outline = await ActivityOutline.find_one({"_id": PydanticObjectId(activity["id"])})
-                        if source_activity_outline:
-                            new_activity_outline = ActivityOutline(
-                                unit_outline_id=new_unit_id,
-                                name=source_activity_outline.name,
-                                order=source_activity_outline.order,
-                                count=source_activity_outline.lesson_quiz_count,
-                                percentage=source_activity_outline.percentage
-                            )
-                            await new_activity_outline.insert()
-                            new_activity_id = str(new_activity_outline.id)
-                            
-                            # Create new activity content
-                            source_activity_content = await Activity.find_one({"activity_outline_id": activity["id"]})
-                            if source_activity_content:
-                                new_activity_content = Activity(
-                                    activity_outline_id=new_activity_id,
-                                    description=source_activity_content.description,
-                                    url=source_activity_content.url,
-                                    difficulty_level=source_activity_content.difficulty_level,
-                                    is_launched=source_activity_content.is_launched
-                                )
-                                await new_activity_content.insert()
-                            
-                            # Duplicate lessons and quizzes
-                            new_content = []
-                            for content in activity.get("content", []):
-                                if content.get("type") == "lesson":
-                                    # Duplicate lesson
-                                    source_lesson_outline = await LessonOutline.find_one({"_id": PydanticObjectId(content["id"])})
-                                    if source_lesson_outline:
-                                        new_lesson_outline = LessonOutline(
-                                            activity_outline_id=new_activity_id,
-                                            name=source_lesson_outline.name,
-                                            order=source_lesson_outline.order,
-                                            count=source_lesson_outline.lesson_count
-                                        )
-                                        await new_lesson_outline.insert()
-                                        new_lesson_outline_id = str(new_lesson_outline.id)
-                                        
-                                        # Create lesson content
-                                        source_lesson = await Lesson.find_one({"lesson_outline_id": content["id"]})
-                                        if source_lesson:
-                                            new_lesson = Lesson(
-                                                lesson_outline_id=new_lesson_outline_id,
-                                                lesson_type=source_lesson.lesson_type,
-                                                text=source_lesson.text,
-                                                file_ids=source_lesson.file_ids,
-                                                question_lesson=source_lesson.question_lesson,
-                                                order=source_lesson.order,
-                                                is_launched=source_lesson.is_launched,
-                                                is_free=source_lesson.is_free
-                                            )
-                                            await new_lesson.insert()
-                                        
-                                        new_content.append({
-                                            "id": new_lesson_outline_id,
-                                            "name": content["name"],
-                                            "order": content["order"],
-                                            "count": content["count"],
-                                            "type": "lesson"
-                                        })
-                                
-                                elif content.get("type") == "quiz":
-                                    # Duplicate quiz
-                                    source_quiz_outline = await QuizOutline.find_one({"_id": PydanticObjectId(content["id"])})
-                                    if source_quiz_outline:
-                                        new_quiz_outline = QuizOutline(
-                                            activity_outline_id=new_activity_id,
-                                            name=source_quiz_outline.name,
-                                            order=source_quiz_outline.order,
-                                            count=source_quiz_outline.quiz_count,
-                                            is_launched=source_quiz_outline.is_launched,
-                                            is_free=source_quiz_outline.is_free
-                                        )
-                                        await new_quiz_outline.insert()
-                                        new_quiz_outline_id = str(new_quiz_outline.id)
-                                        
-                                        # Duplicate quiz questions
-                                        source_questions = await Question.find({"quiz_outline_id": content["id"]}).to_list()
-                                        for source_question in source_questions:
-                                            new_question = Question(
-                                                quiz_outline_id=new_quiz_outline_id,
-                                                time_limit=source_question.time_limit,
-                                                points=source_question.points,
-                                                template=source_question.template,
-                                                generated_question=source_question.generated_question,
-                                                url=source_question.url,
-                                                check_function=source_question.check_function,
-                                                order=source_question.order,
-                                                is_accepted=source_question.is_accepted
-                                            )
-                                            await new_question.insert()
-                                        
-                                        new_content.append({
-                                            "id": new_quiz_outline_id,
-                                            "name": content["name"],
-                                            "order": content["order"],
-                                            "count": content["count"],
-                                            "type": "quiz"
-                                        })
-                            
-                            new_activities.append({
-                                "id": new_activity_id,
-                                "name": activity["name"],
-                                "order": activity["order"],
-                                "content": new_content
-                            })
-                    
-                    new_units.append({
-                        "id": new_unit_id,
-                        "name": unit["name"],
-                        "order": unit["order"],
-                        "activities": new_activities
-                    })
-            
-            new_outline_content.append({
-                "id": new_section_id,
-                "name": section["name"],
-                "order": section["order"],
-                "units": new_units
-            })
-    
-    # Update new channel with duplicated outline content
-    new_channel.outline_content = {"sections": new_outline_content}
-    await new_channel.save()
-
-    # Duplicate settings
-    # Duplicate FreeAccess settings
-    source_free_access = await FreeAccess.find_one({"channel_id": channel_id})
-    if source_free_access:
-        new_free_access = FreeAccess(
-            channel_id=new_channel_id,
-            percentage=source_free_access.percentage,
-            precentage_outline=source_free_access.precentage_outline,
-            free_activities=source_free_access.free_activities
-        )
-        await new_free_access.insert()
-
-    # Duplicate Tiers
-    source_tiers = await Tier.find({"channel_id": channel_id}).to_list()
-    for source_tier in source_tiers:
-        new_tier = Tier(
-            channel_id=new_channel_id,
-            name=source_tier.name,
-            price=source_tier.price,
-            capacity=source_tier.capacity,
-            billing_cycle=source_tier.billing_cycle,
-            features=source_tier.features
-        )
-        await new_tier.insert()
-
-    # Duplicate Coupons
-    source_coupons = await Coupon.find({"channel_id": channel_id}).to_list()
-    for source_coupon in source_coupons:
-        new_coupon = Coupon(
-            channel_id=new_channel_id,
-            code=f"COPY_{source_coupon.code}",  # Prefix to avoid conflicts
-            discount_type=source_coupon.discount_type,
-            discount_value=source_coupon.discount_value,
-            max_uses=source_coupon.max_uses,
-            expires_at=source_coupon.expires_at,
-            is_active=source_coupon.is_active
-        )
-        await new_coupon.insert()
+@api.get('/{channel_id}/export/')
+async def export_channel(
+    channel_id: str,
+    format: Literal['ndjson', 'tar'] = Query('ndjson', description="ndjson, or tar (NDJSON parts plus one member per file)"),
+    include_files: bool = Query(False, description="Also export the referenced gallery files' contents"),
+    user_id: str = Depends(get_user_id)
+) -> StreamingResponse:
+    """
+    Stream a backup of the channel with all of its outline, content and settings documents
+    (and referenced file metadata). Documents are read with cursors and written as they arrive.
+    Restore it, here or in another environment, with POST /import/.
+    """
+    await get_duplicable_channel(channel_id, user_id)
+    if format == 'tar':
+        body, media_type = export_tar(channel_id, user_id, include_files), 'application/x-tar'
+    else:
+        body, media_type = export_ndjson(channel_id, user_id, include_files), 'application/x-ndjson'
+    return StreamingResponse(body, media_type=media_type, headers={
+        'Content-Disposition': f'attachment; filename="channel-{channel_id}.{format}"'
+    })
 
-    return ChannelInfoResponse(**new_channel_info.model_dump())
+@api.post('/import/', response_model=ChannelInfoResponse)
+async def import_channel_export(
+    request: Request,
+    user_id: str = Depends(get_user_id)
+) -> ChannelInfoResponse:
+    """
+    Create a new channel from an export (NDJSON, or tar with Content-Type: application/x-tar).
+    The body is parsed while it streams in and written with insert_many batches under new ids;
+    the outline is rebuilt once. The imported channel starts unpublished.
+    """
+    tar = 'tar' in request.headers.get('content-type', '')
+    channel_info = await import_channel(user_id, request.stream(), tar=tar)
+    return ChannelInfoResponse(**channel_info.model_dump())
 
 @api.patch('/{channel_id}/publish/', response_model=PublishChannelResponse)
 async def publish_channel(
@@ -369,16 +180,12 @@ async def publish_channel(
     Publish or unpublish a channel by updating the 'published' field and channel_link.
     """
     # Verify channel exists and belongs to user
-    channel_info = await ChannelInfo.find_one({
-        "_id": PydanticObjectId(channel_id)
-    })
+    channel_info = await load_owned_channel_info(channel_id, uid)
     if not channel_info:
         raise HTTPException(status_code=404, detail="Channel not found")
     print(11111111, channel_info)
     # Find or create publish channel record
-    publish_channel = await PublishChannel.find_one({
-        "channel_id": channel_id
-    })
+    publish_channel = await load_publish_channel(channel_id)
     print(22222222, publish_channel)
     if not publish_channel:
         # Create new publish channel record if doesn't exist
@@ -394,9 +201,12 @@ async def publish_channel(
         # Update existing publish channel record
         update_data = payload.model_dump(exclude_unset=True)
         await publish_channel.update({"$set": update_data})
-        publish_channel = await PublishChannel.find_one({"channel_id": channel_id})
+        publish_channel = await load_publish_channel(channel_id)
 
+    # Before the rebuild: it versions the outline from Channel.published
+    await write_through(channel_id, publish_channel=publish_channel)
     await get_channel_content_outline_stats(channel_id, uid)
+    await purge(channel_tag(channel_id), creator_tag(uid))
 
     return PublishChannelResponse(**publish_channel.model_dump())
 
@@ -409,17 +219,13 @@ async def get_publish_channel(
     Get publish channel information (published status and channel link).
     """
     # Verify channel exists
-    channel_info = await ChannelInfo.find_one({
-        "_id": PydanticObjectId(channel_id)
-    })
+    channel_info = await load_channel_info(channel_id)
     
     if not channel_info:
         raise HTTPException(status_code=404, detail="Channel not found")
     
     # Find publish channel record
-    publish_channel = await PublishChannel.find_one({
-        "channel_id": channel_id
-    })
+    publish_channel = await load_publish_channel(channel_id)
     
     if not publish_channel:
         # Create default publish channel record if doesn't exist
@@ -442,18 +248,24 @@ async def update_channel_info(
     """
     Update an existing channel.
     """
-    channel = await ChannelInfo.find_one({
-            "_id": PydanticObjectId(channel_id),
-            "user_id": user_id
-        })
+    channel = await load_owned_channel_info(channel_id, user_id)
     if not channel:
         raise HTTPException(status_code=404, detail="Channel not found")
         
     update_data = payload.dict(exclude_unset=True)
     await channel.update({"$set": update_data})
+    await write_through(channel_id, channel_info=channel)
+    await purge(channel_tag(channel_id))
     
-    return await ChannelInfo.get(channel_id)
+    return await load_channel_info(channel_id)
+
 
+async def get_owned_channel_info(channel_id: str, user_id: str) -> ChannelInfo:
+    """The ChannelInfo if it belongs to user_id, else 404."""
+    channel_info = await load_owned_channel_info(channel_id, user_id)
+    if not channel_info:
+        raise HTTPException(status_code=404, detail="Channel not found")
+    return channel_info
 
 @api.delete('/{channel_id}/info/')
 async def delete_channel(
@@ -461,67 +273,42 @@ async def delete_channel(
     user_id: str = Depends(get_user_id)
 ):
     """
-    Delete a channel and all related content and outline structure.
+    Delete a channel and all related content and outline structure,
+    its settings, publish records, outline versions and learner progress.
+    Large channels should use POST /{channel_id}/delete/jobs/ instead.
     """
-    # Find channel info and verify ownership
-    channel_info = await ChannelInfo.find_one({
-        "_id": PydanticObjectId(channel_id),
-        "user_id": user_id
-    })
-    
-    if not channel_info:
-        raise HTTPException(status_code=404, detail="Channel not found")
+    # Verify ownership; ChannelInfo is deleted last, so a failed delete can be retried
+    await get_owned_channel_info(channel_id, user_id)
 
-    # Find associated channel to get outline
-    channel = await Channel.find_one({"channel_id": channel_id})
-    if not channel:
-        raise HTTPException(status_code=404, detail="Channel not found")
-
-    # Get outline structure
-    outline = channel.outline_content.get("sections", [])
-    
-    # Delete all outline and content based on outline structure
-    for section in outline:
-        section_id = section.get("id")
-        if section_id:
-            await SectionOutline.find_one({"_id": PydanticObjectId(section_id)}).delete()
-            await Section.find_one({"section_outline_id": section_id}).delete()
-            
-        for unit in section.get("units", []):
-            unit_id = unit.get("id")
-            if unit_id:
-                await UnitOutline.find_one({"_id": PydanticObjectId(unit_id)}).delete()
-                await Unit.find_one({"unit_outline_id": unit_id}).delete()
-                
-            for activity in unit.get("activities", []):
-                activity_id = activity.get("id") 
-                if activity_id:
-                    await ActivityOutline.find_one({"_id": PydanticObjectId(activity_id)}).delete()
-                    await Activity.find_one({"activity_outline_id": activity_id}).delete()
-                
-                for content in activity.get("content", []):
-                    content_id = content.get("id")
-                    if content_id:
-                        # Delete lesson/quiz outline and content based on type
-                        if "lesson" in content_id:
-                            await LessonOutline.find_one({"_id": PydanticObjectId(content_id)}).delete()
-                            await Lesson.find_one({"lesson_outline_id": content_id}).delete()
-                        elif "quiz" in content_id:
-                            await QuizOutline.find_one({"_id": PydanticObjectId(content_id)}).delete()
-                            # Delete associated questions
-                            await Question.find_many({"quiz_outline_id": content_id}).delete()
-
-    # Delete the publish channel record
-    publish_channel = await PublishChannel.find_one({"channel_id": channel_id})
-    if publish_channel:
-        await publish_channel.delete()
-
-    # Delete the channel info and channel documents
-    await channel_info.delete()
-    await channel.delete()
+    await delete_channel_cascade(channel_id)
+    await purge(channel_tag(channel_id), creator_tag(user_id))
+    await schedule_channel_sweep(channel_id, user_id)
 
     return {"message": "Channel and all related content deleted successfully"}
 
+@job_handler('delete_channel')
+async def run_delete_channel_job(ctx: JobContext):
+    """Cascade-delete the channel, reporting one progress step per collection."""
+    channel_id = ctx.params["channel_id"]
+    await get_owned_channel_info(channel_id, ctx.job.user_id)
+    counts = await delete_channel_cascade(channel_id, progress=ctx.set_progress)
+    await purge(channel_tag(channel_id), creator_tag(ctx.job.user_id))
+    await schedule_channel_sweep(channel_id, ctx.job.user_id)
+    return counts
+
+@api.post('/{channel_id}/delete/jobs/', status_code=202, response_model=JobResponse)
+async def submit_delete_channel_job(
+    channel_id: str,
+    user_id: str = Depends(get_user_id)
+) -> JobResponse:
+    """
+    Queue a channel deletion as a background job and return it immediately.
+    Poll GET /studio/channel/jobs/{job_id}/ (or stream it); the job result has the deleted counts.
+    """
+    await get_owned_channel_info(channel_id, user_id)
+    job = await submit_job('delete_channel', user_id, {"channel_id": channel_id})
+    return JobResponse(**job.model_dump())
+
 ### Instead of this endpoint use get channel by id endpoint
 
 
@@ -554,10 +341,7 @@ async def create_tier(
     """
     print(f"Creating tier for channel: {channel_id}")
     # Verify channel exists and belongs to user
-    channel = await ChannelInfo.find_one({
-            "_id": PydanticObjectId(channel_id),
-            "user_id": user_id
-        })
+    channel = await load_owned_channel_info(channel_id, user_id)
     if not channel:
         raise HTTPException(status_code=404, detail="Channel not found")
 
@@ -571,6 +355,7 @@ async def create_tier(
         features=payload.features
     )
     await tier.insert()
+    await purge(channel_tag(channel_id))
     return TierResponse(**tier.model_dump())
 
 @api.get('/{channel_id}/tier/', response_model=List[TierResponse])
@@ -581,17 +366,23 @@ async def get_all_tiers(
     """
     Get all tiers for a channel.
     """
+    # Keyed by user too, so a cached list is only served to the channel owner
+    cached = await tiers_cache.get((channel_id, user_id))
+    if cached is not MISSING:
+        return cached
+
     # Verify channel exists and belongs to user
-    channel = await ChannelInfo.find_one({
-            "_id": PydanticObjectId(channel_id),
-            "user_id": user_id
-        })
+    channel = await load_owned_channel_info(channel_id, user_id)
     if not channel:
         raise HTTPException(status_code=404, detail="Channel not found")
 
     # Get all tiers for the channel
     tiers = await Tier.find({"channel_id": channel_id}).to_list()
-    return [TierResponse(**tier.model_dump()) for tier in tiers]
+    return await tiers_cache.set(
+        (channel_id, user_id),
+        [TierResponse(**tier.model_dump()) for tier in tiers],
+        tags=[channel_tag(channel_id)]
+    )
 
 @api.put('/{channel_id}/tier/{tier_id}/', response_model=TierResponse)
 async def update_tier(
@@ -615,6 +406,7 @@ async def update_tier(
     # Update tier fields
     update_data = payload.model_dump(exclude_unset=True)
     await tier.update({"$set": update_data})
+    await purge(channel_tag(channel_id))
 
     # Return updated tier by fetching it again to ensure we have the latest data
     updated_tier = await Tier.get(PydanticObjectId(tier_id))
@@ -641,6 +433,7 @@ async def delete_tier(
         raise HTTPException(status_code=404, detail="Tier not found")
 
     await tier.delete()
+    await purge(channel_tag(channel_id))
     return {"message": "Tier deleted successfully"}
 
 ##
@@ -649,78 +442,56 @@ async def delete_tier(
 @api.get('/{channel_id}/free-access/percentage/', response_model=FreeAccessResponse)
 async def get_activity_percentage(
     channel_id: str,
-    user_id: str = Depends(get_user_id)
+    user_id: str = Depends(get_user_id),
+    repo: OutlineRepository = Depends(get_outline_repository)
 ):
     """
     Calculate activity percentages based on channel's outline_content and total_lesson_quiz_count.
-    Updates activity outlines with counts and percentages, and updates FreeAccess percentage_outline.
+    The result is stored in FreeAccess.precentage_outline together with the outline hash it was
+    computed from, so this is a plain read until the outline changes. On recompute the activity
+    outlines' counts and percentages are written with a single bulk_write.
     """
     try:
-        # Verify channel exists and belongs to user
-        channel = await Channel.find_one({
-            "channel_id": channel_id,
-        })
+        # Only the hash is needed to know whether the stored percentages are current
+        channel = await Channel.get_motor_collection().find_one(
+            {"channel_id": channel_id}, {"outline_hash": 1}
+        )
         if not channel:
             raise HTTPException(status_code=404, detail="Channel not found")
-        # Get outline content from channel
-        outline_content = channel.outline_content.get("sections", [])
-        total_content = channel.total_lesson_quiz_count
-        activity_percentages = {}
-        current_count = 0
-        # print('total_content', total_content)
-        # Process each section, unit, and activity
-        for section in outline_content:
-            for unit in section.get("units", []):
-                for activity in unit.get("activities", []):
-                    # Calculate content count for this activity by iterating through content
-                    content = activity.get("content", [])
-                    activity_count = 0
-                    for item in content:
-                        if isinstance(item, dict):
-                            activity_count += item.get("count", 1)
-                        else:
-                            activity_count += 1
-                        
-                    current_count += activity_count
-
-                    # Calculate percentage based on position
-                    percentage = int((current_count / total_content) * 100) if total_content > 0 else 0
-
-                    # Update ActivityOutline with count and percentage
-                    activity_outline = await ActivityOutline.find_one({"_id": PydanticObjectId(activity["id"])})
-                    if activity_outline:
-                        await activity_outline.update({
-                            "$set": {
-                                "count": activity_count,
-                                "percentage": percentage
-                            }
-                        })
-
-                    # Store in percentage outline
-                    activity_percentages[str(activity["id"])] = {
-                        "name": activity["name"],
-                        "order": activity["order"],
-                        "percentage": percentage,
-                        "count": activity_count
-                    }
 
-        # Get or create FreeAccess document
         free_access = await FreeAccess.find_one({"channel_id": channel_id})
+        if free_access and channel.get("outline_hash") and free_access.outline_hash == channel["outline_hash"]:
+            return FreeAccessResponse(**free_access.model_dump())
+
+        channel = await load_channel(channel_id)
+        if not channel:
+            raise HTTPException(status_code=404, detail="Channel not found")
+        percentages = activity_percentages(channel.outline_content, channel.total_lesson_quiz_count)
+
+        await repo.set_fields(ActivityOutline, {
+            activity_id: {"lesson_quiz_count": value["count"], "percentage": value["percentage"]}
+            for activity_id, value in percentages.items()
+        })
+
+        # Get or create FreeAccess document
         if not free_access:
             free_access = FreeAccess(
                 channel_id=channel_id,
                 percentage=0,  # Default percentage
-                precentage_outline=activity_percentages,
+                precentage_outline=percentages,
                 free_activities=[]  # Default empty list
             )
         else:
             # Update only the percentage outline
-            free_access.precentage_outline = activity_percentages
+            free_access.precentage_outline = percentages
+        free_access.outline_hash = channel.outline_hash or outline_hash(channel.outline_content)
 
         await free_access.save()
-        print(free_access)
+        await purge(channel_tag(channel_id))
         return FreeAccessResponse(**free_access.model_dump())
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -736,10 +507,7 @@ async def update_free_access(
     """
     try:
         # Verify channel exists and belongs to user
-        channel = await Channel.find_one({
-            "channel_id": channel_id,
-            "user_id": PydanticObjectId(user_id)
-        })
+        channel = await load_owned_channel(channel_id, user_id)
         if not channel:
             raise HTTPException(status_code=404, detail="Channel not found")
 
@@ -757,6 +525,7 @@ async def update_free_access(
             free_access.free_activities = payload.free_activities
 
         await free_access.save()
+        await purge(channel_tag(channel_id))
         return FreeAccessResponse(**free_access.model_dump())
 
     except Exception as e:
@@ -769,6 +538,10 @@ async def get_free_access(channel_id: str):
     Get free access settings.
     """
     try:
+        cached = await free_access_cache.get(channel_id)
+        if cached is not MISSING:
+            return cached
+
         # Get FreeAccess document
         free_access = await FreeAccess.find_one({"channel_id": channel_id})
         if not free_access:
@@ -781,7 +554,11 @@ async def get_free_access(channel_id: str):
             )
             await free_access.save()
 
-        return FreeAccessResponse(**free_access.model_dump())
+        return await free_access_cache.set(
+            channel_id,
+            FreeAccessResponse(**free_access.model_dump()),
+            tags=[channel_tag(channel_id)]
+        )
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -798,9 +575,7 @@ async def create_coupon(channel_id: str, payload: CouponRequest):
     """
     try:
         # Verify channel exists
-        channel = await ChannelInfo.find_one({
-                "_id": PydanticObjectId(channel_id)
-            })
+        channel = await load_channel_info(channel_id)
         if not channel:
             raise HTTPException(status_code=404, detail="Channel not found")
 
@@ -809,6 +584,7 @@ async def create_coupon(channel_id: str, payload: CouponRequest):
             **payload.model_dump(),
         )
         await coupon.save()
+        await purge(channel_tag(channel_id), channel_tag(coupon.channel_id))
         
         return CouponResponse(**coupon.model_dump())
 
@@ -821,9 +597,17 @@ async def get_coupons(channel_id: str):
     Get all coupons for a channel.
     """
     try:
+        cached = await coupons_cache.get(channel_id)
+        if cached is not MISSING:
+            return cached
+
         # Get all coupons for channel
         coupons = await Coupon.find({"channel_id": channel_id}).to_list()
-        return [CouponResponse(**coupon.model_dump()) for coupon in coupons]
+        return await coupons_cache.set(
+            channel_id,
+            [CouponResponse(**coupon.model_dump()) for coupon in coupons],
+            tags=[channel_tag(channel_id)]
+        )
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -842,6 +626,7 @@ async def update_coupon(channel_id: str, coupon_id: str, payload: CouponRequest)
         print(payload, "payload")
         update_data = payload.model_dump(exclude_unset=True)
         await coupon.update({"$set": update_data})
+        await purge(channel_tag(channel_id))
 
         # Return updated coupon by fetching it again to ensure we have the latest data
         updated_coupon = await Coupon.get(PydanticObjectId(coupon_id))
@@ -861,6 +646,7 @@ async def delete_coupon(channel_id: str, coupon_id: str):
             raise HTTPException(status_code=404, detail="Coupon not found")
             
         await result.delete()
+        await purge(channel_tag(channel_id))
         return {"message": "Coupon deleted successfully"}
 
     except Exception as e:
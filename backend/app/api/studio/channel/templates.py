@@ -0,0 +1,135 @@
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.settings import TEMPLATE_HOT_RELOAD
+from app.utils.log import get_logger
+
+
+TEMPLATE_PATH = Path(__file__).with_name('template.json')
+
+logger = get_logger(__name__)
+
+
+def schema_from_example(value: Any, key: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Derive a JSON schema (type/properties/required/items/const subset) from a template example.
+    Every example key except `id` is required, `type` must match exactly and null means "any".
+    """
+    if isinstance(value, dict):
+        return {
+            "type": "object",
+            "properties": {k: schema_from_example(v, k) for k, v in value.items() if k != "id"},
+            "required": [k for k in value if k != "id"],
+        }
+    if isinstance(value, list):
+        return {"type": "array", "items": schema_from_example(value[0]) if value else {}}
+    if isinstance(value, bool):
+        return {"type": "boolean"}
+    if isinstance(value, (int, float)):
+        return {"type": "number"}
+    if isinstance(value, str):
+        return {"type": "string", "const": value} if key == "type" else {"type": "string"}
+    return {}
+
+
+_JSON_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "boolean": bool,
+}
+
+
+def validate(schema: Dict[str, Any], value: Any, path: str = "$") -> List[str]:
+    """Validate value against a schema produced by schema_from_example; returns the errors."""
+    expected = schema.get("type")
+    if expected == "number":
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return [f"{path}: expected number"]
+    elif expected and not isinstance(value, _JSON_TYPES[expected]):
+        return [f"{path}: expected {expected}"]
+
+    if "const" in schema and value != schema["const"]:
+        return [f"{path}: expected {schema['const']!r}"]
+
+    errors = []
+    if expected == "object":
+        for key in schema.get("required", []):
+            if key not in value:
+                errors.append(f"{path}.{key}: missing")
+        for key, sub in schema.get("properties", {}).items():
+            if key in value:
+                errors += validate(sub, value[key], f"{path}.{key}")
+    elif expected == "array" and schema.get("items"):
+        for i, item in enumerate(value):
+            errors += validate(schema["items"], item, f"{path}[{i}]")
+    return errors
+
+
+class QuestionTemplate:
+    """A template.json entry with its prompt fragment and schema rendered once at load time."""
+
+    def __init__(self, example: Dict[str, Any]):
+        self.id: int = example["id"]
+        self.type: str = example.get("type", "")
+        self.example = example
+        self.prompt_fragment = json.dumps(
+            {k: v for k, v in example.items() if k != "id"}, ensure_ascii=False
+        )
+        self.schema = schema_from_example(example)
+
+    def validate(self, question: Any) -> List[str]:
+        return validate(self.schema, question)
+
+
+class TemplateRegistry:
+    """
+    Question templates indexed by id. Loaded once at startup; with TEMPLATE_HOT_RELOAD the file's
+    mtime is checked (at most once a second) and the registry reloads when it changes.
+    """
+
+    def __init__(self, path: Path = TEMPLATE_PATH, hot_reload: bool = TEMPLATE_HOT_RELOAD):
+        self.path = path
+        self.hot_reload = hot_reload
+        self._templates: Dict[int, QuestionTemplate] = {}
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+
+    def load(self) -> None:
+        mtime = os.stat(self.path).st_mtime
+        with open(self.path, "r", encoding="utf-8") as f:
+            examples = json.load(f)
+        self._templates = {example["id"]: QuestionTemplate(example) for example in examples}
+        self._mtime = mtime
+        logger.info("question templates loaded", extra={"count": len(self._templates), "path": str(self.path)})
+
+    def _maybe_reload(self) -> None:
+        if self._mtime is None:
+            self.load()
+            return
+        if not self.hot_reload or time.monotonic() - self._checked_at < 1:
+            return
+        self._checked_at = time.monotonic()
+        try:
+            if os.stat(self.path).st_mtime != self._mtime:
+                self.load()
+        except (OSError, ValueError):
+            # Keep serving the last good templates while the file is being edited
+            logger.exception("question template reload failed")
+
+    def get(self, template_id: int) -> QuestionTemplate:
+        self._maybe_reload()
+        template = self._templates.get(template_id)
+        if template is None:
+            raise ValueError(f"Template with id {template_id} not found.")
+        return template
+
+    def all(self) -> List[QuestionTemplate]:
+        self._maybe_reload()
+        return list(self._templates.values())
+
+
+template_registry = TemplateRegistry()
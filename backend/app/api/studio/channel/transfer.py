@@ -0,0 +1,563 @@
+import base64
+import tarfile
+import time
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple, Type
+
+from beanie import Document, PydanticObjectId
+from bson import ObjectId, json_util
+from fastapi import HTTPException
+from pydantic import ValidationError
+
+from app.models.channel import (
+    Channel, ChannelInfo, PublishChannel, ActivityOutline,
+    Section, Unit, Activity, Lesson, Question,
+    FreeAccess, Tier, Coupon
+)
+from app.models.gallery import File as GalleryFile
+from app.api.studio.channel.clone import discard_copy
+from app.api.studio.channel.middlewares import get_channel_content_outline_stats
+from app.database import get_gridfs
+from app.services.outline_repository import raw_document
+from app.settings import BULK_WRITE_BATCH_SIZE
+from app.utils.outline import CONTENT_TREE
+from app.utils.log import get_logger
+
+
+logger = get_logger(__name__)
+
+EXPORT_FORMAT = "yaralex-channel"
+EXPORT_VERSION = 1
+
+# Records keyed by channel_id that travel with the channel (Channel itself is rebuilt on import)
+CHANNEL_RECORDS: List[Type[Document]] = [PublishChannel, FreeAccess, Tier, Coupon]
+# Collections whose ids are parents of other content (their ids are kept while exporting)
+PARENTS = {parent for _, _, parent in CONTENT_TREE if parent}
+# Fields holding GalleryFile ids
+FILE_FIELDS: Dict[Type[Document], List[str]] = {
+    ChannelInfo: ["avatar_file_id", "cover_image_file_id"],
+    Section: ["file_id"],
+    Unit: ["file_id"],
+    Activity: ["file_id"],
+    Lesson: ["file_ids"],
+    Question: ["file_id"],
+}
+# Everything an export may contain
+EXPORTED_MODELS: List[Type[Document]] = [ChannelInfo, *CHANNEL_RECORDS, *(m for m, _, _ in CONTENT_TREE), GalleryFile]
+
+
+def collection_name(model: Type[Document]) -> str:
+    return model.get_motor_collection().name
+
+
+def encode_record(collection: str, doc: Dict[str, Any]) -> bytes:
+    """One NDJSON line; ObjectIds and dates are kept as MongoDB extended JSON."""
+    record = {"collection": collection, "doc": doc}
+    return json_util.dumps(record, json_options=json_util.RELAXED_JSON_OPTIONS).encode("utf-8") + b"\n"
+
+
+def header_record(channel_id: str, include_files: bool) -> bytes:
+    return json_util.dumps({
+        "format": EXPORT_FORMAT,
+        "version": EXPORT_VERSION,
+        "channel_id": channel_id,
+        "include_files": include_files,
+        "exported_at": datetime.utcnow(),
+    }, json_options=json_util.RELAXED_JSON_OPTIONS).encode("utf-8") + b"\n"
+
+
+def file_ids_of(model: Type[Document], doc: Dict[str, Any]) -> List[str]:
+    ids = []
+    for field in FILE_FIELDS.get(model, []):
+        value = doc.get(field)
+        ids += value if isinstance(value, list) else [value]
+    return [str(i) for i in ids if i]
+
+
+async def iter_channel_documents(
+    channel_id: str,
+    projection: Optional[Dict[Type[Document], Dict[str, int]]] = None
+) -> AsyncIterator[Tuple[Type[Document], Dict[str, Any]]]:
+    """
+    Every document of the channel, parents before children, read with cursors level by level.
+    Only the ids of outline nodes are held in memory (to query the next level).
+    """
+    projection = projection or {}
+    info = await ChannelInfo.get_motor_collection().find_one(
+        {"_id": ObjectId(channel_id)}, projection.get(ChannelInfo)
+    )
+    if info is None:
+        return
+    yield ChannelInfo, info
+
+    for model in CHANNEL_RECORDS:
+        async for doc in model.get_motor_collection().find({"channel_id": channel_id}, projection.get(model)):
+            yield model, doc
+
+    parent_ids: Dict[Type[Document], List[str]] = {}
+    for model, parent_field, parent in CONTENT_TREE:
+        ids = parent_ids[parent] if parent else [channel_id]
+        kept = parent_ids.setdefault(model, []) if model in PARENTS else None
+        for start in range(0, len(ids), BULK_WRITE_BATCH_SIZE):
+            cursor = model.get_motor_collection().find(
+                {parent_field: {"$in": ids[start:start + BULK_WRITE_BATCH_SIZE]}},
+                projection.get(model),
+                batch_size=BULK_WRITE_BATCH_SIZE
+            )
+            async for doc in cursor:
+                if kept is not None:
+                    kept.append(str(doc["_id"]))
+                yield model, doc
+
+
+async def referenced_files(channel_id: str) -> Set[str]:
+    """Ids of the gallery files the channel points at (a projection-only pass)."""
+    projection = {
+        model: {field: 1 for field in FILE_FIELDS.get(model, [])} or {"_id": 1}
+        for model in [ChannelInfo, *CHANNEL_RECORDS, *(m for m, _, _ in CONTENT_TREE)]
+    }
+    ids = set()
+    async for model, doc in iter_channel_documents(channel_id, projection):
+        ids.update(file_ids_of(model, doc))
+    return ids
+
+
+async def iter_file_documents(file_ids: Set[str], owner_id: str) -> AsyncIterator[Dict[str, Any]]:
+    """The gallery files among file_ids that belong to owner_id; ids of anyone else's files are skipped."""
+    object_ids = [ObjectId(i) for i in file_ids if ObjectId.is_valid(i)]
+    for start in range(0, len(object_ids), BULK_WRITE_BATCH_SIZE):
+        async for doc in GalleryFile.get_motor_collection().find({
+            "_id": {"$in": object_ids[start:start + BULK_WRITE_BATCH_SIZE]},
+            "owner": ObjectId(owner_id)
+        }):
+            yield doc
+
+
+async def encode_file_record(doc: Dict[str, Any], chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    The NDJSON line of a gallery file with its contents base64-encoded in doc["data"], streamed
+    chunk by chunk: the line is never held in memory whole.
+    """
+    # encode_record ends with the closing braces of doc and of the record: splice `data` in before them
+    line = encode_record(collection_name(GalleryFile), doc)
+    yield line[:-3] + b', "data": "'
+    carry = b""
+    async for chunk in chunks:
+        # Encode whole 3-byte groups only, so the pieces concatenate into one valid base64 string
+        data = carry + chunk
+        cut = len(data) - len(data) % 3
+        carry = data[cut:]
+        yield base64.b64encode(data[:cut])
+    yield base64.b64encode(carry) + b'"}}\n'
+
+
+async def grid_chunks(grid_out) -> AsyncIterator[bytes]:
+    while True:
+        chunk = await grid_out.readchunk()
+        if not chunk:
+            break
+        yield chunk
+
+
+async def export_ndjson(channel_id: str, owner_id: str, include_files: bool = False) -> AsyncIterator[bytes]:
+    """
+    Stream the channel as NDJSON: a header line, then one {"collection", "doc"} line per document.
+    With include_files, the referenced gallery files owned by owner_id follow the header as metadata
+    records with their contents base64-encoded in `data`, streamed from GridFS (the tar format avoids
+    the base64 overhead).
+    """
+    yield header_record(channel_id, include_files)
+    if include_files:
+        fs = await get_gridfs()
+        async for doc in iter_file_documents(await referenced_files(channel_id), owner_id):
+            grid_out = await fs.open_download_stream(doc["gridfs_file_id"])
+            async for piece in encode_file_record(doc, grid_chunks(grid_out)):
+                yield piece
+    async for model, doc in iter_channel_documents(channel_id):
+        yield encode_record(collection_name(model), doc)
+
+
+def tar_member(name: str, size: int) -> bytes:
+    info = tarfile.TarInfo(name)
+    info.size = size
+    info.mtime = int(time.time())
+    return info.tobuf(format=tarfile.USTAR_FORMAT)
+
+
+def tar_padding(size: int) -> bytes:
+    return b"\0" * (-size % tarfile.BLOCKSIZE)
+
+
+async def export_tar(channel_id: str, owner_id: str, include_files: bool = False) -> AsyncIterator[bytes]:
+    """
+    Stream the channel as a tar archive: records/NNNNN.ndjson parts of at most BULK_WRITE_BATCH_SIZE
+    lines (the same lines as the NDJSON export) and, with include_files, one files/<file id> member
+    per referenced gallery file of owner_id streamed chunk by chunk from GridFS, before the records
+    that use it.
+    """
+    part = 0
+
+    def flush(lines: List[bytes]) -> bytes:
+        nonlocal part
+        part += 1
+        data = b"".join(lines)
+        return tar_member(f"records/{part:05d}.ndjson", len(data)) + data + tar_padding(len(data))
+
+    lines = [header_record(channel_id, include_files)]
+    if include_files:
+        fs = await get_gridfs()
+        async for doc in iter_file_documents(await referenced_files(channel_id), owner_id):
+            yield flush(lines + [encode_record(collection_name(GalleryFile), doc)])
+            lines = []
+            grid_out = await fs.open_download_stream(doc["gridfs_file_id"])
+            yield tar_member(f"files/{doc['_id']}", grid_out.length)
+            async for chunk in grid_chunks(grid_out):
+                yield chunk
+            yield tar_padding(grid_out.length)
+
+    async for model, doc in iter_channel_documents(channel_id):
+        lines.append(encode_record(collection_name(model), doc))
+        if len(lines) >= BULK_WRITE_BATCH_SIZE:
+            yield flush(lines)
+            lines = []
+    if lines:
+        yield flush(lines)
+    # End-of-archive marker
+    yield b"\0" * (tarfile.BLOCKSIZE * 2)
+
+
+class ByteStream:
+    """Exact-size reads over an async iterator of byte chunks (a request body)."""
+
+    def __init__(self, chunks: AsyncIterator[bytes]):
+        self._chunks = chunks.__aiter__()
+        self._buffer = bytearray()
+        self._eof = False
+
+    async def _fill(self, size: int) -> None:
+        while len(self._buffer) < size and not self._eof:
+            try:
+                self._buffer += await self._chunks.__anext__()
+            except StopAsyncIteration:
+                self._eof = True
+
+    async def read(self, size: int) -> bytes:
+        """Up to `size` bytes (fewer only at the end of the stream)."""
+        await self._fill(size)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    async def skip(self, size: int) -> None:
+        """Discard the next `size` bytes without holding them all in memory."""
+        while size > 0:
+            data = await self.read(min(size, 64 * 1024))
+            if not data:
+                break
+            size -= len(data)
+
+    async def readline(self, limit: Optional[int] = None) -> bytes:
+        """One line including its newline, never longer than `limit` bytes."""
+        while True:
+            end = self._buffer.find(b"\n", 0, limit)
+            if end != -1:
+                end += 1
+                break
+            if self._eof or (limit is not None and len(self._buffer) >= limit):
+                end = len(self._buffer) if limit is None else min(limit, len(self._buffer))
+                break
+            await self._fill(len(self._buffer) + 64 * 1024)
+        data = bytes(self._buffer[:end])
+        del self._buffer[:end]
+        return data
+
+
+def validated(model: Type[Document], doc: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    `doc` as `model` stores it (defaults filled in, types coerced). A hand-edited or older export
+    whose record Beanie could not load later is rejected before anything reaches the database.
+    """
+    try:
+        return raw_document(model.model_validate(doc))
+    except ValidationError as e:
+        errors = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()[:5])
+        raise HTTPException(status_code=422, detail=f"Invalid {collection_name(model)} record {doc.get('_id')}: {errors}")
+
+
+class ChannelImporter:
+    """
+    Recreate an exported channel for another (or the same) environment under new ids.
+    Records must arrive parents first, as the exports produce them; content is buffered per
+    collection and written with insert_many batches, and the outline is rebuilt once at the end.
+    """
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.channel_id: Optional[str] = None
+        self.source_channel_id: Optional[str] = None
+        self.channel_info: Optional[ChannelInfo] = None
+        self.id_maps: Dict[Type[Document], Dict[str, str]] = {}
+        self.file_map: Dict[str, str] = {}   # source gallery file id -> imported one
+        self.grid_ids: List[ObjectId] = []
+        self.pending_files: Dict[str, Dict[str, Any]] = {}
+        self.channel_records: List[Tuple[Type[Document], Dict[str, Any]]] = []
+        self.buffers: Dict[Type[Document], List[Dict[str, Any]]] = {}
+        self.parent_fields = {model: (field, parent) for model, field, parent in CONTENT_TREE}
+        self.models = {collection_name(model): model for model in EXPORTED_MODELS}
+        self.counts: Dict[str, int] = {}
+
+    def check_header(self, header: Dict[str, Any]) -> None:
+        if header.get("format") != EXPORT_FORMAT or header.get("version") != EXPORT_VERSION:
+            raise HTTPException(status_code=400, detail="Not a channel export (or an unsupported version)")
+
+    def remap_files(self, model: Type[Document], doc: Dict[str, Any]) -> None:
+        """Point file fields at the imported files; ids of files the export did not carry are dropped."""
+        for field in FILE_FIELDS.get(model, []):
+            value = doc.get(field)
+            if isinstance(value, list):
+                doc[field] = [self.file_map[str(v)] for v in value if str(v) in self.file_map]
+            elif value:
+                doc[field] = self.file_map.get(str(value))
+
+    async def add_record(self, record: Dict[str, Any]) -> None:
+        model = self.models.get(record.get("collection"))
+        doc = record.get("doc")
+        if model is None or not isinstance(doc, dict):
+            raise HTTPException(status_code=400, detail=f"Unknown record: {record.get('collection')}")
+
+        if model is GalleryFile:
+            data = doc.pop("data", None)
+            self.pending_files[str(doc["_id"])] = doc
+            if data is not None:
+                await self.add_file(str(doc["_id"]), base64.b64decode(data))
+            return
+        if model is ChannelInfo:
+            await self.create_channel(doc)
+            return
+        if self.channel_id is None:
+            raise HTTPException(status_code=400, detail="The export must start with the channel info")
+
+        self.remap_files(model, doc)
+        if model in CHANNEL_RECORDS:
+            # Few per channel; written after the content so free-access activity ids can be remapped
+            self.channel_records.append((model, doc))
+            return
+
+        parent_field, parent = self.parent_fields[model]
+        parents = self.id_maps[parent] if parent else {self.source_channel_id: self.channel_id}
+        new_parent = parents.get(str(doc.get(parent_field)))
+        if new_parent is None:
+            # Orphan in the source database; nothing in the channel can reach it
+            return
+        new_id = ObjectId()
+        self.id_maps.setdefault(model, {})[str(doc["_id"])] = str(new_id)
+        doc["_id"] = new_id
+        doc[parent_field] = new_parent
+        buffer = self.buffers.setdefault(model, [])
+        buffer.append(validated(model, doc))
+        if len(buffer) >= BULK_WRITE_BATCH_SIZE:
+            await self.flush(model)
+
+    async def add_file(self, source_file_id: str, data: Any) -> None:
+        """Store a file's contents (bytes, or an async iterator of chunks) as a new gallery file."""
+        doc = self.pending_files.pop(source_file_id, None)
+        if doc is None:
+            return
+        fs = await get_gridfs()
+        grid_in = fs.open_upload_stream(doc.get("name", source_file_id), metadata={
+            "content_type": doc.get("file_type"),
+            "owner": self.user_id,
+            "upload_date": datetime.utcnow()
+        })
+        if isinstance(data, (bytes, bytearray)):
+            await grid_in.write(data)
+        else:
+            async for chunk in data:
+                await grid_in.write(chunk)
+        await grid_in.close()
+        self.grid_ids.append(grid_in._id)
+
+        doc.update({
+            "_id": ObjectId(),
+            "owner": ObjectId(self.user_id),
+            "gridfs_file_id": grid_in._id,
+            "thumbnail": None,
+            "directory_id": None,
+        })
+        await GalleryFile.get_motor_collection().insert_one(validated(GalleryFile, doc))
+        self.file_map[source_file_id] = str(doc["_id"])
+        self.counts[collection_name(GalleryFile)] = self.counts.get(collection_name(GalleryFile), 0) + 1
+
+    async def create_channel(self, doc: Dict[str, Any]) -> None:
+        if self.channel_id is not None:
+            raise HTTPException(status_code=400, detail="An export holds a single channel")
+        self.source_channel_id = str(doc["_id"])
+        self.remap_files(ChannelInfo, doc)
+        self.channel_info = ChannelInfo(
+            user_id=self.user_id,
+            name=doc.get("name") or "Imported channel",
+            description=doc.get("description") or "",
+            primary_language=doc.get("primary_language"),
+            target_language=doc.get("target_language"),
+            avatar_file_id=doc.get("avatar_file_id"),
+            cover_image_file_id=doc.get("cover_image_file_id")
+        )
+        await self.channel_info.insert()
+        self.channel_id = str(self.channel_info.id)
+        await Channel(
+            name=self.channel_info.name,
+            description=self.channel_info.description or "",
+            user_id=PydanticObjectId(self.user_id),
+            channel_id=self.channel_id,
+            primary_language=self.channel_info.primary_language,
+            target_language=self.channel_info.target_language,
+            avatar_file_id=self.channel_info.avatar_file_id,
+            cover_image_file_id=self.channel_info.cover_image_file_id,
+            published=False,
+            channel_link=None
+        ).insert()
+
+    async def flush(self, model: Type[Document]) -> None:
+        docs = self.buffers.pop(model, [])
+        if docs:
+            await model.get_motor_collection().insert_many(docs, ordered=True)
+            self.counts[collection_name(model)] = self.counts.get(collection_name(model), 0) + len(docs)
+
+    async def finish(self) -> ChannelInfo:
+        if self.channel_id is None:
+            raise HTTPException(status_code=400, detail="The export holds no channel")
+        for model, _, _ in CONTENT_TREE:
+            await self.flush(model)
+
+        activity_map = self.id_maps.get(ActivityOutline, {})
+        has_publish_record = False
+        for model, doc in self.channel_records:
+            doc["_id"] = ObjectId()
+            doc["channel_id"] = self.channel_id
+            if model is PublishChannel:
+                # Imported channels start unpublished, like duplicates
+                has_publish_record = True
+                doc.update({"user_id": self.user_id, "published": False, "channel_link": None})
+            elif model is FreeAccess:
+                doc["free_activities"] = [activity_map[i] for i in doc.get("free_activities") or [] if i in activity_map]
+                doc["precentage_outline"] = {
+                    activity_map[i]: value for i, value in (doc.get("precentage_outline") or {}).items() if i in activity_map
+                }
+                doc.pop("outline_hash", None)
+            await model.get_motor_collection().insert_one(validated(model, doc))
+        if not has_publish_record:
+            await PublishChannel(user_id=self.user_id, channel_id=self.channel_id, published=False, channel_link=None).insert()
+
+        await get_channel_content_outline_stats(self.channel_id, self.user_id)
+        logger.info("channel imported", extra={
+            "source_channel_id": self.source_channel_id, "channel_id": self.channel_id, **self.counts
+        })
+        return self.channel_info
+
+    async def abort(self) -> None:
+        if self.channel_id is not None:
+            await discard_copy(self.channel_id, self.id_maps)
+        if self.file_map:
+            await GalleryFile.get_motor_collection().delete_many(
+                {"_id": {"$in": [ObjectId(i) for i in self.file_map.values()]}}
+            )
+        fs = await get_gridfs() if self.grid_ids else None
+        for grid_id in self.grid_ids:
+            await fs.delete(grid_id)
+
+
+def parse_record(line: bytes, line_number: int) -> Dict[str, Any]:
+    try:
+        return json_util.loads(line)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Line {line_number}: invalid JSON")
+
+
+async def import_lines(importer: ChannelImporter, stream: ByteStream, header_seen: bool = False, size: Optional[int] = None) -> bool:
+    """Feed NDJSON lines (the whole stream, or the next `size` bytes of it) to the importer; returns whether the header was seen."""
+    line_number = 0
+    while size is None or size > 0:
+        line = await stream.readline(size)
+        if not line:
+            break
+        if size is not None:
+            size -= len(line)
+        line_number += 1
+        if not line.strip():
+            continue
+        record = parse_record(line, line_number)
+        if not header_seen:
+            importer.check_header(record)
+            header_seen = True
+            continue
+        await importer.add_record(record)
+    return header_seen
+
+
+async def import_ndjson(importer: ChannelImporter, stream: ByteStream) -> None:
+    if not await import_lines(importer, stream):
+        raise HTTPException(status_code=400, detail="Empty export")
+
+
+async def import_tar(importer: ChannelImporter, stream: ByteStream) -> None:
+    """Read a tar export member by member without buffering it: record parts are parsed line by line and file members piped into GridFS."""
+    header_seen = False
+    while True:
+        block = await stream.read(tarfile.BLOCKSIZE)
+        if len(block) < tarfile.BLOCKSIZE or block == b"\0" * tarfile.BLOCKSIZE:
+            break
+        info = tarfile.TarInfo.frombuf(block, tarfile.ENCODING, "surrogateescape")
+        name, size = info.name, info.size
+        if info.type in (tarfile.XHDTYPE, tarfile.XGLTYPE):
+            # PAX header: the real name/size of the next member
+            pax = await stream.read(size)
+            await stream.read(-size % tarfile.BLOCKSIZE)
+            block = await stream.read(tarfile.BLOCKSIZE)
+            info = tarfile.TarInfo.frombuf(block, tarfile.ENCODING, "surrogateescape")
+            name, size = info.name, info.size
+            for field in pax.decode("utf-8").splitlines():
+                key_value = field.split(" ", 1)[-1]
+                key, _, value = key_value.partition("=")
+                if key == "path":
+                    name = value
+                elif key == "size":
+                    size = int(value)
+
+        if name.startswith("records/"):
+            header_seen = await import_lines(importer, stream, header_seen, size)
+        elif name.startswith("files/"):
+            remaining = size
+
+            async def chunks():
+                nonlocal remaining
+                while remaining > 0:
+                    chunk = await stream.read(min(remaining, 255 * 1024))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    yield chunk
+            await importer.add_file(name[len("files/"):], chunks())
+            # Skips the whole member when the file is unknown (its record did not come first):
+            # left in the stream, its bytes would be parsed as the next tar headers
+            await stream.skip(remaining)
+        else:
+            await stream.skip(size)
+        await stream.skip(-size % tarfile.BLOCKSIZE)
+
+    if not header_seen:
+        raise HTTPException(status_code=400, detail="Empty export")
+
+
+async def import_channel(user_id: str, chunks: AsyncIterator[bytes], tar: bool = False) -> ChannelInfo:
+    """Import an NDJSON or tar export streamed from `chunks`; a failed import removes what it wrote."""
+    importer = ChannelImporter(user_id)
+    stream = ByteStream(chunks)
+    try:
+        if tar:
+            await import_tar(importer, stream)
+        else:
+            await import_ndjson(importer, stream)
+        return await importer.finish()
+    except BaseException:
+        await importer.abort()
+        raise
@@ -5,16 +5,20 @@ from app.settings import MONGO_URI
 
 from app.models.user import User
 from app.models.channel import (
-    Channel, ChannelInfo, PublishChannel, Tier, FreeAccess, Coupon,
+    Channel, ChannelInfo, PublishChannel, Tier, FreeAccess, Coupon, OutlineVersion,
     SectionOutline, Section, UnitOutline, Unit,
     ActivityOutline, Activity, LessonOutline, Lesson,
-    QuizOutline, Question
+    QuizOutline, Question, OutlineNode
 )
 # Add Space and Gallery models
 from app.models.space import File as SpaceFile, Directory as SpaceDirectory
 from app.models.gallery import File as GalleryFile, Dir as GalleryDir
 # Add Play models
 from app.models.play import PlayerProgress
+from app.models.mail import OutboundEmail
+from app.models.rate_limit import RateLimitWindow
+from app.models.cache import CacheEntry
+from app.models.job import Job
 
 
 fs = None
@@ -23,15 +27,16 @@ fs = None
 # App models
 MODELS = [User]
 MODELS += [
-    Channel, ChannelInfo, PublishChannel, Tier, FreeAccess, Coupon,
+    Channel, ChannelInfo, PublishChannel, Tier, FreeAccess, Coupon, OutlineVersion,
     SectionOutline, Section, UnitOutline, Unit,
     ActivityOutline, Activity, LessonOutline, Lesson,
-    QuizOutline, Question
+    QuizOutline, Question, OutlineNode
 ]
 # Add Space and Gallery models to MODELS list
 MODELS += [SpaceFile, SpaceDirectory, GalleryFile, GalleryDir]
 # Add Play models to MODELS list  
 MODELS += [PlayerProgress]
+MODELS += [OutboundEmail, RateLimitWindow, CacheEntry, Job]
 
 
 # Initialize the database
@@ -33,15 +33,33 @@ from app.messages.general import General_Message
 from app.translations import load_translations, translate
 from app.utils.changelog import get_change_log, get_version
 from app.utils.openapi import patch_openapi
+from app.utils.pagination import NEXT_CURSOR_HEADER
+from app.utils.log import setup_logging, shutdown_logging
+from app.utils.email import start_mail_workers, stop_mail_workers
+from app.utils.rate_limit import RateLimitMiddleware
+from app.utils.identity_map import IdentityMapMiddleware
+from app.api.studio.channel.templates import template_registry
+from app.utils.jobs import start_job_workers, stop_job_workers, resume_jobs
+from app.api.studio.channel.middlewares import resume_outline_rebuilds, flush_outline_rebuilds
 
 
 # ~~~~~~~~~~ APP ~~~~~~~~~~ #
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    setup_logging()
     db.fs = await init_db()
     load_translations()
     inject_messages()
+    template_registry.load()
+    start_mail_workers()
+    start_job_workers()
+    await resume_jobs()
+    await resume_outline_rebuilds()
     yield
+    await flush_outline_rebuilds()
+    await stop_job_workers()
+    await stop_mail_workers()
+    shutdown_logging()
 
 app = FastAPI(
     title='YaraLEX API',
@@ -50,12 +68,19 @@ app = FastAPI(
     description=get_change_log()
 )
 
+# Innermost: one identity map per request, around the route handlers only
+app.add_middleware(IdentityMapMiddleware)
+
+# Added first so it runs inside CORS and 429s still carry CORS headers
+app.add_middleware(RateLimitMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, 'Retry-After', 'X-RateLimit-Limit', 'X-RateLimit-Remaining'],
 )
 
 app.openapi = lambda: patch_openapi(app)
@@ -0,0 +1,24 @@
+from typing import Any, List
+from datetime import datetime
+from pydantic import BaseModel, Field
+from beanie import Document
+from pymongo import IndexModel, ASCENDING
+
+
+class CacheEntryFields(BaseModel):
+    value: Any = None
+    tags: List[str] = Field(default_factory=list)
+    expires_at: datetime = Field(...)
+
+
+class CacheEntry(Document, CacheEntryFields):
+    """Shared response cache entry, used when CACHE_BACKEND is "mongo"."""
+    # "<cache name>:<key>"
+    id: str = Field(..., alias="_id")
+
+    class Settings:
+        name = "cache_entries"
+        indexes = [
+            IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+            IndexModel([("tags", ASCENDING)]),
+        ]
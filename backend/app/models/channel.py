@@ -3,12 +3,14 @@ from datetime import datetime
 from typing import Dict, List, Optional, Any, Union, Literal
 from beanie import Document, PydanticObjectId
 from bson import ObjectId
+from pymongo import IndexModel, ASCENDING, DESCENDING
 
 
 # -----------------
 # CHANNEL STATS_CONTENT
 # -----------------
-class ChannelFields(BaseModel):
+class ChannelSummaryFields(BaseModel):
+    """Channel fields shown in list views: everything but the outline and its revision bookkeeping."""
     user_id: PydanticObjectId = Field(..., example="60b8d295f295a53b88f5a7c9")# This field is filled by setting info when creating a channel
     name: str = Field(..., example="Python Programming") # This field is filled by setting info when creating a channel
     channel_id: str = Field(..., example="681f14bf72b568b13257f8e8") # This field is filled by setting info when creating a channel
@@ -28,6 +30,12 @@ class ChannelFields(BaseModel):
     published: Optional[bool] = Field(default=False, example=True)
     channel_link: Optional[str] = Field(None, example="https://example.com/channel")
     last_updated: datetime = Field(default_factory=datetime.utcnow, example="2025-04-27T12:00:00")
+
+class ChannelFields(ChannelSummaryFields):
+    outline_version: int = Field(default=0, example=3, description="Latest published OutlineVersion of this channel (0 = never published)")
+    outline_hash: Optional[str] = Field(None, example="9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08", description="Content hash of the current outline_content")
+    content_revision: int = Field(default=0, example=42, description="Bumped by every content write")
+    outline_revision: int = Field(default=0, example=42, description="content_revision outline_content was built from; the outline is current when both are equal")
     outline_content: Dict[str, Any] = Field(default_factory=dict, example={
         "sections": [
             {
@@ -137,6 +145,17 @@ class Channel(Document, ChannelFields):
 
     class Settings:
         name = "channels"
+        indexes = [
+            IndexModel([("channel_id", ASCENDING)]),
+            IndexModel([("user_id", ASCENDING), ("published", ASCENDING)]),
+        ]
+
+class ChannelListItem(ChannelSummaryFields):
+    """
+    Projection of Channel for list views.
+    Used with `Channel.find(...).project(ChannelListItem)` so outline_content never leaves MongoDB.
+    """
+    id: PydanticObjectId = Field(..., alias="_id")
 
 # class ChannelResponse(ChannelFields):
 #     id: str = Field(..., example="channel_123")
@@ -178,6 +197,31 @@ class Channel(Document, ChannelFields):
 
 
 
+# -----------------
+# OUTLINE VERSION
+# -----------------
+
+class OutlineVersionFields(BaseModel):
+    channel_id: str = Field(..., example="681f14bf72b568b13257f8e8")
+    version: int = Field(..., example=1, description="Monotonic version number within the channel")
+    content_hash: str = Field(..., example="9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08")
+    outline_content: Dict[str, Any] = Field(default_factory=dict)
+    # Newest Channel.content_revision this snapshot was built (or re-confirmed) from
+    revision: Optional[int] = Field(None, example=12)
+    created_at: datetime = Field(default_factory=datetime.utcnow, example="2025-04-27T12:00:00")
+
+class OutlineVersion(Document, OutlineVersionFields):
+    """Immutable snapshot of a channel outline, referenced by learner progress."""
+    id: PydanticObjectId = Field(default_factory=PydanticObjectId, alias="_id")
+
+    class Settings:
+        name = "outline_versions"
+        indexes = [
+            IndexModel([("channel_id", ASCENDING), ("version", DESCENDING)], unique=True),
+            IndexModel([("channel_id", ASCENDING), ("content_hash", ASCENDING)]),
+        ]
+
+
 # -----------------
 # SECTION Outline
 # -----------------
@@ -454,11 +498,22 @@ class LessonFields(BaseModel):
 class LessonRequest(LessonFields):
     pass
 
+class LessonImportRecord(LessonRequest):
+    idempotency_key: Optional[str] = Field(None, example="bank-2025-04/lesson-17", description="Re-importing a record with the same key into the same lesson outline is a no-op")
+
 class Lesson(Document, LessonFields):
     id: PydanticObjectId = Field(default_factory=PydanticObjectId, alias="_id")
+    # idempotency key of the bulk import that created the lesson
+    import_key: Optional[str] = None
 
     class Settings:
         name = "lessons"
+        indexes = [
+            IndexModel(
+                [("lesson_outline_id", ASCENDING), ("import_key", ASCENDING)],
+                unique=True, partialFilterExpression={"import_key": {"$type": "string"}}
+            ),
+        ]
 
 class LessonResponse(LessonFields):
     id: str = Field(..., example="lesson_123")
@@ -550,11 +605,22 @@ class QuestionFields(BaseModel):
 class QuestionRequest(QuestionFields):
     pass
 
+class QuestionImportRecord(QuestionRequest):
+    idempotency_key: Optional[str] = Field(None, example="bank-2025-04/q-311", description="Re-importing a record with the same key into the same quiz outline is a no-op")
+
 class Question(Document, QuestionFields):
     id: PydanticObjectId = Field(default_factory=PydanticObjectId, alias="_id")
+    # idempotency key of the bulk import that created the question
+    import_key: Optional[str] = None
 
     class Settings:
         name = "questions"
+        indexes = [
+            IndexModel(
+                [("quiz_outline_id", ASCENDING), ("import_key", ASCENDING)],
+                unique=True, partialFilterExpression={"import_key": {"$type": "string"}}
+            ),
+        ]
 
 class QuestionResponse(QuestionFields):
     id: str = Field(..., example="question_123")
@@ -574,7 +640,31 @@ class QuestionResponse(QuestionFields):
         }
 
 # -----------------
-# SETTING 
+# OUTLINE NODE
+# (OUTLINE_STORAGE=nodes)
+# -----------------
+class OutlineNodeFields(BaseModel):
+    channel_id: str = Field(..., example="60b8d295f295a53b88f5a7c9")
+    kind: Literal["section", "unit", "activity", "lesson", "quiz"] = Field(..., example="unit")
+    parent_id: Optional[str] = Field(None, example="60b8d295f295a53b88f5sec123", description="Outline id of the parent node; None for sections")
+    order: int = Field(0, example=1)
+    outline: Dict[str, Any] = Field(default_factory=dict, description="The outline document (SectionOutline, UnitOutline...)")
+    content: Optional[Dict[str, Any]] = Field(None, description="The Section / Unit / Activity document of the outline")
+    items: List[Dict[str, Any]] = Field(default_factory=list, description="Lessons of a lesson outline / questions of a quiz outline")
+
+class OutlineNode(Document, OutlineNodeFields):
+    """One outline node co-located with its content; the id is the outline document's id."""
+    id: PydanticObjectId = Field(default_factory=PydanticObjectId, alias="_id")
+
+    class Settings:
+        name = "outline_nodes"
+        indexes = [
+            IndexModel([("channel_id", ASCENDING)]),
+            IndexModel([("parent_id", ASCENDING), ("order", ASCENDING)]),
+        ]
+
+# -----------------
+# SETTING
 # INFO
 # -----------------
 
@@ -700,6 +790,8 @@ class FreeAccessRequest(FreeAccessFields):
 
 class FreeAccess(Document, FreeAccessFields):
     id: PydanticObjectId = Field(default_factory=PydanticObjectId, alias="_id")
+    # Channel.outline_hash the precentage_outline was computed from; recomputed when it changes
+    outline_hash: Optional[str] = None
 
 class FreeAccessResponse(FreeAccessFields):
     id: str = Field(..., example="free_access_123")
@@ -802,6 +894,20 @@ class ChannelOutlineResponse(BaseModel):
     channel_id: str = Field(..., example="channel_123")
     outline: List[SectionOutlineResponse] = Field(default_factory=list)
 
+class OutlineReorderRequest(BaseModel):
+    level: Literal["sections", "units", "activities", "content", "lessons", "questions"] = Field(..., example="activities", description="Which siblings are reordered; content = the lessons and quizzes of an activity")
+    parent_id: Optional[str] = Field(None, example="60b8d295f295a53b88f5unit123", description="Section/unit/activity/lesson/quiz outline holding the siblings; omitted for sections")
+    ids: List[str] = Field(..., example=["60b8d295f295a53b88f5activity456", "60b8d295f295a53b88f5activity123"], description="Every sibling id, in the new order")
+
+class OutlineReorderResponse(BaseModel):
+    updated: int = Field(..., example=1, description="Documents whose order changed")
+    orders: Dict[str, int] = Field(..., example={"60b8d295f295a53b88f5activity456": 512, "60b8d295f295a53b88f5activity123": 1024})
+
+class ContentImportResponse(BaseModel):
+    inserted: int = Field(..., example=120)
+    skipped: int = Field(0, example=3, description="Records whose idempotency key was already imported")
+    ids: List[Optional[str]] = Field(..., description="Per record, in input order: the new document id, or null when skipped")
+
 # class AllChannelsOutlineResponse(BaseModel):
 #     channels: List[ChannelOutlineResponse] = Field(default_factory=list)
 
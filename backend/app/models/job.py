@@ -0,0 +1,60 @@
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+from enum import Enum
+from pydantic import BaseModel, Field, field_validator
+from beanie import Document, PydanticObjectId
+from bson import ObjectId
+from pymongo import IndexModel, ASCENDING, DESCENDING
+
+
+class JobStatus(str, Enum):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+
+    @property
+    def finished(self) -> bool:
+        return self in (JobStatus.SUCCEEDED, JobStatus.FAILED)
+
+
+class JobFields(BaseModel):
+    kind: str = Field(..., example="generate_questions")
+    user_id: str = Field(..., example="60b8d295f295a53b88f5a7c9")
+    params: Dict[str, Any] = Field(default_factory=dict)
+    status: JobStatus = JobStatus.QUEUED
+    # Partial results, appended as they are produced (e.g. validated questions)
+    items: List[Any] = Field(default_factory=list)
+    progress: int = 0
+    total: Optional[int] = None
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    # A QUEUED job is not started before this time
+    not_before: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    # While RUNNING, renewed by the process running the job; once past, that process is gone
+    lease_until: Optional[datetime] = None
+
+
+class Job(Document, JobFields):
+    id: PydanticObjectId = Field(default_factory=PydanticObjectId, alias="_id")
+
+    class Settings:
+        name = "jobs"
+        indexes = [
+            IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)]),
+            IndexModel([("status", ASCENDING)]),
+        ]
+
+
+class JobResponse(JobFields):
+    id: str = Field(..., example="661f14bf72b568b13257f8eb")
+
+    @field_validator('id', mode='before')
+    def validate_id(cls, value: Any) -> str:
+        """Convert ObjectId or PydanticObjectId to string"""
+        if isinstance(value, (ObjectId, PydanticObjectId)):
+            return str(value)
+        return str(value)
@@ -0,0 +1,41 @@
+from typing import Optional
+from datetime import datetime
+from enum import Enum
+from pydantic import BaseModel, Field
+from beanie import Document, PydanticObjectId
+from pymongo import IndexModel, ASCENDING
+
+
+class OutboundEmailStatus(str, Enum):
+    PENDING = 'pending'
+    SENDING = 'sending'
+    SENT = 'sent'
+    FAILED = 'failed'
+
+
+class OutboundEmailFields(BaseModel):
+    to_email: str = Field(...)
+    subject: str = Field(...)
+    text_content: Optional[str] = None
+    status: OutboundEmailStatus = OutboundEmailStatus.PENDING
+    attempts: int = 0
+    # When the message is next due; while SENDING it is the lease expiry after which
+    # another worker may pick the message up again (e.g. after a crash)
+    next_attempt_at: datetime = Field(default_factory=datetime.utcnow)
+    last_error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    sent_at: Optional[datetime] = None
+    # Set once the message is sent or given up on; the body is dropped then
+    expires_at: Optional[datetime] = None
+
+
+class OutboundEmail(Document, OutboundEmailFields):
+    id: PydanticObjectId = Field(default_factory=PydanticObjectId, alias="_id")
+
+    class Settings:
+        name = "outbound_emails"
+        indexes = [
+            IndexModel([("status", ASCENDING), ("next_attempt_at", ASCENDING)]),
+            # Mongo's TTL monitor removes finished messages; rows without expires_at are kept
+            IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+        ]
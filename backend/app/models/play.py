@@ -2,6 +2,7 @@ from typing import List, Dict, Optional, Any
 from datetime import datetime
 from pydantic import BaseModel, Field
 from beanie import Document, PydanticObjectId
+from pymongo import IndexModel, ASCENDING
 
 
 
@@ -62,7 +63,8 @@ class PlayerProgress(Document):
     full_access: bool = Field(..., description="True if user has full access, False if limited access")
     needs_review: Optional[List[str]] = Field(default_factory=list)
     hearts_earned: int = 0
-    content: Optional[Dict] = None # content might needs to be reordered based on user performance
+    content: Optional[Dict] = None # legacy outline snapshot; new progress references outline_version instead
+    outline_version: Optional[int] = Field(None, description="OutlineVersion the progress_level was built against")
     progress_level: Dict[str, Any] = Field(default_factory=dict, example={
         "sections": [
             {
@@ -104,3 +106,29 @@ class PlayerProgress(Document):
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     class Settings:
         name = "user_progress"
+        indexes = [
+            # Covers SubscriptionSummary lookups by player without touching the documents
+            IndexModel([
+                ("player_id", ASCENDING),
+                ("channel_id", ASCENDING),
+                ("full_access", ASCENDING),
+                ("hearts_earned", ASCENDING),
+                ("created_at", ASCENDING),
+            ]),
+            # Covers the versions still referenced per channel (prune_outline_versions)
+            IndexModel([("channel_id", ASCENDING), ("outline_version", ASCENDING)]),
+        ]
+
+
+class SubscriptionSummary(BaseModel):
+    """
+    Lean projection of PlayerProgress for subscription listings.
+    Excludes _id so `PlayerProgress.find({"player_id": ...}).project(SubscriptionSummary)` is index-covered.
+    """
+    channel_id: str
+    full_access: bool
+    hearts_earned: int = 0
+    created_at: Optional[datetime] = None
+
+    class Settings:
+        projection = {"_id": 0, "channel_id": 1, "full_access": 1, "hearts_earned": 1, "created_at": 1}
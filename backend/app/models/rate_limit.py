@@ -0,0 +1,22 @@
+from datetime import datetime
+from pydantic import BaseModel, Field
+from beanie import Document
+from pymongo import IndexModel, ASCENDING
+
+
+class RateLimitWindowFields(BaseModel):
+    hits: int = 0
+    expires_at: datetime = Field(...)
+
+
+class RateLimitWindow(Document, RateLimitWindowFields):
+    """Request counter of one (rule, identity) in one fixed window, shared by all workers."""
+    # "<rule>:<identity>:<window start>"
+    id: str = Field(..., alias="_id")
+
+    class Settings:
+        name = "rate_limit_windows"
+        indexes = [
+            # Mongo's TTL monitor removes windows once they are over
+            IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+        ]
@@ -87,6 +87,8 @@ class UserAuth(BaseModel):
     access_token_expires_at: Optional[datetime] = None
     refresh_token: Optional[str] = None
     refresh_token_expires_at: Optional[datetime] = None
+    # Access tokens issued (iat) before this second are rejected: logout, password change
+    sessions_revoked_at: Optional[datetime] = None
     
     # Verification
     verification_code: Optional[str] = None
@@ -154,17 +156,6 @@ class SignUpRequest(BaseModel):
     last_name: Optional[str] = Field(None, example='Doe')
     role: UserRole = Field(default=UserRole.PLAYER)
 
-    def __init__(self, **data):
-        print("\n=== SignUpRequest Initialization ===")
-        print("Input data:", data)
-        try:
-            super().__init__(**data)
-            print("SignUpRequest initialized successfully")
-        except Exception as e:
-            print("Error during SignUpRequest initialization:", str(e))
-            raise
-        print("=== End SignUpRequest Initialization ===\n")
-    
     @field_validator('password')
     def validate_password(cls, value):
         print("\n=== Validating Password ===")
@@ -220,17 +211,6 @@ class RefreshTokenRequest(BaseModel):
     """Token refresh request."""
     refresh_token: str = Field(..., description="Refresh token to get new access token")
 
-    def __init__(self, **data):
-        print("\n=== RefreshTokenRequest Initialization ===")
-        print("Input data:", data)
-        try:
-            super().__init__(**data)
-            print("RefreshTokenRequest initialized successfully")
-        except Exception as e:
-            print("Error during RefreshTokenRequest initialization:", str(e))
-            raise
-        print("=== End RefreshTokenRequest Initialization ===\n")
-
     @field_validator('refresh_token')
     def validate_refresh_token(cls, value):
         print("\n=== Validating Refresh Token ===")
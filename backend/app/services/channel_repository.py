@@ -0,0 +1,149 @@
+from typing import Any, Dict, List, Optional
+
+from beanie import PydanticObjectId
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from app.models.channel import Channel, ChannelInfo, PublishChannel
+from app.settings import BULK_WRITE_BATCH_SIZE
+from app.utils.identity_map import load, forget
+from app.utils.log import get_logger
+
+
+logger = get_logger(__name__)
+
+# Channel records are looked up by channel id (the ChannelInfo _id) through the request's identity
+# map: a content write reads ChannelInfo and its rebuild the Channel, a publish reads ChannelInfo and
+# PublishChannel several times, and every lookup after the first hits memory. Instances are shared,
+# so save()/update()/set() on them keep the map current; writes through queries must call forget_channel().
+
+
+async def load_channel_info(channel_id: str) -> Optional[ChannelInfo]:
+    if not ObjectId.is_valid(channel_id):
+        return None
+    return await load(ChannelInfo, "_id", PydanticObjectId(channel_id))
+
+
+async def load_channel(channel_id: str) -> Optional[Channel]:
+    return await load(Channel, "channel_id", channel_id)
+
+
+async def load_publish_channel(channel_id: str) -> Optional[PublishChannel]:
+    return await load(PublishChannel, "channel_id", channel_id)
+
+
+async def load_owned_channel(channel_id: str, user_id: str) -> Optional[Channel]:
+    """The Channel if it belongs to user_id."""
+    channel = await load_channel(channel_id)
+    if channel is None or str(channel.user_id) != str(user_id):
+        return None
+    return channel
+
+
+async def load_owned_channel_info(channel_id: str, user_id: str) -> Optional[ChannelInfo]:
+    """The ChannelInfo if it belongs to user_id."""
+    channel_info = await load_channel_info(channel_id)
+    if channel_info is None or channel_info.user_id != str(user_id):
+        return None
+    return channel_info
+
+
+def forget_channel(channel_id: str, *models) -> None:
+    """Drop the channel's records (or only those of `models`) from the request's identity map."""
+    models = models or (ChannelInfo, Channel, PublishChannel)
+    if ChannelInfo in models and ObjectId.is_valid(channel_id):
+        forget(ChannelInfo, "_id", PydanticObjectId(channel_id))
+    for model in (Channel, PublishChannel):
+        if model in models:
+            forget(model, "channel_id", channel_id)
+
+
+# Channel fields that are copies of ChannelInfo / PublishChannel fields of the same name. They are
+# written through when the source changes (write_through), so readers and the outline rebuild use
+# the Channel alone; check_channel_records finds and repairs drift.
+CHANNEL_INFO_FIELDS = [
+    "name", "description", "primary_language", "target_language", "avatar_file_id", "cover_image_file_id"
+]
+PUBLISH_FIELDS = ["published", "channel_link"]
+
+
+def channel_info_fields(channel_info: Dict[str, Any]) -> Dict[str, Any]:
+    fields = {field: channel_info.get(field) for field in CHANNEL_INFO_FIELDS}
+    # Channel.description is required; ChannelInfo's is optional
+    fields["description"] = fields["description"] or ""
+    return fields
+
+
+def publish_fields(publish_channel: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """A channel without a PublishChannel record is unpublished."""
+    publish_channel = publish_channel or {}
+    return {"published": publish_channel.get("published", False), "channel_link": publish_channel.get("channel_link")}
+
+
+async def write_through(
+    channel_id: str,
+    channel_info: Optional[ChannelInfo] = None,
+    publish_channel: Optional[PublishChannel] = None
+) -> None:
+    """Copy the fields of a ChannelInfo and/or PublishChannel that just changed onto the Channel."""
+    fields = {}
+    if channel_info is not None:
+        fields.update(channel_info_fields(channel_info.model_dump()))
+    if publish_channel is not None:
+        fields.update(publish_fields(publish_channel.model_dump()))
+    if fields:
+        await Channel.find_one({"channel_id": channel_id}).update({"$set": fields})
+        forget_channel(channel_id, Channel)
+
+
+async def check_batch(channels: List[Dict[str, Any]], counts: Dict[str, int], fix: bool) -> None:
+    channel_ids = [channel["channel_id"] for channel in channels]
+    infos = {
+        str(info["_id"]): info
+        async for info in ChannelInfo.get_motor_collection().find(
+            {"_id": {"$in": [ObjectId(i) for i in channel_ids if ObjectId.is_valid(i)]}},
+            {field: 1 for field in CHANNEL_INFO_FIELDS}
+        )
+    }
+    publishes: Dict[str, Dict[str, Any]] = {}
+    async for publish in PublishChannel.get_motor_collection().find(
+        {"channel_id": {"$in": channel_ids}}, {"channel_id": 1, **{field: 1 for field in PUBLISH_FIELDS}}
+    ):
+        publishes.setdefault(publish["channel_id"], publish)
+
+    operations = []
+    for channel in channels:
+        counts["checked"] += 1
+        info = infos.get(channel["channel_id"])
+        if info is None:
+            # Left by a failed delete; sweep_orphans removes it
+            counts["missing_info"] += 1
+            continue
+        expected = {**channel_info_fields(info), **publish_fields(publishes.get(channel["channel_id"]))}
+        drift = {field: value for field, value in expected.items() if channel.get(field) != value}
+        if drift:
+            counts["mismatched"] += 1
+            logger.warning("channel record drift", extra={"channel_id": channel["channel_id"], "fields": sorted(drift)})
+            operations.append(UpdateOne({"_id": channel["_id"]}, {"$set": drift}))
+
+    if fix and operations:
+        await Channel.get_motor_collection().bulk_write(operations, ordered=False)
+        counts["fixed"] += len(operations)
+
+
+async def check_channel_records(fix: bool = False, batch_size: int = BULK_WRITE_BATCH_SIZE) -> Dict[str, int]:
+    """
+    Compare the denormalized fields of every Channel with its ChannelInfo and PublishChannel, one
+    $in query per source and batch. With fix, drifted channels are rewritten with one bulk_write per batch.
+    """
+    counts = {"checked": 0, "mismatched": 0, "fixed": 0, "missing_info": 0}
+    projection = {"channel_id": 1, **{field: 1 for field in CHANNEL_INFO_FIELDS + PUBLISH_FIELDS}}
+    batch: List[Dict[str, Any]] = []
+    async for channel in Channel.get_motor_collection().find({}, projection, batch_size=batch_size):
+        batch.append(channel)
+        if len(batch) >= batch_size:
+            await check_batch(batch, counts, fix)
+            batch = []
+    if batch:
+        await check_batch(batch, counts, fix)
+    return counts
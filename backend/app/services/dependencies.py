@@ -1,8 +1,14 @@
 from app.services.file_service import FileService
+from app.services.outline_repository import OutlineRepository, outline_repository
 from app.database import get_gridfs
 
 
 async def get_file_service() -> FileService:
     """Get FileService instance with GridFS bucket"""
     gridfs_bucket = await get_gridfs()
-    return FileService(gridfs_bucket) 
\ No newline at end of file
+    return FileService(gridfs_bucket) 
+
+
+async def get_outline_repository() -> OutlineRepository:
+    """Get the OutlineRepository of the configured storage layout (OUTLINE_STORAGE)"""
+    return outline_repository()
@@ -0,0 +1,324 @@
+from typing import Any, Dict, List, Optional, Type
+
+from beanie import Document
+from beanie.odm.utils.dump import get_dict
+from bson import ObjectId
+from pymongo import ReplaceOne, UpdateOne
+
+from app.models.channel import (
+    OutlineNode,
+    SectionOutline, UnitOutline, ActivityOutline, LessonOutline, QuizOutline,
+    Lesson, Question
+)
+from app.settings import OUTLINE_STORAGE
+from app.utils.outline import CONTENT_TREE
+from app.utils.log import get_logger
+
+
+logger = get_logger(__name__)
+
+# model -> (field pointing at its parent, parent model)
+PARENTS = {model: (parent_field, parent) for model, parent_field, parent in CONTENT_TREE}
+
+# Outline models and the kind of the OutlineNode they are stored as
+NODE_KINDS = {
+    SectionOutline: "section",
+    UnitOutline: "unit",
+    ActivityOutline: "activity",
+    LessonOutline: "lesson",
+    QuizOutline: "quiz",
+}
+
+# Stored in the parent node's `items`; the other content models (Section, Unit, Activity) are its `content`
+ITEM_MODELS = (Lesson, Question)
+
+
+def raw_document(document: Document) -> Dict[str, Any]:
+    """The document as stored in its own collection (model_dump would turn ids into strings)."""
+    return get_dict(document, to_db=True)
+
+
+def by_order(documents: List[Document]) -> List[Document]:
+    return sorted(documents, key=lambda doc: getattr(doc, "order", 0) or 0)
+
+
+class ChannelTree:
+    """Every outline/content document of one channel, indexed by parent id."""
+
+    def __init__(self, documents: Dict[Type[Document], List[Document]]):
+        self.documents = documents
+        self._children: Dict[Type[Document], Dict[str, List[Document]]] = {}
+        for model, parent_field, _ in CONTENT_TREE:
+            index = self._children[model] = {}
+            for doc in by_order(documents.get(model, [])):
+                index.setdefault(getattr(doc, parent_field), []).append(doc)
+
+    def children(self, model: Type[Document], parent_id: str) -> List[Document]:
+        """Documents of `model` under parent_id, sorted by order."""
+        return self._children[model].get(parent_id, [])
+
+    def content(self, model: Type[Document], outline_id: str) -> Optional[Document]:
+        """The Section / Unit / Activity document of an outline."""
+        found = self.children(model, outline_id)
+        return found[0] if found else None
+
+    def count(self) -> int:
+        return sum(len(docs) for docs in self.documents.values())
+
+
+class OutlineRepository:
+    """
+    Reads and writes of the outline/content models (CONTENT_TREE), one collection per model.
+    Content APIs and the outline rebuild go through a repository so that the storage layout
+    can change (OUTLINE_STORAGE) without touching them.
+    """
+    layout = "collections"
+
+    async def get(self, model: Type[Document], filters: Dict[str, Any]) -> Optional[Document]:
+        return await model.find_one(filters)
+
+    async def find(self, model: Type[Document], filters: Dict[str, Any]) -> List[Document]:
+        return await model.find(filters).sort("order").to_list()
+
+    async def insert(self, document: Document) -> Document:
+        await document.insert()
+        return document
+
+    async def save(self, document: Document) -> Document:
+        await document.save()
+        return document
+
+    async def delete(self, document: Document) -> None:
+        await document.delete()
+
+    async def insert_many(self, model: Type[Document], documents: List[Document], ordered: bool = True) -> None:
+        if documents:
+            await model.insert_many(documents, ordered=ordered)
+
+    async def set_fields(self, model: Type[Document], updates: Dict[str, Dict[str, Any]]) -> None:
+        """$set fields of many documents (document id -> fields) with one unordered bulk_write."""
+        if updates:
+            await model.get_motor_collection().bulk_write([
+                UpdateOne({"_id": ObjectId(document_id)}, {"$set": fields})
+                for document_id, fields in updates.items()
+            ], ordered=False)
+
+    async def channel_ids(self, model: Type[Document], ids: List[str]) -> Dict[str, str]:
+        """
+        The channel id of each `model` outline in ids (unknown ids are left out), read from the
+        outline collections with one $in query per level up to SectionOutline, so that it does not
+        depend on the Channel's outline_content having been rebuilt yet.
+        """
+        current = {i: i for i in ids if ObjectId.is_valid(i)}
+        while current:
+            parent_field, parent = PARENTS[model]
+            parents = {
+                str(doc["_id"]): doc.get(parent_field)
+                async for doc in model.get_motor_collection().find(
+                    {"_id": {"$in": [ObjectId(i) for i in set(current.values())]}}, {parent_field: 1}
+                )
+            }
+            current = {i: parents[level_id] for i, level_id in current.items() if parents.get(level_id)}
+            if parent is None:
+                return current
+            current = {i: parent_id for i, parent_id in current.items() if ObjectId.is_valid(parent_id)}
+            model = parent
+        return {}
+
+    async def load_tree(self, channel_id: str) -> ChannelTree:
+        """The whole channel, with one $in query per CONTENT_TREE level."""
+        documents: Dict[Type[Document], List[Document]] = {}
+        for model, parent_field, parent in CONTENT_TREE:
+            parent_ids = [str(doc.id) for doc in documents[parent]] if parent else [channel_id]
+            documents[model] = await model.find({parent_field: {"$in": parent_ids}}).to_list() if parent_ids else []
+        return ChannelTree(documents)
+
+    async def sync_channel(self, channel_id: str) -> int:
+        """Bring any derived storage of the channel up to date after writes that bypassed the repository."""
+        return 0
+
+
+class NodeOutlineRepository(OutlineRepository):
+    """
+    The per-model collections stay the source of truth (other modules still query them), and each
+    outline node is additionally stored with its content in outline_nodes: every write through the
+    repository is mirrored into its node, and load_tree reads a whole channel with one query.
+    Channels without nodes (not migrated yet, cloned or imported) are synced on first read.
+    """
+    layout = "nodes"
+
+    def node_operations(self, document: Document) -> List[UpdateOne]:
+        """Updates bringing the node of `document` up to date (the node must exist)."""
+        model = type(document)
+        raw = raw_document(document)
+        parent_field, _ = PARENTS[model]
+        if model in NODE_KINDS:
+            return [UpdateOne({"_id": document.id}, {"$set": {
+                "parent_id": None if model is SectionOutline else raw[parent_field],
+                "order": raw.get("order") or 0,
+                "outline": raw,
+            }})]
+        node_id = ObjectId(raw[parent_field])
+        if model in ITEM_MODELS:
+            return [
+                UpdateOne({"_id": node_id}, {"$pull": {"items": {"_id": document.id}}}),
+                UpdateOne({"_id": node_id}, {"$push": {"items": raw}}),
+            ]
+        # The first content document of an outline is its content (ChannelTree.content, write_nodes);
+        # a second one written for the same outline must not replace it
+        return [UpdateOne(
+            {"_id": node_id, "$or": [{"content": None}, {"content._id": document.id}]},
+            {"$set": {"content": raw}}
+        )]
+
+    async def mirror(self, documents: List[Document]) -> None:
+        operations = [op for document in documents for op in self.node_operations(document)]
+        if operations:
+            # ordered: an item's $pull must run before its $push
+            await OutlineNode.get_motor_collection().bulk_write(operations, ordered=True)
+
+    async def insert_node(self, document: Document) -> None:
+        model = type(document)
+        parent_field, _ = PARENTS[model]
+        parent_id = getattr(document, parent_field)
+        if model is SectionOutline:
+            channel_id = parent_id
+            if not await OutlineNode.get_motor_collection().find_one({"channel_id": channel_id}, {"_id": 1}):
+                # First node of the channel: write all of them, or load_tree would see only this one
+                await self.sync_channel(channel_id)
+                return
+        else:
+            parent = await OutlineNode.get_motor_collection().find_one({"_id": ObjectId(parent_id)}, {"channel_id": 1})
+            if not parent:
+                # Channel not migrated yet: load_tree syncs it on its next read
+                return
+            channel_id = parent["channel_id"]
+        node = raw_node(model, channel_id, raw_document(document))
+        # $setOnInsert: the node may already have been written by a sync of the channel
+        await OutlineNode.get_motor_collection().update_one({"_id": node["_id"]}, {"$setOnInsert": node}, upsert=True)
+
+    async def insert(self, document: Document) -> Document:
+        await super().insert(document)
+        if type(document) in NODE_KINDS:
+            await self.insert_node(document)
+        else:
+            await self.mirror([document])
+        return document
+
+    async def save(self, document: Document) -> Document:
+        await super().save(document)
+        await self.mirror([document])
+        return document
+
+    async def delete(self, document: Document) -> None:
+        await super().delete(document)
+        model = type(document)
+        nodes = OutlineNode.get_motor_collection()
+        if model in NODE_KINDS:
+            await nodes.delete_one({"_id": document.id})
+            return
+        parent_field, _ = PARENTS[model]
+        node_id = ObjectId(getattr(document, parent_field))
+        if model in ITEM_MODELS:
+            await nodes.update_one({"_id": node_id}, {"$pull": {"items": {"_id": document.id}}})
+        else:
+            await nodes.update_one({"_id": node_id, "content._id": document.id}, {"$set": {"content": None}})
+
+    async def insert_many(self, model: Type[Document], documents: List[Document], ordered: bool = True) -> None:
+        try:
+            await super().insert_many(model, documents, ordered)
+        finally:
+            # With ordered=False some documents may be written even when this raises
+            if model in NODE_KINDS:
+                for document in documents:
+                    await self.insert_node(document)
+            else:
+                await self.mirror(await model.find({"_id": {"$in": [doc.id for doc in documents]}}).to_list())
+
+    async def set_fields(self, model: Type[Document], updates: Dict[str, Dict[str, Any]]) -> None:
+        await super().set_fields(model, updates)
+        if updates:
+            ids = [ObjectId(document_id) for document_id in updates]
+            await self.mirror(await model.find({"_id": {"$in": ids}}).to_list())
+
+    async def load_tree(self, channel_id: str) -> ChannelTree:
+        """The whole channel from outline_nodes with one query."""
+        documents: Dict[Type[Document], List[Document]] = {model: [] for model, _, _ in CONTENT_TREE}
+        models = {kind: model for model, kind in NODE_KINDS.items()}
+        content_models = {PARENTS[model][1]: model for model, _, _ in CONTENT_TREE if model not in NODE_KINDS}
+
+        nodes = 0
+        async for node in OutlineNode.get_motor_collection().find({"channel_id": channel_id}):
+            nodes += 1
+            model = models[node["kind"]]
+            documents[model].append(model.model_validate(node["outline"]))
+            content_model = content_models[model]
+            if content_model in ITEM_MODELS:
+                documents[content_model] += [content_model.model_validate(item) for item in node.get("items") or []]
+            elif node.get("content"):
+                documents[content_model].append(content_model.model_validate(node["content"]))
+
+        if not nodes:
+            tree = await super().load_tree(channel_id)
+            if tree.count():
+                await self.write_nodes(channel_id, tree)
+            return tree
+        return ChannelTree(documents)
+
+    async def write_nodes(self, channel_id: str, tree: ChannelTree) -> int:
+        """Replace the channel's nodes with the ones built from `tree`."""
+        nodes = {}
+        for model, kind in NODE_KINDS.items():
+            for document in tree.documents.get(model, []):
+                nodes[document.id] = raw_node(model, channel_id, raw_document(document))
+        for model, parent_field, parent in CONTENT_TREE:
+            if model in NODE_KINDS:
+                continue
+            for document in tree.documents.get(model, []):
+                node = nodes.get(ObjectId(getattr(document, parent_field)))
+                if node is None:
+                    continue
+                if model in ITEM_MODELS:
+                    node["items"].append(raw_document(document))
+                elif node["content"] is None:
+                    node["content"] = raw_document(document)
+
+        collection = OutlineNode.get_motor_collection()
+        if nodes:
+            await collection.bulk_write([
+                ReplaceOne({"_id": node_id}, node, upsert=True) for node_id, node in nodes.items()
+            ], ordered=False)
+        await collection.delete_many({"channel_id": channel_id, "_id": {"$nin": list(nodes)}})
+        return len(nodes)
+
+    async def sync_channel(self, channel_id: str) -> int:
+        """Rebuild the channel's nodes from the per-model collections; returns the number of nodes."""
+        count = await self.write_nodes(channel_id, await super().load_tree(channel_id))
+        logger.debug("outline nodes synced", extra={"channel_id": channel_id, "nodes": count})
+        return count
+
+
+def raw_node(model: Type[Document], channel_id: str, outline: Dict[str, Any]) -> Dict[str, Any]:
+    parent_field, _ = PARENTS[model]
+    return {
+        "_id": outline["_id"],
+        "channel_id": channel_id,
+        "kind": NODE_KINDS[model],
+        "parent_id": None if model is SectionOutline else outline[parent_field],
+        "order": outline.get("order") or 0,
+        "outline": outline,
+        "content": None,
+        "items": [],
+    }
+
+
+REPOSITORIES = {
+    OutlineRepository.layout: OutlineRepository,
+    NodeOutlineRepository.layout: NodeOutlineRepository,
+}
+
+
+def outline_repository(layout: str = OUTLINE_STORAGE) -> OutlineRepository:
+    if layout not in REPOSITORIES:
+        raise ValueError(f"Unknown OUTLINE_STORAGE {layout!r}; expected one of {', '.join(REPOSITORIES)}")
+    return REPOSITORIES[layout]()
@@ -27,6 +27,7 @@ MONGO_URI = getenv('MONGO_URI', default='mongodb://127.0.0.1:27017/yaralex')
 
 # MongoDB Settings
 MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "y2")
+MONGO_TRANSACTIONS = os.getenv("MONGO_TRANSACTIONS", "false").lower() == "true"  # replica set / mongos only
 
 # JWT Settings
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "e132075bcc8c48809bb20b9bda648e16")  # Using same secret key as SECRET_KEY above
@@ -38,6 +39,8 @@ MAX_LOGIN_ATTEMPTS = int(os.getenv("MAX_LOGIN_ATTEMPTS", "5"))
 ACCOUNT_LOCKOUT_MINUTES = int(os.getenv("ACCOUNT_LOCKOUT_MINUTES", "30"))
 PASSWORD_MIN_LENGTH = int(os.getenv("PASSWORD_MIN_LENGTH", "8"))
 PASSWORD_MAX_LENGTH = int(os.getenv("PASSWORD_MAX_LENGTH", "32"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))  # bcrypt threads
+PASSWORD_HASH_CONCURRENCY = int(os.getenv("PASSWORD_HASH_CONCURRENCY", "32"))  # max hashing calls running or queued
 
 # Email Settings
 SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
@@ -46,6 +49,19 @@ SMTP_USER = os.getenv("SMTP_USER", "yaralex.co@gmail.com")
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "avsq dgru rgwp izwq")
 SMTP_FROM_EMAIL = os.getenv("SMTP_FROM_EMAIL", "yaralex.co@gmail.com")
 SMTP_FROM_NAME = os.getenv("SMTP_FROM_NAME", "YaraLex")
+# For a local sink (e.g. `python -m aiosmtpd -n -l localhost:1025`): SMTP_HOST=localhost SMTP_PORT=1025
+# SMTP_START_TLS=false SMTP_USER= SMTP_PASSWORD=
+SMTP_USE_TLS = os.getenv("SMTP_USE_TLS", "false").lower() == "true"  # implicit TLS (port 465)
+SMTP_START_TLS = os.getenv("SMTP_START_TLS", "true").lower() == "true"
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "30"))
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "2"))  # persistent connections = mail workers
+MAIL_MAX_ATTEMPTS = int(os.getenv("MAIL_MAX_ATTEMPTS", "6"))
+MAIL_RETRY_BASE_SECONDS = int(os.getenv("MAIL_RETRY_BASE_SECONDS", "30"))
+MAIL_RETRY_MAX_SECONDS = int(os.getenv("MAIL_RETRY_MAX_SECONDS", "3600"))
+MAIL_SEND_LEASE_SECONDS = int(os.getenv("MAIL_SEND_LEASE_SECONDS", "120"))  # re-queue if a worker dies mid-send
+MAIL_POLL_SECONDS = int(os.getenv("MAIL_POLL_SECONDS", "15"))
+MAIL_ERROR_BACKOFF_SECONDS = float(os.getenv("MAIL_ERROR_BACKOFF_SECONDS", "1"))  # pause after a message could not be processed
+MAIL_RETENTION_SECONDS = int(os.getenv("MAIL_RETENTION_SECONDS", str(7 * 24 * 3600)))  # sent/failed rows, then deleted
 
 # Frontend URL (for email links)
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:3000")
@@ -63,8 +79,13 @@ CORS_ORIGINS = [
     # Add your production frontend URL here
 ]
 
+API_WORKERS = int(os.getenv("WEB_CONCURRENCY", "1"))  # uvicorn worker processes (uvicorn reads WEB_CONCURRENCY too)
+
 # Rate Limiting
 RATE_LIMIT_PER_MINUTE = int(os.getenv("RATE_LIMIT_PER_MINUTE", "60"))
+# "memory" (per worker) or "mongo" (shared); several workers share by default, or each would allow the full budget
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "mongo" if API_WORKERS > 1 else "memory")
+RATE_LIMIT_TRUST_PROXY = os.getenv("RATE_LIMIT_TRUST_PROXY", "false").lower() == "true"  # use X-Forwarded-For
 
 # Environment
 ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
@@ -72,9 +93,29 @@ DEBUG = ENVIRONMENT == "development"
 
 # Logging
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO" if not DEBUG else "DEBUG")
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")  # per-module overrides, e.g. "app.utils.security=WARNING,app.api.play=DEBUG"
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text" if DEBUG else "json")  # "json" or "text"
+
+# Background jobs (AI generation, channel duplication...)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))  # concurrent jobs per API worker
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "60"))  # a RUNNING job not renewed for this long is failed
+BULK_WRITE_BATCH_SIZE = int(os.getenv("BULK_WRITE_BATCH_SIZE", "500"))  # documents per insert_many/bulk_write call
+IMPORT_MAX_RECORDS = int(os.getenv("IMPORT_MAX_RECORDS", "10000"))  # lessons/questions per bulk import request
+OUTLINE_REBUILD_DELAY = float(os.getenv("OUTLINE_REBUILD_DELAY", "0.5"))  # seconds content writes are coalesced per channel
+CHANNEL_SWEEP_DELAY = float(os.getenv("CHANNEL_SWEEP_DELAY", "60"))  # seconds after a channel delete before its ids are swept again
+OUTLINE_REBUILD_SYNC = os.getenv("OUTLINE_REBUILD_SYNC", "false").lower() == "true"  # rebuild inside the write request
+ORDER_GAP = int(os.getenv("ORDER_GAP", "1024"))  # spacing of outline `order` values when siblings are renumbered
+OUTLINE_STORAGE = os.getenv("OUTLINE_STORAGE", "collections")  # "collections", or "nodes" to also keep outline_nodes (outline + content per node)
+
+# Question templates (app/api/studio/channel/template.json)
+TEMPLATE_HOT_RELOAD = os.getenv("TEMPLATE_HOT_RELOAD", str(DEBUG)).lower() == "true"  # reload on file change
 
 # Cache Settings
 CACHE_TTL = int(os.getenv("CACHE_TTL", "300"))  # 5 minutes
+# "memory" (per worker) or "mongo" (shared); several workers share by default, or purge() would only reach one of them
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "mongo" if API_WORKERS > 1 else "memory")
+AUTH_CACHE_TTL = int(os.getenv("AUTH_CACHE_TTL", "60"))  # authenticated-user cache, seconds
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))  # max cached (user, token) sessions
 
 # File Upload Settings
 MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", "5242880"))  # 5MB
@@ -1,44 +1,79 @@
+from pathlib import Path
+from types import MappingProxyType
+from typing import Dict, Iterable, Mapping, Optional, Set
+
 import yaml
 from yaml.cyaml import CLoader
 
 from app.settings import LANGUAGES
 
 
-translations = {}
+TRANSLATIONS_DIR = Path(__file__).parent
+PLACEHOLDER = '---'
+
+# lang -> code -> text; replaced wholesale by load_translations(), never mutated
+translations: Mapping[str, Mapping[str, str]] = MappingProxyType({})
+# Codes looked up but absent from at least one language; written out by flush_missing_translations()
+missing_codes: Set[str] = set()
+_memo: Dict[str, Dict[str, str]] = {}
 
 
 def load_translations():
+    """Load every language table once (at startup) into immutable mappings."""
+    global translations
+    tables = {}
     for lang in LANGUAGES:
-        file_path = f'app/translations/{lang}.yaml'
         try:
-            with open(file_path, encoding='utf-8') as f:
-                translations[lang] = yaml.load(f, Loader=CLoader)
+            with open(TRANSLATIONS_DIR / f'{lang}.yaml', encoding='utf-8') as f:
+                tables[lang] = MappingProxyType(yaml.load(f, Loader=CLoader) or {})
         except FileNotFoundError:
-            translations[lang] = {}
-            with open(file_path, 'w', encoding='utf-8') as f:
-                yaml.dump(translations[lang], f)
+            tables[lang] = MappingProxyType({})
+    translations = MappingProxyType(tables)
+    _memo.clear()
 
 
 def translate(code: str):
     """
     Translate a given code into all supported languages.
-    If the code isn’t in the translation file, append it with '---'.
-    If the value is '---', return the code itself.
-    Updates the YAML files if new codes are added.
+    A code without a translation (missing, or still '---') falls back to the code itself.
+    Unknown codes are only recorded in memory; run scripts/flush_translations.py to add them
+    to the YAML files. Results are memoized per code; treat the returned dict as read-only.
     """
+    result = _memo.get(code)
+    if result is not None:
+        return result
+
     result = {}
     for lang in LANGUAGES:
         messages = translations.get(lang, {})
-        value = messages.get(code, '---')
-        #
         if code not in messages:
-            # Append the code with '---' if it doesn’t exist
-            messages[code] = '---'
-            translations[lang] = messages
-            # Update the YAML files
-            with open(f'app/translations/{lang}.yaml', 'w', encoding='utf-8') as f:
-                yaml.dump(messages, f)
-
+            missing_codes.add(code)
+        value = messages.get(code, PLACEHOLDER)
         # If value is '---', use the code itself; otherwise, use the translated value
-        result[lang] = code if value == '---' else value
+        result[lang] = code if value == PLACEHOLDER else value
+    _memo[code] = result
     return result
+
+
+def flush_missing_translations(codes: Optional[Iterable[str]] = None) -> Dict[str, int]:
+    """
+    Append '---' placeholders for missing codes to each language's YAML file.
+    Meant for tooling only, never the request path. Returns the number of codes added per language.
+    """
+    codes = set(missing_codes if codes is None else codes)
+    added = {}
+    for lang in LANGUAGES:
+        path = TRANSLATIONS_DIR / f'{lang}.yaml'
+        try:
+            with open(path, encoding='utf-8') as f:
+                messages = yaml.load(f, Loader=CLoader) or {}
+        except FileNotFoundError:
+            messages = {}
+        new_codes = sorted(code for code in codes if code not in messages)
+        if new_codes:
+            messages.update({code: PLACEHOLDER for code in new_codes})
+            with open(path, 'w', encoding='utf-8') as f:
+                yaml.dump(messages, f, allow_unicode=True)
+        added[lang] = len(new_codes)
+    missing_codes.difference_update(codes)
+    return added
@@ -0,0 +1,151 @@
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from fastapi.encoders import jsonable_encoder
+
+from app.models.cache import CacheEntry
+from app.settings import CACHE_TTL, CACHE_BACKEND, FEATURES
+
+
+MISSING = object()
+
+# Every cache registers itself here so writers can invalidate tags without knowing the readers
+_caches: List['TTLCache'] = []
+
+
+class TTLCache:
+    """
+    Bounded in-process LRU cache with a per-entry TTL and tag-based invalidation.
+    Not shared between workers; keep TTLs short enough that cross-worker staleness is acceptable.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: 'OrderedDict[Hashable, Tuple[float, Any, Tuple[str, ...]]]' = OrderedDict()
+        self._tags: Dict[str, Set[Hashable]] = {}
+        _caches.append(self)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+        expires_at, value, _ = entry
+        if expires_at <= time.monotonic():
+            self.delete(key)
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, tags: Iterable[str] = (), ttl: Optional[float] = None) -> None:
+        if key in self._data:
+            self.delete(key)
+        tags = tuple(tags)
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value, tags)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+        while len(self._data) > self.maxsize:
+            self.delete(next(iter(self._data)))
+
+    def delete(self, key: Hashable) -> None:
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def invalidate_tag(self, tag: str) -> None:
+        for key in list(self._tags.get(tag, ())):
+            self.delete(key)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._tags.clear()
+
+
+def invalidate(*tags: str) -> None:
+    """Drop every cached entry carrying any of the given tags, in all caches."""
+    for cache in _caches:
+        for tag in tags:
+            cache.invalidate_tag(tag)
+
+
+class MongoCacheBackend:
+    """Entries shared by every worker in the cache_entries collection (TTL-indexed on expires_at)."""
+
+    async def get(self, key: str) -> Any:
+        entry = await CacheEntry.find_one({"_id": key, "expires_at": {"$gt": datetime.utcnow()}})
+        return entry.value if entry else MISSING
+
+    async def set(self, key: str, value: Any, tags: Iterable[str], ttl: float) -> None:
+        await CacheEntry.get_motor_collection().replace_one(
+            {"_id": key},
+            {"value": value, "tags": list(tags), "expires_at": datetime.utcnow() + timedelta(seconds=ttl)},
+            upsert=True,
+        )
+
+    async def invalidate(self, tags: Iterable[str]) -> None:
+        await CacheEntry.get_motor_collection().delete_many({"tags": {"$in": list(tags)}})
+
+
+shared_backend: Optional[MongoCacheBackend] = MongoCacheBackend() if CACHE_BACKEND == 'mongo' else None
+
+
+class ResponseCache:
+    """
+    Cache for endpoint payloads, switched off by FEATURES['caching'].
+    Values are stored JSON-encoded so the in-process LRU and the optional shared backend behave
+    the same. With a shared backend the local tier is bypassed, so an invalidation in one worker
+    is seen by all of them.
+    """
+
+    def __init__(self, name: str, maxsize: int = 1024, ttl: Optional[float] = None):
+        self.name = name
+        self.ttl = CACHE_TTL if ttl is None else ttl
+        self.local = TTLCache(maxsize=maxsize, ttl=self.ttl)
+
+    async def get(self, key: Hashable) -> Any:
+        if not FEATURES.get('caching'):
+            return MISSING
+        if shared_backend is not None:
+            return await shared_backend.get(f'{self.name}:{key}')
+        return self.local.get(key)
+
+    async def set(self, key: Hashable, value: Any, tags: Iterable[str] = ()) -> Any:
+        """Store and return the JSON-encoded value."""
+        value = jsonable_encoder(value)
+        if not FEATURES.get('caching'):
+            return value
+        if shared_backend is not None:
+            await shared_backend.set(f'{self.name}:{key}', value, tags, self.ttl)
+        else:
+            self.local.set(key, value, tags=tags)
+        return value
+
+
+async def purge(*tags: str) -> None:
+    """invalidate() plus the shared backend; use this from endpoints that write cached data."""
+    invalidate(*tags)
+    if shared_backend is not None:
+        await shared_backend.invalidate(tags)
+
+
+def channel_tag(channel_id: str) -> str:
+    return f'channel:{channel_id}'
+
+
+def creator_tag(creator_id: str) -> str:
+    return f'creator:{creator_id}'
+
+
+def user_tag(user_id: str) -> str:
+    return f'user:{user_id}'
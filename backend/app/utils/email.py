@@ -1,57 +1,252 @@
-from typing import Optional
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+from typing import List, Optional
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from email.utils import formataddr
 from jinja2 import Environment, FileSystemLoader
+from pymongo import ReturnDocument
+import aiosmtplib
+import asyncio
 import os
 
+from app.models.mail import OutboundEmail, OutboundEmailStatus
+from app.utils.log import get_logger
 from app.settings import (
     SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASSWORD,
-    SMTP_FROM_EMAIL, SMTP_FROM_NAME, FRONTEND_URL
+    SMTP_FROM_EMAIL, SMTP_FROM_NAME, FRONTEND_URL,
+    SMTP_USE_TLS, SMTP_START_TLS, SMTP_TIMEOUT, SMTP_POOL_SIZE,
+    MAIL_MAX_ATTEMPTS, MAIL_RETRY_BASE_SECONDS, MAIL_RETRY_MAX_SECONDS,
+    MAIL_SEND_LEASE_SECONDS, MAIL_POLL_SECONDS, MAIL_RETENTION_SECONDS, MAIL_ERROR_BACKOFF_SECONDS
 )
 
+logger = get_logger(__name__)
+
 # Initialize Jinja2 environment
 template_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'templates', 'email')
 env = Environment(loader=FileSystemLoader(template_dir))
 
+
+class SMTPPool:
+    """
+    A few long-lived, logged-in SMTP connections shared by the mail workers.
+    A connection that fails is dropped and transparently re-opened on next use.
+    """
+
+    def __init__(self, size: int):
+        self._idle: 'asyncio.Queue[Optional[aiosmtplib.SMTP]]' = asyncio.Queue()
+        for _ in range(size):
+            self._idle.put_nowait(None)
+
+    @staticmethod
+    async def _connect() -> aiosmtplib.SMTP:
+        client = aiosmtplib.SMTP(
+            hostname=SMTP_HOST,
+            port=SMTP_PORT,
+            username=SMTP_USER or None,
+            password=SMTP_PASSWORD or None,
+            use_tls=SMTP_USE_TLS,
+            start_tls=False if SMTP_USE_TLS else SMTP_START_TLS,
+            timeout=SMTP_TIMEOUT,
+        )
+        await client.connect()
+        return client
+
+    async def send(self, message: EmailMessage) -> None:
+        client = await self._idle.get()
+        try:
+            if client is None or not client.is_connected:
+                client = await self._connect()
+            try:
+                await client.send_message(message)
+            except (aiosmtplib.SMTPServerDisconnected, aiosmtplib.SMTPConnectError):
+                # The server closed an idle connection; retry once on a fresh one
+                client = await self._connect()
+                await client.send_message(message)
+        except Exception:
+            if client is not None:
+                client.close()
+            client = None
+            raise
+        finally:
+            self._idle.put_nowait(client)
+
+    async def close(self) -> None:
+        while not self._idle.empty():
+            client = self._idle.get_nowait()
+            if client is not None and client.is_connected:
+                try:
+                    await client.quit()
+                except aiosmtplib.SMTPException:
+                    client.close()
+
+
+_pool: Optional[SMTPPool] = None
+_workers: List[asyncio.Task] = []
+_wakeup = asyncio.Event()
+
+
+def build_message(to_email: str, subject: str, text_content: Optional[str] = None) -> EmailMessage:
+    message = EmailMessage()
+    message['Subject'] = subject
+    message['From'] = formataddr((SMTP_FROM_NAME, SMTP_FROM_EMAIL))
+    message['To'] = to_email
+    message.set_content(text_content or '')
+    return message
+
+
+async def deliver_email(to_email: str, subject: str, text_content: Optional[str] = None) -> None:
+    """Send one message right away over the shared SMTP connections."""
+    global _pool
+    if _pool is None:
+        _pool = SMTPPool(SMTP_POOL_SIZE)
+    logger.debug("sending email", extra={"to": to_email, "subject": subject})
+    await _pool.send(build_message(to_email, subject, text_content))
+
+
 async def send_email(
     to_email: str,
     subject: str,
     # html_content: str,
     text_content: Optional[str] = None
-) -> None:
-    """Send an email using SMTP."""
-    try:
-        message = MIMEMultipart('alternative')
-        message['Subject'] = subject
-        message['From'] = SMTP_FROM_EMAIL
-        message['To'] = to_email
-
-
-        # Attach plain text content if provided
-        if text_content:
-            text_part = MIMEText(text_content, 'plain')
-            message.attach(text_part)
-
-        print("=== Email Variables Debug ===")
-        print(f"To Email: {to_email}")
-        print(f"Subject: {subject}")
-        print(f"Text Content: {text_content}")
-
-        print(f"  From: {message['From']}")
-        print(f"  To: {message['To']}")
-        print(f"  Subject: {message['Subject']}")
-        print("=== End Debug ===")
-        # Send email using Gmail SMTP
-        with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as server:
-            server.starttls()  # Secure the connection
-            server.login(SMTP_USER, SMTP_PASSWORD)
-            server.sendmail(SMTP_FROM_EMAIL, [to_email], message.as_string())
-            print("Email sent successfully")
+) -> OutboundEmail:
+    """
+    Queue an email for delivery and return without waiting for SMTP.
+    The message is persisted first, so it survives restarts and is retried with backoff.
+    """
+    email = OutboundEmail(to_email=to_email, subject=subject, text_content=text_content)
+    await email.insert()
+    _wakeup.set()
+    return email
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Exponential backoff: base, 2*base, 4*base... capped at MAIL_RETRY_MAX_SECONDS."""
+    return timedelta(seconds=min(MAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1), MAIL_RETRY_MAX_SECONDS))
 
+
+def finished(now: datetime) -> dict:
+    """Fields of a message that will not be sent again: its body (codes, reset links) goes now, the row later."""
+    return {"text_content": None, "expires_at": now + timedelta(seconds=MAIL_RETENTION_SECONDS)}
+
+
+async def fail_abandoned_emails(now: datetime) -> int:
+    """
+    Give up on messages whose send lease ran out on their last allowed attempt (the send killed or
+    hung its worker every time), so they are not leased again forever. Returns how many.
+    """
+    result = await OutboundEmail.get_motor_collection().update_many(
+        {
+            "status": OutboundEmailStatus.SENDING.value,
+            "next_attempt_at": {"$lte": now},
+            "attempts": {"$gte": MAIL_MAX_ATTEMPTS},
+        },
+        {"$set": {
+            "status": OutboundEmailStatus.FAILED.value,
+            "last_error": "Send lease expired on the last attempt",
+            **finished(now),
+        }},
+    )
+    if result.modified_count:
+        logger.error("email delivery abandoned", extra={"count": result.modified_count})
+    return result.modified_count
+
+
+async def claim_next_email() -> Optional[OutboundEmail]:
+    """Atomically lease the next due message so concurrent workers/processes never send it twice."""
+    now = datetime.utcnow()
+    await fail_abandoned_emails(now)
+    raw = await OutboundEmail.get_motor_collection().find_one_and_update(
+        {
+            "status": {"$in": [OutboundEmailStatus.PENDING.value, OutboundEmailStatus.SENDING.value]},
+            "next_attempt_at": {"$lte": now},
+            "attempts": {"$lt": MAIL_MAX_ATTEMPTS},
+        },
+        {
+            "$set": {
+                "status": OutboundEmailStatus.SENDING.value,
+                "next_attempt_at": now + timedelta(seconds=MAIL_SEND_LEASE_SECONDS),
+            },
+            "$inc": {"attempts": 1},
+        },
+        sort=[("next_attempt_at", 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+    return OutboundEmail.model_validate(raw) if raw else None
+
+
+async def process_email(email: OutboundEmail) -> None:
+    try:
+        await deliver_email(email.to_email, email.subject, email.text_content)
     except Exception as e:
-        print(f"Failed to send email: {e}")
-        raise  # Re-raise the exception to be handled by the caller
+        failed = email.attempts >= MAIL_MAX_ATTEMPTS
+        now = datetime.utcnow()
+        await email.set({
+            "status": OutboundEmailStatus.FAILED if failed else OutboundEmailStatus.PENDING,
+            "next_attempt_at": now + retry_delay(email.attempts),
+            "last_error": str(e),
+            **(finished(now) if failed else {}),
+        })
+        log = logger.error if failed else logger.warning
+        log("email delivery failed", extra={
+            "email_id": str(email.id), "to": email.to_email, "attempts": email.attempts,
+            "gave_up": failed, "reason": str(e),
+        })
+        return
+
+    now = datetime.utcnow()
+    await email.set({
+        "status": OutboundEmailStatus.SENT,
+        "sent_at": now,
+        "last_error": None,
+        **finished(now),
+    })
+    logger.info("email sent", extra={"email_id": str(email.id), "to": email.to_email, "subject": email.subject})
+
+
+async def mail_worker() -> None:
+    """Deliver queued messages until cancelled; sleeps until woken by send_email or the poll interval."""
+    while True:
+        # Cleared before claiming: a send_email() that lands while we claim must still wake us
+        _wakeup.clear()
+        try:
+            email = await claim_next_email()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("mail queue unavailable")
+            email = None
+
+        if email is not None:
+            try:
+                await process_email(email)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # e.g. the status update failed; the lease expires and the message is claimed again.
+                # Back off so a persistently failing database doesn't spin the loop
+                logger.exception("email processing failed", extra={"email_id": str(email.id)})
+                await asyncio.sleep(MAIL_ERROR_BACKOFF_SECONDS)
+            continue
+
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=MAIL_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+
+def start_mail_workers() -> None:
+    for _ in range(SMTP_POOL_SIZE):
+        _workers.append(asyncio.create_task(mail_worker()))
+
+
+async def stop_mail_workers() -> None:
+    global _pool
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
 
 async def send_verification_email(email: str, token: str) -> None:
     """Send email verification email."""
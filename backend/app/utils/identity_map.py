@@ -0,0 +1,145 @@
+import asyncio
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional, Tuple, Type
+
+from beanie import Document
+
+from app.utils.log import get_logger
+
+
+logger = get_logger(__name__)
+
+# (model, field, value) of a lookup, e.g. (Channel, "channel_id", "681f...")
+Key = Tuple[Type[Document], str, Any]
+
+_current: ContextVar[Optional["IdentityMap"]] = ContextVar("identity_map", default=None)
+
+
+class IdentityMap:
+    """
+    Documents loaded during one request, keyed by the field they were looked up by, so that
+    repeated lookups of the same key return the same instance without a query. Lookups of the same
+    model and field started concurrently (asyncio.gather) are batched into one $in query.
+    Misses are not remembered: a document inserted later in the request is found by the next lookup.
+    """
+
+    def __init__(self):
+        self.documents: Dict[Key, Document] = {}
+        self.pending: Dict[Tuple[Type[Document], str], Dict[Any, asyncio.Future]] = {}
+        self.hits = 0
+        self.queries = 0
+
+    async def load(self, model: Type[Document], field: str, value: Any) -> Optional[Document]:
+        key = (model, field, value)
+        if key in self.documents:
+            self.hits += 1
+            return self.documents[key]
+
+        batch_key = (model, field)
+        batch = self.pending.get(batch_key)
+        dispatch = batch is None
+        if dispatch:
+            batch = self.pending[batch_key] = {}
+        future = batch.get(value)
+        if future is None:
+            future = batch[value] = asyncio.get_running_loop().create_future()
+
+        if dispatch:
+            try:
+                # Let lookups started in the same tick join the batch, then query once for all of them
+                await asyncio.sleep(0)
+                del self.pending[batch_key]
+                await self.fetch(model, field, batch)
+            except BaseException:
+                # Cancelled: never leave the other lookups of the batch waiting
+                self.pending.pop(batch_key, None)
+                for waiting in batch.values():
+                    if not waiting.done():
+                        waiting.cancel()
+                raise
+        return await future
+
+    async def fetch(self, model: Type[Document], field: str, batch: Dict[Any, asyncio.Future]) -> None:
+        values = list(batch)
+        attribute = "id" if field == "_id" else field
+        try:
+            self.queries += 1
+            query = {field: values[0]} if len(values) == 1 else {field: {"$in": values}}
+            found: Dict[Any, Document] = {}
+            async for document in model.find(query):
+                found.setdefault(getattr(document, attribute), document)
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for value, future in batch.items():
+            document = found.get(value)
+            if document is not None:
+                self.documents[(model, field, value)] = document
+            if not future.done():
+                future.set_result(document)
+
+    def remember(self, document: Document, field: str, value: Any) -> None:
+        self.documents[(type(document), field, value)] = document
+
+    def forget(self, model: Type[Document], field: Optional[str] = None, value: Any = None) -> None:
+        """Drop cached documents of `model` (all of them, or the one looked up by field=value)."""
+        if field is not None:
+            self.documents.pop((model, field, value), None)
+            return
+        for key in [key for key in self.documents if key[0] is model]:
+            del self.documents[key]
+
+
+def current_identity_map() -> Optional[IdentityMap]:
+    return _current.get()
+
+
+async def load(model: Type[Document], field: str, value: Any) -> Optional[Document]:
+    """model.find_one({field: value}) through the identity map of the current request, if any."""
+    identity_map = _current.get()
+    if identity_map is None:
+        return await model.find_one({field: value})
+    return await identity_map.load(model, field, value)
+
+
+def remember(document: Document, field: str, value: Any) -> None:
+    identity_map = _current.get()
+    if identity_map is not None:
+        identity_map.remember(document, field, value)
+
+
+def forget(model: Type[Document], field: Optional[str] = None, value: Any = None) -> None:
+    """Call after writing `model` with a query (update_many, motor, find_one(...).update) instead of an instance."""
+    identity_map = _current.get()
+    if identity_map is not None:
+        identity_map.forget(model, field, value)
+
+
+@asynccontextmanager
+async def identity_scope():
+    """A fresh identity map for the enclosed code (a request, a background rebuild...)."""
+    identity_map = IdentityMap()
+    token = _current.set(identity_map)
+    try:
+        yield identity_map
+    finally:
+        _current.reset(token)
+        if identity_map.hits:
+            logger.debug("identity map", extra={"hits": identity_map.hits, "queries": identity_map.queries})
+
+
+class IdentityMapMiddleware:
+    """ASGI middleware giving every HTTP request its own identity map."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        async with identity_scope():
+            return await self.app(scope, receive, send)
@@ -0,0 +1,264 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from beanie import PydanticObjectId
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from pymongo import ReturnDocument
+
+from app.models.job import Job, JobStatus, JobResponse
+from app.utils.log import get_logger
+from app.settings import JOB_WORKERS, JOB_LEASE_SECONDS
+
+
+logger = get_logger(__name__)
+
+Handler = Callable[['JobContext'], Awaitable[Any]]
+
+_handlers: Dict[str, Handler] = {}
+_queue: 'asyncio.Queue[PydanticObjectId]' = asyncio.Queue()
+_workers: List[asyncio.Task] = []
+# Jobs running in this process, so watchers can stream them without polling Mongo
+_active: Dict[str, Job] = {}
+_changed: Dict[str, asyncio.Event] = {}
+
+
+def job_handler(kind: str) -> Callable[[Handler], Handler]:
+    """Register the coroutine that runs jobs of the given kind."""
+    def register(func: Handler) -> Handler:
+        _handlers[kind] = func
+        return func
+    return register
+
+
+def _notify(job_id: str) -> None:
+    event = _changed.pop(job_id, None)
+    if event is not None:
+        event.set()
+
+
+class JobContext:
+    """Handed to a job handler to publish partial results and progress."""
+
+    def __init__(self, job: Job):
+        self.job = job
+
+    @property
+    def params(self) -> Dict[str, Any]:
+        return self.job.params
+
+    async def emit(self, *items: Any) -> None:
+        items = jsonable_encoder(list(items))
+        self.job.items.extend(items)
+        await self.job.update({"$push": {"items": {"$each": items}}})
+        _notify(str(self.job.id))
+
+    async def set_progress(self, progress: int, total: Optional[int] = None) -> None:
+        self.job.progress = progress
+        if total is not None:
+            self.job.total = total
+        await self.job.set({"progress": self.job.progress, "total": self.job.total})
+        _notify(str(self.job.id))
+
+
+def _enqueue(job_id: PydanticObjectId, not_before: Optional[datetime] = None) -> None:
+    """Hand the job to the workers now, or once not_before has passed."""
+    delay = (not_before - datetime.utcnow()).total_seconds() if not_before else 0
+    if delay > 0:
+        asyncio.get_running_loop().call_later(delay, _queue.put_nowait, job_id)
+    else:
+        _queue.put_nowait(job_id)
+
+
+async def submit_job(kind: str, user_id: str, params: Dict[str, Any], delay: float = 0) -> Job:
+    """Store and queue a job; with a delay (seconds) it is not started before then."""
+    if kind not in _handlers:
+        raise ValueError(f"Unknown job kind: {kind}")
+    job = Job(kind=kind, user_id=user_id, params=params)
+    if delay > 0:
+        job.not_before = datetime.utcnow() + timedelta(seconds=delay)
+    await job.insert()
+    _enqueue(job.id, job.not_before)
+    return job
+
+
+def lease_expiry() -> datetime:
+    return datetime.utcnow() + timedelta(seconds=JOB_LEASE_SECONDS)
+
+
+async def claim_job(job_id: PydanticObjectId) -> Optional[Job]:
+    """Atomically move a QUEUED job to RUNNING, so a job requeued by several processes runs once."""
+    now = datetime.utcnow()
+    raw = await Job.get_motor_collection().find_one_and_update(
+        {"_id": job_id, "status": JobStatus.QUEUED.value},
+        {"$set": {"status": JobStatus.RUNNING.value, "started_at": now, "lease_until": lease_expiry()}},
+        return_document=ReturnDocument.AFTER,
+    )
+    return Job.model_validate(raw) if raw else None
+
+
+async def renew_lease(job: Job) -> None:
+    """Keep the lease of a running job alive until cancelled."""
+    while True:
+        await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+        try:
+            await Job.get_motor_collection().update_one(
+                {"_id": job.id, "status": JobStatus.RUNNING.value}, {"$set": {"lease_until": lease_expiry()}}
+            )
+        except Exception:
+            logger.exception("job lease renewal failed", extra={"job_id": str(job.id)})
+
+
+async def run_job(job: Job) -> None:
+    """Run a job claimed by claim_job."""
+    job_id = str(job.id)
+    _active[job_id] = job
+    _notify(job_id)
+    heartbeat = asyncio.create_task(renew_lease(job))
+    try:
+        result = await _handlers[job.kind](JobContext(job))
+        job.status, job.result = JobStatus.SUCCEEDED, jsonable_encoder(result)
+    except asyncio.CancelledError:
+        job.status, job.error = JobStatus.FAILED, "Cancelled"
+        raise
+    except Exception as e:
+        logger.exception("job failed", extra={"job_id": job_id, "kind": job.kind})
+        job.status, job.error = JobStatus.FAILED, str(e)
+    finally:
+        heartbeat.cancel()
+        job.finished_at = datetime.utcnow()
+        job.lease_until = None
+        await job.set({
+            "status": job.status, "result": job.result,
+            "error": job.error, "finished_at": job.finished_at, "lease_until": None,
+        })
+        _active.pop(job_id, None)
+        _notify(job_id)
+
+
+async def job_worker() -> None:
+    while True:
+        job_id = await _queue.get()
+        try:
+            job = await claim_job(job_id)
+            if job is not None:
+                await run_job(job)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("job worker error", extra={"job_id": str(job_id)})
+
+
+def start_job_workers() -> None:
+    for _ in range(JOB_WORKERS):
+        _workers.append(asyncio.create_task(job_worker()))
+
+
+async def fail_stale_jobs(job_id: Optional[PydanticObjectId] = None) -> int:
+    """Mark RUNNING jobs whose lease ran out (their process died) as FAILED; returns how many."""
+    now = datetime.utcnow()
+    filters = {
+        "status": JobStatus.RUNNING.value,
+        "$or": [{"lease_until": {"$lt": now}}, {"lease_until": None}],
+    }
+    if job_id is not None:
+        filters["_id"] = job_id
+    result = await Job.get_motor_collection().update_many(filters, {"$set": {
+        "status": JobStatus.FAILED.value,
+        "error": "Interrupted: the worker running this job stopped",
+        "finished_at": now,
+        "lease_until": None,
+    }})
+    return result.modified_count
+
+
+async def resume_jobs() -> Dict[str, int]:
+    """
+    At startup: fail the jobs left RUNNING by a dead process and queue the QUEUED ones again
+    (jobs only live in the in-process queue, so they are lost with it).
+    """
+    failed = await fail_stale_jobs()
+    queued = 0
+    async for doc in Job.get_motor_collection().find(
+        {"status": JobStatus.QUEUED.value}, {"_id": 1, "not_before": 1}
+    ).sort("created_at", 1):
+        _enqueue(doc["_id"], doc.get("not_before"))
+        queued += 1
+    if failed or queued:
+        logger.info("jobs resumed", extra={"failed": failed, "queued": queued})
+    return {"failed": failed, "queued": queued}
+
+
+async def stop_job_workers() -> None:
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+
+
+async def get_user_job(job_id: str, user_id: str) -> Job:
+    """The job if it belongs to user_id, else 404."""
+    job = _active.get(job_id)
+    if job is None:
+        try:
+            job = await Job.get(PydanticObjectId(job_id))
+        except Exception:
+            job = None
+    if job is None or job.user_id != user_id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+async def watch_job(job: Job, poll_seconds: float = 1.0) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Yield ('item', item) for every partial result, then ('done', job without items).
+    Jobs running in this process wake the watcher directly; others are polled.
+    """
+    job_id = str(job.id)
+    sent = 0
+    event = None
+    try:
+        while True:
+            # Registered before reading so a change made while we read still wakes us
+            event = _changed.setdefault(job_id, asyncio.Event())
+            current = _active.get(job_id)
+            if current is None:
+                current = await Job.get(job.id)
+                if current.status == JobStatus.RUNNING and current.lease_until and current.lease_until < datetime.utcnow():
+                    # Its process died without a restart to clean up after it
+                    await fail_stale_jobs(job.id)
+                    current = await Job.get(job.id)
+            for item in current.items[sent:]:
+                yield 'item', item
+            sent = len(current.items)
+            if current.status.finished:
+                yield 'done', JobResponse(**current.model_dump(exclude={"items"}), items=[])
+                return
+
+            try:
+                await asyncio.wait_for(event.wait(), timeout=poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        # Only _notify pops the event, and it only runs where the job runs: drop it ourselves
+        # when the job is not running in this process (finished, or running in another worker)
+        if job_id not in _active and _changed.get(job_id) is event:
+            _changed.pop(job_id, None)
+
+
+def stream_job(job: Job, format: str = 'sse') -> StreamingResponse:
+    """Stream a job's partial results as Server-Sent Events or as NDJSON lines."""
+    async def body():
+        async for event, data in watch_job(job):
+            data = jsonable_encoder(data)
+            if format == 'ndjson':
+                yield json.dumps({"event": event, "data": data}, ensure_ascii=False) + '\n'
+            else:
+                yield f'event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n'
+
+    media_type = 'application/x-ndjson' if format == 'ndjson' else 'text/event-stream'
+    # X-Accel-Buffering stops nginx from holding back chunks
+    return StreamingResponse(body(), media_type=media_type, headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
@@ -0,0 +1,100 @@
+import atexit
+import json
+import logging
+import queue
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+from app.settings import LOG_LEVEL, LOG_LEVELS, LOG_FORMAT
+
+
+# Attributes every LogRecord has; anything else was passed through `extra=` and is structured data
+_RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener: Optional[QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg, extra fields and the traceback if any."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Human readable lines for development, extra fields appended as key=value."""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)-7s %(name)s: %(message)s')
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = ' '.join(
+            f'{key}={value}' for key, value in vars(record).items()
+            if key not in _RESERVED and not key.startswith('_')
+        )
+        if fields:
+            # Keep the traceback (if any) after the fields
+            head, sep, tail = line.partition('\n')
+            line = f'{head} {fields}{sep}{tail}'
+        return line
+
+
+def parse_levels(spec: str) -> Dict[str, str]:
+    """Parse LOG_LEVELS, e.g. "app.utils.security=WARNING,app.api.play=DEBUG"."""
+    levels = {}
+    for item in (spec or '').split(','):
+        name, sep, level = item.strip().partition('=')
+        if sep and name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging() -> None:
+    """
+    Route the `app` logger tree through a queue so request handlers never block on stdout.
+    Records are formatted and written by a QueueListener thread. Safe to call more than once.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter() if LOG_FORMAT == 'json' else TextFormatter())
+
+    log_queue: 'queue.SimpleQueue[logging.LogRecord]' = queue.SimpleQueue()
+    root = logging.getLogger('app')
+    root.handlers = [QueueHandler(log_queue)]
+    root.setLevel(LOG_LEVEL.upper())
+    root.propagate = False
+    for name, level in parse_levels(LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(name)
@@ -0,0 +1,295 @@
+import hashlib
+import json
+from bisect import bisect_left
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+from pymongo.errors import DuplicateKeyError
+
+from app.models.channel import (
+    Channel, OutlineVersion,
+    SectionOutline, UnitOutline, ActivityOutline, LessonOutline, QuizOutline,
+    Section, Unit, Activity, Lesson, Question
+)
+from app.models.play import PlayerProgress
+from app.settings import ORDER_GAP
+
+
+# Channel content as (collection, field pointing at its parent, parent collection), parents first.
+# SectionOutline's parent is the channel itself (parent None, channel_id = ChannelInfo id).
+CONTENT_TREE = [
+    (SectionOutline, "channel_id", None),
+    (Section, "section_outline_id", SectionOutline),
+    (UnitOutline, "section_outline_id", SectionOutline),
+    (Unit, "unit_outline_id", UnitOutline),
+    (ActivityOutline, "unit_outline_id", UnitOutline),
+    (Activity, "activity_outline_id", ActivityOutline),
+    (LessonOutline, "activity_outline_id", ActivityOutline),
+    (QuizOutline, "activity_outline_id", ActivityOutline),
+    (Lesson, "lesson_outline_id", LessonOutline),
+    (Question, "quiz_outline_id", QuizOutline),
+]
+
+
+def outline_hash(outline_content: Dict[str, Any]) -> str:
+    """Stable content hash of an outline tree."""
+    raw = json.dumps(outline_content or {}, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def longest_increasing_run(values: List[int]) -> Set[int]:
+    """Positions of a longest strictly increasing subsequence of values (O(n log n))."""
+    tails: List[int] = []       # tails[k] = position ending the best subsequence of length k + 1
+    tail_values: List[int] = []
+    previous: List[int] = [-1] * len(values)
+    for i, value in enumerate(values):
+        k = bisect_left(tail_values, value)
+        if k > 0:
+            previous[i] = tails[k - 1]
+        if k == len(tails):
+            tails.append(i)
+            tail_values.append(value)
+        else:
+            tails[k] = i
+            tail_values[k] = value
+    kept = set()
+    i = tails[-1] if tails else -1
+    while i != -1:
+        kept.add(i)
+        i = previous[i]
+    return kept
+
+
+def plan_reorder(current: Dict[str, int], ids: List[str], gap: int = ORDER_GAP) -> Dict[str, int]:
+    """
+    New `order` values that put siblings in the sequence `ids`, touching as few documents as possible.
+    Siblings already in relative order keep their value; the moved ones get a value between their new
+    neighbours. Only when there is no room left are all siblings renumbered `gap` apart.
+    Returns {id: new order} for the siblings that change.
+    """
+    orders = [current[i] for i in ids]
+    kept = longest_increasing_run(orders)
+    changes: Dict[str, int] = {}
+
+    start = 0
+    while start < len(ids):
+        if start in kept:
+            start += 1
+            continue
+        end = start
+        while end < len(ids) and end not in kept:
+            end += 1
+        count = end - start
+        low = orders[start - 1] if start > 0 else 0
+        if end < len(ids):
+            high = orders[end]
+            step = (high - low) // (count + 1)
+        else:
+            step = gap
+        if step < 1:
+            return {
+                sibling: gap * (position + 1)
+                for position, sibling in enumerate(ids)
+                if current[sibling] != gap * (position + 1)
+            }
+        for k in range(count):
+            orders[start + k] = low + step * (k + 1)
+            changes[ids[start + k]] = orders[start + k]
+        start = end
+    return changes
+
+
+def activity_percentages(outline_content: Dict[str, Any], total_content: int) -> Dict[str, Dict[str, Any]]:
+    """
+    Per activity (by id): its lesson/quiz count and the cumulative percentage of the channel's
+    content up to and including it, in outline order. One pass, no queries.
+    """
+    percentages = {}
+    current_count = 0
+    for section in outline_content.get("sections", []):
+        for unit in section.get("units", []):
+            for activity in unit.get("activities", []):
+                activity_count = 0
+                for item in activity.get("content", []):
+                    activity_count += item.get("count", 1) if isinstance(item, dict) else 1
+                current_count += activity_count
+
+                percentages[str(activity["id"])] = {
+                    "name": activity["name"],
+                    "order": activity["order"],
+                    "percentage": int((current_count / total_content) * 100) if total_content > 0 else 0,
+                    "count": activity_count
+                }
+    return percentages
+
+
+async def get_latest_outline_version(channel_id: str) -> Optional[OutlineVersion]:
+    return await OutlineVersion.find(
+        {"channel_id": channel_id}
+    ).sort("-version").first_or_none()
+
+
+async def publish_outline_version(channel: Channel, revision: Optional[int] = None) -> OutlineVersion:
+    """
+    Snapshot channel.outline_content, built from content_revision `revision`, as a new immutable
+    OutlineVersion. Nothing is written when the latest version already has the same content hash;
+    that version is marked as confirmed by `revision` instead, so discard_outline_version leaves it.
+    Sets channel.outline_version / channel.outline_hash in memory; the caller saves the channel.
+    """
+    content_hash = outline_hash(channel.outline_content)
+    channel.outline_hash = content_hash
+
+    while True:
+        latest = await get_latest_outline_version(channel.channel_id)
+        if latest and latest.content_hash == content_hash:
+            if revision is not None:
+                result = await OutlineVersion.get_motor_collection().update_one(
+                    {"_id": latest.id}, {"$max": {"revision": revision}}
+                )
+                if not result.matched_count:
+                    # Discarded by a superseded rebuild meanwhile; publish afresh
+                    continue
+            channel.outline_version = latest.version
+            return latest
+
+        version = OutlineVersion(
+            channel_id=channel.channel_id,
+            version=(latest.version if latest else 0) + 1,
+            content_hash=content_hash,
+            outline_content=channel.outline_content,
+            revision=revision,
+        )
+        try:
+            await version.insert()
+        except DuplicateKeyError:
+            # A concurrent rebuild published the same version number first; re-read and retry
+            continue
+        channel.outline_version = version.version
+        return version
+
+
+async def discard_outline_version(channel_id: str, version: int, revision: int) -> bool:
+    """
+    Delete a version published by a rebuild of `revision` that lost to a newer rebuild, unless a
+    newer rebuild has re-confirmed it (same content) since. Returns whether it was deleted.
+    """
+    result = await OutlineVersion.get_motor_collection().delete_one({
+        "channel_id": channel_id, "version": version, "revision": revision
+    })
+    return bool(result.deleted_count)
+
+
+async def prune_outline_versions(channel_id: str) -> int:
+    """
+    Delete the channel's outline versions that are neither the latest, the Channel's own nor
+    referenced by a learner's progress (learners move to the Channel's version lazily, see
+    migrate_progress). Returns how many.
+    """
+    latest = await get_latest_outline_version(channel_id)
+    if latest is None:
+        return 0
+    referenced = await PlayerProgress.get_motor_collection().distinct(
+        "outline_version", {"channel_id": channel_id}
+    )
+    current = await Channel.get_motor_collection().find_one({"channel_id": channel_id}, {"outline_version": 1})
+    if current:
+        referenced.append(current.get("outline_version"))
+    result = await OutlineVersion.get_motor_collection().delete_many({
+        "channel_id": channel_id,
+        # $lt: never a version published concurrently after `latest`
+        "version": {"$lt": latest.version, "$nin": [v for v in referenced if v is not None]},
+    })
+    return result.deleted_count
+
+
+async def get_outline_version(channel_id: str, version: int) -> Optional[OutlineVersion]:
+    return await OutlineVersion.find_one({"channel_id": channel_id, "version": version})
+
+
+def build_progress_level(
+    outline_content: Dict[str, Any],
+    previous: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Build a progress_level tree (ids, names, completed) from an outline.
+    Completion from a `previous` progress_level is carried over by id; a container stays
+    completed only if it was completed before and all of its current children are completed.
+    """
+    completed_ids = set()
+    for section in (previous or {}).get("sections", []):
+        for unit in section.get("units", []):
+            for activity in unit.get("activities", []):
+                for content in activity.get("content", []):
+                    if content.get("completed"):
+                        completed_ids.add(content.get("id"))
+                if activity.get("completed"):
+                    completed_ids.add(activity.get("id"))
+            if unit.get("completed"):
+                completed_ids.add(unit.get("id"))
+        if section.get("completed"):
+            completed_ids.add(section.get("id"))
+
+    def container(node, children):
+        return node["id"] in completed_ids and all(child["completed"] for child in children)
+
+    progress_sections = []
+    for section in outline_content.get("sections", []):
+        progress_units = []
+        for unit in section.get("units", []):
+            progress_activities = []
+            for activity in unit.get("activities", []):
+                progress_content = []
+                for content in activity.get("content", []):
+                    progress_content.append({
+                        "id": content["id"],
+                        "name": content.get("name", ""),
+                        "completed": content["id"] in completed_ids,
+                        "type": content.get("type", "lesson")
+                    })
+                progress_activities.append({
+                    "id": activity["id"],
+                    "name": activity.get("name", ""),
+                    "completed": container(activity, progress_content),
+                    "content": progress_content
+                })
+            progress_units.append({
+                "id": unit["id"],
+                "name": unit.get("name", ""),
+                "completed": container(unit, progress_activities),
+                "activities": progress_activities
+            })
+        progress_sections.append({
+            "id": section["id"],
+            "name": section.get("name", ""),
+            "completed": container(section, progress_units),
+            "units": progress_units
+        })
+    return {"sections": progress_sections}
+
+
+async def migrate_progress(progress: PlayerProgress, channel: Channel) -> Optional[OutlineVersion]:
+    """
+    Lazily move a learner's progress onto the channel's current outline version.
+    Completion is remapped by id and the legacy per-learner content snapshot is dropped.
+    Returns the OutlineVersion the progress now references.
+    """
+    if not channel.outline_version:
+        return None
+    if progress.outline_version == channel.outline_version:
+        return await get_outline_version(channel.channel_id, progress.outline_version)
+
+    outline = await get_outline_version(channel.channel_id, channel.outline_version)
+    if not outline:
+        return None
+
+    progress.progress_level = build_progress_level(outline.outline_content, progress.progress_level)
+    progress.outline_version = outline.version
+    progress.content = None
+    progress.updated_at = datetime.utcnow()
+    await progress.set({
+        "progress_level": progress.progress_level,
+        "outline_version": progress.outline_version,
+        "content": None,
+        "updated_at": progress.updated_at,
+    })
+    return outline
@@ -0,0 +1,36 @@
+from typing import Any, Dict, List, Optional
+
+from beanie import PydanticObjectId
+from fastapi import HTTPException, Response
+
+
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+MAX_PAGE_SIZE = 100
+
+
+def cursor_filter(filters: Dict[str, Any], cursor: Optional[str]) -> Dict[str, Any]:
+    """Restrict a find() filter to documents after the given cursor (an _id)."""
+    if not cursor:
+        return filters
+    try:
+        after = PydanticObjectId(cursor)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {**filters, "_id": {"$gt": after}}
+
+
+async def paginate(query, response: Response, limit: Optional[int]) -> List[Any]:
+    """
+    Run a FindMany sorted by _id. Without a limit every document is returned.
+    With a limit, one extra document is fetched to detect a next page, whose cursor is
+    returned in the X-Next-Cursor header so the response body keeps its list shape.
+    """
+    query = query.sort("_id")
+    if not limit:
+        return await query.to_list()
+
+    items = await query.limit(limit + 1).to_list()
+    if len(items) > limit:
+        items = items[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = str(items[-1].id)
+    return items
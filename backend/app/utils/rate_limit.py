@@ -0,0 +1,183 @@
+import json
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from pymongo import ReturnDocument
+
+from app.models.rate_limit import RateLimitWindow
+from app.utils.log import get_logger
+from app.utils.security import verify_token
+from app.settings import (
+    RATE_LIMIT_PER_MINUTE, RATE_LIMIT_BACKEND, RATE_LIMIT_TRUST_PROXY,
+    FEATURES, RESPONSE_MESSAGES
+)
+
+
+logger = get_logger(__name__)
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    name: str
+    per_minute: int
+    method: Optional[str] = None  # None matches every method
+    path: str = ''  # path prefix
+    burst: Optional[int] = None  # bucket capacity, defaults to per_minute (memory backend only)
+
+    def matches(self, method: str, path: str) -> bool:
+        return (self.method is None or self.method == method) and path.startswith(self.path)
+
+
+# First match wins; the last rule is the global default
+RULES: List[RateLimitRule] = [
+    RateLimitRule('sign_in', 10, 'POST', '/public/auth/sign-in/'),
+    RateLimitRule('sign_up', 5, 'POST', '/public/auth/sign-up/'),
+    RateLimitRule('google_login', 10, 'POST', '/public/auth/google-token'),
+    RateLimitRule('password_reset', 3, 'POST', '/public/auth/send-password-reset_code/'),
+    RateLimitRule('update_password', 5, 'POST', '/public/auth/update-password/'),
+    RateLimitRule('resend_verification', 3, 'POST', '/public/auth/resend-verification/'),
+    RateLimitRule('generate_questions', 10, 'POST', '/studio/channel/generate-questions/'),
+    RateLimitRule('generate_prompt', 20, 'POST', '/studio/channel/generate_prompt/'),
+    RateLimitRule('space_upload', 30, 'POST', '/studio/space/file/'),
+    RateLimitRule('default', RATE_LIMIT_PER_MINUTE),
+]
+
+
+def match_rule(method: str, path: str) -> RateLimitRule:
+    for rule in RULES:
+        if rule.matches(method, path):
+            return rule
+    return RULES[-1]
+
+
+class TokenBucketLimiter:
+    """
+    In-process token buckets keyed by (rule, identity); each refills at per_minute / 60 tokens
+    per second up to `burst`. The least recently used buckets are evicted past `max_keys`.
+    """
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets: 'OrderedDict[str, Tuple[float, float]]' = OrderedDict()
+
+    async def hit(self, key: str, rule: RateLimitRule) -> Tuple[bool, int, float]:
+        """Take one token. Returns (allowed, remaining, retry_after seconds)."""
+        capacity = rule.burst or rule.per_minute
+        rate = rule.per_minute / 60.0
+        now = time.monotonic()
+
+        tokens, updated = self._buckets.pop(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets[key] = (tokens, now)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+
+        retry_after = 0.0 if allowed else (1 - tokens) / rate
+        return allowed, int(tokens), retry_after
+
+
+class MongoWindowLimiter:
+    """
+    Fixed one-minute windows counted in MongoDB so every worker shares the same budget.
+    Each window allows per_minute requests; RateLimitRule.burst is not applied here.
+    Costs one round trip per request; falls back to allowing the request if Mongo is unavailable.
+    """
+
+    async def hit(self, key: str, rule: RateLimitRule) -> Tuple[bool, int, float]:
+        now = time.time()
+        window = int(now // 60) * 60
+        try:
+            raw = await RateLimitWindow.get_motor_collection().find_one_and_update(
+                {"_id": f"{key}:{window}"},
+                {
+                    "$inc": {"hits": 1},
+                    "$setOnInsert": {"expires_at": datetime.utcfromtimestamp(window) + timedelta(minutes=2)},
+                },
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except Exception:
+            logger.exception("shared rate limit backend unavailable")
+            return True, rule.per_minute, 0.0
+
+        count = raw["hits"]
+        allowed = count <= rule.per_minute
+        return allowed, max(0, rule.per_minute - count), 0.0 if allowed else window + 60 - now
+
+
+def client_identity(scope) -> str:
+    """The authenticated user id when the request carries a valid access token, else the client IP."""
+    headers = {k.decode('latin-1'): v.decode('latin-1') for k, v in scope.get('headers', [])}
+
+    authorization = headers.get('authorization', '')
+    scheme, _, token = authorization.partition(' ')
+    if scheme.lower() == 'bearer' and token:
+        try:
+            # Signature check only; the route's own dependency still validates the user
+            sub = verify_token(token.strip(), "access").get("sub")
+            if sub:
+                return f'user:{sub}'
+        except ValueError:
+            pass
+
+    if RATE_LIMIT_TRUST_PROXY and headers.get('x-forwarded-for'):
+        return 'ip:' + headers['x-forwarded-for'].split(',')[0].strip()
+    client = scope.get('client')
+    return f'ip:{client[0] if client else "unknown"}'
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware enforcing RULES per (route, identity). Disabled by FEATURES['rate_limiting'].
+    Rejected requests get a 429 in the usual error envelope with a Retry-After header.
+    """
+
+    def __init__(self, app, limiter=None):
+        self.app = app
+        self.limiter = limiter or (MongoWindowLimiter() if RATE_LIMIT_BACKEND == 'mongo' else TokenBucketLimiter())
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not FEATURES.get('rate_limiting') or scope['method'] == 'OPTIONS':
+            return await self.app(scope, receive, send)
+
+        rule = match_rule(scope['method'], scope['path'])
+        identity = client_identity(scope)
+        allowed, remaining, retry_after = await self.limiter.hit(f'{rule.name}:{identity}', rule)
+
+        if allowed:
+            async def send_with_headers(message):
+                if message['type'] == 'http.response.start':
+                    message.setdefault('headers', [])
+                    message['headers'] = list(message['headers']) + [
+                        (b'x-ratelimit-limit', str(rule.per_minute).encode()),
+                        (b'x-ratelimit-remaining', str(remaining).encode()),
+                    ]
+                await send(message)
+            return await self.app(scope, receive, send_with_headers)
+
+        logger.warning("rate limit exceeded", extra={"rule": rule.name, "identity": identity, "path": scope['path']})
+        body = json.dumps({
+            'success': False,
+            'data': None,
+            'message': {lang: messages['rate_limit_exceeded'] for lang, messages in RESPONSE_MESSAGES.items()},
+            'error': 'RATE_LIMIT_EXCEEDED',
+        }).encode()
+        await send({
+            'type': 'http.response.start',
+            'status': 429,
+            'headers': [
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(body)).encode()),
+                (b'retry-after', str(max(1, math.ceil(retry_after))).encode()),
+                (b'x-ratelimit-limit', str(rule.per_minute).encode()),
+                (b'x-ratelimit-remaining', b'0'),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': body})
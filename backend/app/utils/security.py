@@ -1,9 +1,16 @@
 from datetime import datetime, timedelta, timezone
 from typing import Optional, Dict, Any, Tuple
 from jose import jwt, JWTError
+from fastapi import HTTPException, status
 from passlib.context import CryptContext
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import hashlib
+import hmac
 import secrets
 import string
+from app.utils.cache import invalidate, user_tag
+from app.utils.log import get_logger
 
 from app.settings import (
     JWT_SECRET_KEY,
@@ -11,13 +18,22 @@ from app.settings import (
     MAX_LOGIN_ATTEMPTS,
     ACCOUNT_LOCKOUT_MINUTES,
     ACCESS_TOKEN_EXPIRE_HOURS,
-    REFRESH_TOKEN_EXPIRE_DAYS
+    REFRESH_TOKEN_EXPIRE_DAYS,
+    PASSWORD_HASH_WORKERS,
+    PASSWORD_HASH_CONCURRENCY
 )
 
+logger = get_logger(__name__)
+
 # Token expiration settings
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt is CPU bound; run it on a small dedicated pool. At most PASSWORD_HASH_CONCURRENCY calls
+# are running or queued in the pool; further calls are refused (503) instead of waiting without bound
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="pwd-hash")
+_hash_slots = asyncio.Semaphore(PASSWORD_HASH_CONCURRENCY)
+
 def get_password_hash(password: str) -> str:
     """Hash a password using bcrypt."""
     return pwd_context.hash(password)
@@ -26,28 +42,40 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash."""
     return pwd_context.verify(plain_password, hashed_password)
 
+async def _run_hashing(func, *args):
+    if _hash_slots.locked():
+        logger.warning("password hashing saturated", extra={"limit": PASSWORD_HASH_CONCURRENCY})
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server busy, please try again",
+            headers={"Retry-After": "1"},
+        )
+    async with _hash_slots:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, func, *args)
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash off the event loop."""
+    return await _run_hashing(get_password_hash, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password off the event loop."""
+    return await _run_hashing(verify_password, plain_password, hashed_password)
+
 def create_access_token(data: Dict[str, Any]) -> Tuple[str, datetime]:
     """Create a JWT access token with expiration."""
-    print("\n=== Creating Access Token ===")
     to_encode = data.copy()
     current_time = datetime.now(timezone.utc)  # Use timezone-aware datetime
     expire_time = current_time + timedelta(hours=ACCESS_TOKEN_EXPIRE_HOURS)
-    
-    print(f"Current UTC time: {current_time}")
-    print(f"Current timestamp: {current_time.timestamp()}")
-    print(f"Expiration time: {expire_time}")
-    print(f"Expiration timestamp: {expire_time.timestamp()}")
-    
+
     # Create payload with timezone-aware timestamps
     to_encode.update({
         "exp": int(expire_time.timestamp()),  # Convert to integer timestamp
         "iat": int(current_time.timestamp()),  # Add issued-at time
         "type": "access"
     })
-    print(f"Token payload before encoding: {to_encode}")
-    
+
     token = jwt.encode(to_encode, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
-    print("=== End Creating Access Token ===\n")
+    logger.debug("access token issued", extra={"sub": to_encode.get("sub"), "exp": to_encode["exp"]})
     return token, expire_time
 
 def create_refresh_token(data: Dict[str, Any]) -> Tuple[str, datetime]:
@@ -68,14 +96,8 @@ def create_refresh_token(data: Dict[str, Any]) -> Tuple[str, datetime]:
 
 def verify_token(token: str, token_type: str = "access") -> Dict[str, Any]:
     """Verify a JWT token and return its payload."""
-    print("\n=== Token Verification Debug ===")
-    print(f"Verifying {token_type} token")
-    print(f"Token: {token[:20]}...")  # Show first 20 chars for security
-    
     current_time = datetime.now(timezone.utc)  # Use timezone-aware datetime
-    print(f"Current UTC time: {current_time}")
-    print(f"Current timestamp: {current_time.timestamp()}")
-    
+
     try:
         # Decode with leeway for small time differences
         payload = jwt.decode(
@@ -88,46 +110,25 @@ def verify_token(token: str, token_type: str = "access") -> Dict[str, Any]:
                 "verify_iat": True
             }
         )
-        print("Token decoded successfully")
-        print(f"Payload: {payload}")
-        
-        exp_timestamp = payload.get("exp")
-        if exp_timestamp:
-            exp_datetime = datetime.fromtimestamp(exp_timestamp, timezone.utc)
-            print(f"Token expiration timestamp: {exp_timestamp}")
-            print(f"Token expiration datetime: {exp_datetime}")
-            print(f"Time until expiration: {exp_datetime - current_time}")
-            print(f"Has expired: {current_time > exp_datetime}")
-        
+
         if payload.get("type") != token_type:
-            print(f"Token type mismatch: got {payload.get('type')}, expected {token_type}")
+            logger.debug("token type mismatch", extra={"got": payload.get("type"), "expected": token_type})
             raise ValueError(f"Invalid token type. Expected {token_type}")
-            
+
         # Check expiration
+        exp_timestamp = payload.get("exp")
         if exp_timestamp and current_time.timestamp() > exp_timestamp:
-            print("Token has expired")
-            print(f"Current time: {current_time.timestamp()}")
-            print(f"Expiration time: {exp_timestamp}")
-            print(f"Time difference: {current_time.timestamp() - exp_timestamp} seconds")
+            logger.debug("token expired", extra={"sub": payload.get("sub"), "exp": exp_timestamp})
             raise ValueError("Token has expired")
-            
-        print("Token verified successfully")
-        print("=== End Token Verification ===\n")
+
         return payload
 
-    except jwt.ExpiredSignatureError as e:
-        print(f"JWT ExpiredSignatureError: {str(e)}")
-        print(f"Current time: {current_time.timestamp()}")
-        if "exp" in payload:
-            print(f"Token expiration: {payload['exp']}")
-            print(f"Time difference: {current_time.timestamp() - payload['exp']} seconds")
+    except jwt.ExpiredSignatureError:
+        logger.debug("token signature expired", extra={"token_type": token_type})
         raise ValueError("Token has expired")
     except jwt.JWTError as e:
-        print(f"JWT Error: {str(e)}")
+        logger.debug("invalid token", extra={"token_type": token_type, "reason": str(e)})
         raise ValueError("Invalid token")
-    except Exception as e:
-        print(f"Unexpected error: {str(e)}")
-        raise
 
 def generate_secure_token(length: int = 32) -> str:
     """Generate a secure random token."""
@@ -169,6 +170,9 @@ def handle_failed_login(user: Any) -> None:
     user.failed_login_attempts += 1
     if user.failed_login_attempts >= MAX_LOGIN_ATTEMPTS:
         user.locked_until = datetime.utcnow() + timedelta(minutes=ACCOUNT_LOCKOUT_MINUTES)
+        # Locked accounts must not keep authenticating from the session cache
+        invalidate(user_tag(str(user.id)))
+        logger.warning("account locked", extra={"user_id": str(user.id), "attempts": user.failed_login_attempts})
     user.save()
 
 def reset_failed_login(user: Any) -> None:
@@ -231,9 +235,12 @@ def generate_email_verification_token() -> str:
     return generate_secure_token(32)
 
 def hash_token(token: str) -> str:
-    """Hash a token for storage."""
-    return get_password_hash(token)
+    """Hash a token for storage (keyed HMAC-SHA256; tokens are random, so no slow KDF is needed)."""
+    return hmac.new(JWT_SECRET_KEY.encode(), token.encode(), hashlib.sha256).hexdigest()
 
 def verify_token_hash(token: str, hashed_token: str) -> bool:
     """Verify a token against its hash."""
-    return verify_password(token, hashed_token) 
\ No newline at end of file
+    if hashed_token.startswith("$2"):
+        # Legacy bcrypt token hash
+        return verify_password(token, hashed_token)
+    return hmac.compare_digest(hash_token(token), hashed_token) 
\ No newline at end of file
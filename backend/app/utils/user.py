@@ -1,9 +1,40 @@
+import time
+from datetime import datetime, timezone
+
 from fastapi import Header, HTTPException, status
 from app.utils.security import verify_token
+from app.utils.cache import TTLCache, MISSING, invalidate, user_tag
+from app.utils.log import get_logger
 from app.models.user import User
+from app.settings import AUTH_CACHE_TTL, AUTH_CACHE_SIZE
 from beanie import PydanticObjectId
 
 
+logger = get_logger(__name__)
+
+# Authenticated sessions keyed by (sub, iat); a hit skips the per-request User lookup
+auth_cache = TTLCache(maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL)
+
+
+async def revoke_user_sessions(user: User) -> None:
+    """
+    Reject every access token issued to the user so far (logout, password change): get_user_id
+    compares a token's iat with user.sessions_revoked_at. Tokens issued later, in the same second
+    included, stay valid. Sessions cached by other API workers may live on for up to AUTH_CACHE_TTL.
+    """
+    user.sessions_revoked_at = datetime.utcnow()
+    await user.set({"sessions_revoked_at": user.sessions_revoked_at})
+    invalidate(user_tag(str(user.id)))
+
+
+def sessions_revoked(user: User, token_data: dict) -> bool:
+    if not user.sessions_revoked_at:
+        return False
+    # iat has whole seconds; compare against the second the sessions were revoked in
+    revoked_at = int(user.sessions_revoked_at.replace(tzinfo=timezone.utc).timestamp())
+    return (token_data.get("iat") or 0) < revoked_at
+
+
 async def get_admin_id(authorization: str = Header(None)) -> str:
     return ''
 
@@ -21,7 +52,6 @@ async def get_user_id(authorization: str = Header(None)) -> str:
 
     try:
         # Extract token from "Bearer <token>"
-        print(f"Authorization header: {authorization}")
         scheme, token = authorization.split()
         if scheme.lower() != "bearer":
             raise HTTPException(
@@ -38,6 +68,11 @@ async def get_user_id(authorization: str = Header(None)) -> str:
                 detail="Invalid token payload"
             )
 
+        # Sessions already validated against the database are served from memory
+        session_key = (user_id, token_data.get("iat"))
+        if auth_cache.get(session_key) is not MISSING:
+            return user_id
+
         # Verify user exists
         user = await User.get(PydanticObjectId(user_id))
         if not user:
@@ -45,15 +80,35 @@ async def get_user_id(authorization: str = Header(None)) -> str:
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found"
             )
+        if user.locked_until and user.locked_until > datetime.utcnow():
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Account is locked"
+            )
+        if sessions_revoked(user, token_data):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Session has been revoked"
+            )
+
+        # Never cache a session beyond its token's expiry
+        ttl = AUTH_CACHE_TTL
+        if token_data.get("exp"):
+            ttl = min(ttl, token_data["exp"] - time.time())
+        if ttl > 0:
+            auth_cache.set(session_key, True, tags=[user_tag(user_id)], ttl=ttl)
 
         return user_id
 
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=str(e)
         )
-    except Exception as e:
+    except Exception:
+        logger.debug("authorization rejected", exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authorization token"
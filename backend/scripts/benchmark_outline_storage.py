@@ -0,0 +1,108 @@
+"""
+Compare read and write latency of the outline storage layouts (OUTLINE_STORAGE).
+For each layout a synthetic channel is written through the repository (one insert per document,
+as the content APIs do), its lessons are updated, the whole channel is loaded `--repeat` times
+(what every outline rebuild does) and the channel is deleted again. From the backend directory:
+
+    python -m scripts.benchmark_outline_storage --sections 4 --units 5 --activities 5 --items 8
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from typing import Dict, List
+
+from bson import ObjectId
+
+from app.database import init_db
+from app.models.channel import (
+    SectionOutline, Section, UnitOutline, Unit, ActivityOutline, Activity,
+    LessonOutline, Lesson, QuizOutline, Question
+)
+from app.api.studio.channel.cascade import delete_channel_cascade
+from app.services.outline_repository import REPOSITORIES, OutlineRepository
+
+
+class Timings:
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+
+    async def time(self, operation: str, awaitable):
+        start = time.perf_counter()
+        result = await awaitable
+        self.samples.setdefault(operation, []).append((time.perf_counter() - start) * 1000)
+        return result
+
+
+async def build_channel(repository: OutlineRepository, channel_id: str, args, timings: Timings) -> List[Lesson]:
+    lessons = []
+    for s in range(args.sections):
+        section = await timings.time("insert outline", repository.insert(SectionOutline(channel_id=channel_id, name=f"Section {s}", order=s)))
+        await timings.time("insert content", repository.insert(Section(section_outline_id=str(section.id), name=section.name, description="Section")))
+        for u in range(args.units):
+            unit = await timings.time("insert outline", repository.insert(UnitOutline(section_outline_id=str(section.id), name=f"Unit {u}", order=u)))
+            await timings.time("insert content", repository.insert(Unit(unit_outline_id=str(unit.id), name=unit.name, description="Unit", file_id="")))
+            for a in range(args.activities):
+                activity = await timings.time("insert outline", repository.insert(ActivityOutline(unit_outline_id=str(unit.id), name=f"Activity {a}", order=a)))
+                await timings.time("insert content", repository.insert(Activity(activity_outline_id=str(activity.id), description="Activity", file_id="", difficulty_level=1)))
+                lesson_outline = await timings.time("insert outline", repository.insert(LessonOutline(activity_outline_id=str(activity.id), name="Lesson", order=0)))
+                quiz_outline = await timings.time("insert outline", repository.insert(QuizOutline(activity_outline_id=str(activity.id), name="Quiz", order=1, quiz_count=args.items)))
+                for i in range(args.items):
+                    lessons.append(await timings.time("insert item", repository.insert(
+                        Lesson(lesson_outline_id=str(lesson_outline.id), lesson_type="text", text="Lorem ipsum " * 20, order=i)
+                    )))
+                    await timings.time("insert item", repository.insert(
+                        Question(quiz_outline_id=str(quiz_outline.id), template={"type": "multiple_choice"}, points=1, order=i)
+                    ))
+    return lessons
+
+
+async def benchmark(layout: str, args) -> Timings:
+    repository = REPOSITORIES[layout]()
+    channel_id = str(ObjectId())
+    timings = Timings()
+    try:
+        lessons = await build_channel(repository, channel_id, args, timings)
+        for lesson in lessons[:args.repeat]:
+            lesson.text = "Updated " + lesson.text
+            await timings.time("update item", repository.save(lesson))
+        for _ in range(args.repeat):
+            tree = await timings.time("load channel", repository.load_tree(channel_id))
+        print(f"{layout}: {tree.count()} documents")
+    finally:
+        await delete_channel_cascade(channel_id)
+    return timings
+
+
+def report(results: Dict[str, Timings]) -> None:
+    print(f"\n{'operation':<16}{'layout':<13}{'n':>6}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    operations = list(next(iter(results.values())).samples)
+    for operation in operations:
+        for layout, timings in results.items():
+            samples = sorted(timings.samples.get(operation, []))
+            if not samples:
+                continue
+            p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+            print(f"{operation:<16}{layout:<13}{len(samples):>6}{statistics.mean(samples):>10.2f}{statistics.median(samples):>10.2f}{p95:>10.2f}")
+
+
+async def main(args):
+    await init_db()
+    results = {layout: await benchmark(layout, args) for layout in args.layouts}
+    report(results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sections", type=int, default=3)
+    parser.add_argument("--units", type=int, default=4)
+    parser.add_argument("--activities", type=int, default=4)
+    parser.add_argument("--items", type=int, default=6, help="lessons and questions per activity")
+    parser.add_argument("--repeat", type=int, default=30, help="channel loads and lesson updates timed")
+    parser.add_argument("--layouts", nargs="+", default=list(REPOSITORIES), choices=list(REPOSITORIES))
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except Exception as e:
+        print(f"Error while benchmarking: {str(e)}")
+        sys.exit(1)
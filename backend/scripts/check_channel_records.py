@@ -0,0 +1,38 @@
+"""
+Compare the fields every Channel copies from its ChannelInfo and PublishChannel (name, languages,
+file ids, published, channel_link...) with their sources. The settings APIs write them through on
+every change; this finds channels that drifted before that, or through writes made outside the API.
+Run it from the backend directory with:
+
+    python -m scripts.check_channel_records          # report only
+    python -m scripts.check_channel_records --fix    # rewrite drifted channels
+"""
+import asyncio
+import sys
+
+from app.database import init_db
+from app.services.channel_repository import check_channel_records
+
+
+async def check(fix: bool) -> int:
+    await init_db()
+    counts = await check_channel_records(fix=fix)
+    print(f"✓ checked {counts['checked']} channel(s)")
+    if counts["missing_info"]:
+        print(f"! {counts['missing_info']} channel(s) without ChannelInfo (run scripts.sweep_orphans)")
+    if not counts["mismatched"]:
+        print("No drift found.")
+        return 0
+    if fix:
+        print(f"✓ fixed {counts['fixed']} drifted channel(s)")
+        return 0
+    print(f"✗ {counts['mismatched']} drifted channel(s); run again with --fix")
+    return 1
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(asyncio.run(check("--fix" in sys.argv[1:])))
+    except Exception as e:
+        print(f"Error while checking channel records: {str(e)}")
+        sys.exit(1)
@@ -21,6 +21,7 @@ COLLECTIONS = [
     "lessons",                 # Lessons
     "quiz_outlines",           # Quiz outlines
     "questions",               # Questions
+    "outline_nodes",           # Outline nodes with their content (OUTLINE_STORAGE=nodes)
     "channel_settings",        # Channel settings
     "user_progress",           # User progress tracking
     "file_items",              # File items
@@ -0,0 +1,32 @@
+"""
+Add '---' placeholders to app/translations/{lang}.yaml for every message/error code that
+has no translation yet. The API never writes these files itself; run this after adding
+messages, from the backend directory:
+
+    python -m scripts.flush_translations
+"""
+import sys
+
+from app.translations import load_translations, flush_missing_translations, missing_codes
+from app.messages import inject_messages
+
+
+def flush():
+    load_translations()
+    # Translating every known message/error code records the ones that are missing
+    inject_messages()
+    if not missing_codes:
+        print("All codes are translated.")
+        return
+
+    print(f"Missing codes: {', '.join(sorted(missing_codes))}")
+    for lang, count in flush_missing_translations().items():
+        print(f"✓ {lang}.yaml: added {count} placeholder(s)")
+
+
+if __name__ == "__main__":
+    try:
+        flush()
+    except Exception as e:
+        print(f"Error while flushing translations: {str(e)}")
+        sys.exit(1)
@@ -0,0 +1,42 @@
+"""
+Hash the refresh tokens still stored in plain text by sessions issued before tokens were stored as
+HMAC hashes. The refresh endpoint only looks tokens up by their hash, so until this runs those
+sessions have to sign in again. Safe to run more than once; from the backend directory:
+
+    python -m scripts.hash_refresh_tokens
+"""
+import asyncio
+import sys
+
+from pymongo import UpdateOne
+
+from app.database import init_db
+from app.models.user import User
+from app.settings import BULK_WRITE_BATCH_SIZE
+from app.utils.security import hash_token
+
+
+async def hash_tokens() -> int:
+    await init_db()
+    collection = User.get_motor_collection()
+    updates, hashed = [], 0
+    # A JWT has dots; the hex HMAC of an already hashed token does not
+    async for doc in collection.find({"refresh_token": {"$regex": r"\."}}, {"refresh_token": 1}):
+        updates.append(UpdateOne(
+            {"_id": doc["_id"], "refresh_token": doc["refresh_token"]},
+            {"$set": {"refresh_token": hash_token(doc["refresh_token"])}}
+        ))
+        if len(updates) >= BULK_WRITE_BATCH_SIZE:
+            hashed += (await collection.bulk_write(updates, ordered=False)).modified_count
+            updates = []
+    if updates:
+        hashed += (await collection.bulk_write(updates, ordered=False)).modified_count
+    return hashed
+
+
+if __name__ == "__main__":
+    try:
+        print(f"✓ hashed {asyncio.run(hash_tokens())} refresh token(s)")
+    except Exception as e:
+        print(f"Error while hashing refresh tokens: {str(e)}")
+        sys.exit(1)
@@ -0,0 +1,76 @@
+"""
+Write the outline_nodes of every channel (OUTLINE_STORAGE=nodes) from the per-model outline and
+content collections, which stay the source of truth. Channels are migrated lazily on their first
+outline rebuild anyway; run this before switching to do it up front. From the backend directory:
+
+    python -m scripts.migrate_outline_nodes                 # every channel
+    python -m scripts.migrate_outline_nodes <channel_id>    # one channel
+    python -m scripts.migrate_outline_nodes --verify        # compare nodes with the collections
+    python -m scripts.migrate_outline_nodes --drop          # remove all nodes (back to "collections")
+"""
+import asyncio
+import sys
+
+from app.database import init_db
+from app.models.channel import ChannelInfo, OutlineNode
+from app.services.outline_repository import (
+    ChannelTree, NodeOutlineRepository, OutlineRepository, raw_document
+)
+
+
+def tree_documents(tree: ChannelTree) -> dict:
+    return {
+        (model.__name__, str(document.id)): raw_document(document)
+        for model, documents in tree.documents.items()
+        for document in documents
+    }
+
+
+async def verify_channel(channel_id: str) -> bool:
+    expected = tree_documents(await OutlineRepository().load_tree(channel_id))
+    if not await OutlineNode.get_motor_collection().find_one({"channel_id": channel_id}, {"_id": 1}):
+        # NodeOutlineRepository.load_tree would migrate it; --verify only reads
+        if expected:
+            print(f"✗ {channel_id}: not migrated")
+        return not expected
+    found = tree_documents(await NodeOutlineRepository().load_tree(channel_id))
+    missing = expected.keys() - found.keys()
+    extra = found.keys() - expected.keys()
+    changed = [key for key in expected.keys() & found.keys() if expected[key] != found[key]]
+    if missing or extra or changed:
+        print(f"✗ {channel_id}: {len(missing)} missing, {len(extra)} extra, {len(changed)} different")
+        return False
+    return True
+
+
+async def migrate(args):
+    await init_db()
+    if "--drop" in args:
+        result = await OutlineNode.get_motor_collection().delete_many({})
+        print(f"✓ Deleted {result.deleted_count} outline node(s)")
+        return
+
+    channel_ids = [arg for arg in args if not arg.startswith("--")]
+    if not channel_ids:
+        channel_ids = [str(_id) for _id in await ChannelInfo.get_motor_collection().distinct("_id")]
+
+    repository = NodeOutlineRepository()
+    failed = 0
+    for channel_id in channel_ids:
+        if "--verify" in args:
+            failed += not await verify_channel(channel_id)
+        else:
+            nodes = await repository.sync_channel(channel_id)
+            print(f"✓ {channel_id}: {nodes} node(s)")
+    if "--verify" in args:
+        print(f"{len(channel_ids) - failed}/{len(channel_ids)} channel(s) consistent")
+        if failed:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(migrate(sys.argv[1:]))
+    except Exception as e:
+        print(f"Error while migrating outline nodes: {str(e)}")
+        sys.exit(1)
@@ -0,0 +1,30 @@
+"""
+Delete channel content whose parent no longer exists (sections of deleted channels, questions of
+deleted quizzes, tiers of deleted channels...) across the whole database. The API only sweeps the
+tree of each channel it deletes; run this by hand from the backend directory with:
+
+    python -m scripts.sweep_orphans
+"""
+import asyncio
+import sys
+
+from app.database import init_db
+from app.api.studio.channel.cascade import sweep_orphans
+
+
+async def sweep():
+    await init_db()
+    counts = await sweep_orphans()
+    for collection, deleted in counts.items():
+        if deleted:
+            print(f"✓ {collection}: deleted {deleted} orphan(s)")
+    if not any(counts.values()):
+        print("No orphans found.")
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(sweep())
+    except Exception as e:
+        print(f"Error while sweeping orphans: {str(e)}")
+        sys.exit(1)
@@ -0,0 +1,58 @@
+import os
+
+# prompt_preparation refuses to import without a key; no test talks to OpenAI
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+import asyncio
+
+import httpx
+import pytest_asyncio
+from beanie import init_beanie
+from fastapi import FastAPI
+from mongomock_motor import AsyncMongoMockClient
+
+from app.database import MODELS
+from app.models.channel import Lesson, Question
+from app.api.studio.channel import middlewares
+from app.api.studio.channel.content import api as content_router
+from app.utils.user import get_user_id
+from tests.factories import OWNER
+
+
+@pytest_asyncio.fixture
+async def db():
+    """A fresh in-memory database with every model initialised."""
+    database = AsyncMongoMockClient()["test"]
+    await init_beanie(database=database, document_models=MODELS)
+    # mongomock ignores partialFilterExpression, so these unique indexes would also reject
+    # several documents without an import_key
+    for model in (Lesson, Question):
+        for name in await model.get_motor_collection().index_information():
+            if name.endswith("import_key_1"):
+                await model.get_motor_collection().drop_index(name)
+    yield database
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def outline_rebuilds():
+    """Rebuild state is per process; keep it from leaking between tests."""
+    yield
+    tasks = list(middlewares._rebuilds.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    middlewares._rebuilds.clear()
+    middlewares._dirty.clear()
+    middlewares._failed.clear()
+
+
+@pytest_asyncio.fixture
+async def client(db):
+    """The content API, called as OWNER; set client.user["id"] to call as someone else."""
+    app = FastAPI()
+    app.include_router(content_router, prefix="/content")
+    user = {"id": OWNER}
+    app.dependency_overrides[get_user_id] = lambda: user["id"]
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        client.user = user
+        yield client
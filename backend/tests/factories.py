@@ -0,0 +1,32 @@
+"""Channels and outlines for the API tests, created the way the studio creates them."""
+from beanie import PydanticObjectId
+
+from app.models.channel import Channel, ChannelInfo
+
+
+OWNER = str(PydanticObjectId())
+OTHER = str(PydanticObjectId())
+
+
+async def create_channel(user_id: str) -> str:
+    info = ChannelInfo(user_id=user_id, name="Channel", primary_language="en")
+    await info.insert()
+    channel_id = str(info.id)
+    await Channel(user_id=PydanticObjectId(user_id), name="Channel", channel_id=channel_id, description="").insert()
+    return channel_id
+
+
+async def post(client, path, body, **kwargs):
+    response = await client.post(f"/content{path}", json=body, **kwargs)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+async def create_tree(client, channel_id):
+    """Section -> unit -> activity -> lesson outline and quiz outline, through the API."""
+    section = await post(client, f"/{channel_id}/sections/outline/1/", {"channel_id": channel_id, "name": "S", "order": 1})
+    unit = await post(client, f"/{channel_id}/units/outline/1/", {"section_outline_id": section["id"], "name": "U", "order": 1})
+    activity = await post(client, f"/{channel_id}/activities/outline/1/", {"unit_outline_id": unit["id"], "name": "A", "order": 1})
+    lesson_outline = await post(client, f"/{channel_id}/lessons/outline/1/", {"activity_outline_id": activity["id"], "name": "L", "order": 1})
+    quiz_outline = await post(client, f"/{channel_id}/quizzes/outline/2/", {"activity_outline_id": activity["id"], "name": "Q", "order": 2, "quiz_count": 0})
+    return section, unit, activity, lesson_outline, quiz_outline
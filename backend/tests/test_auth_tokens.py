@@ -0,0 +1,67 @@
+import asyncio
+import threading
+
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI, HTTPException
+
+from app.api.public.auth import api as auth_router
+from app.models.user import User
+from app.utils import security
+from app.utils.security import create_refresh_token, hash_token
+
+
+@pytest_asyncio.fixture
+async def auth_client(db):
+    app = FastAPI()
+    app.include_router(auth_router, prefix="/auth")
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+async def signed_in_user():
+    user = User(email="learner@example.com")
+    await user.insert()
+    refresh_token, expires = create_refresh_token({"sub": str(user.id)})
+    user.refresh_token = hash_token(refresh_token)
+    user.refresh_token_expires_at = expires
+    await user.save()
+    return user, refresh_token
+
+
+@pytest.mark.asyncio
+async def test_refresh_with_the_issued_token(auth_client):
+    user, refresh_token = await signed_in_user()
+    response = await auth_client.post("/auth/refresh-token/", json={"refresh_token": refresh_token})
+    assert response.status_code == 200, response.text
+    assert response.json()["data"]["token"]["access_token"]
+
+
+@pytest.mark.asyncio
+async def test_the_stored_hash_is_not_a_refresh_token(auth_client):
+    user, _ = await signed_in_user()
+    response = await auth_client.post("/auth/refresh-token/", json={"refresh_token": user.refresh_token})
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_plain_stored_tokens_are_no_longer_accepted(auth_client):
+    user, refresh_token = await signed_in_user()
+    await user.set({"refresh_token": refresh_token})
+    response = await auth_client.post("/auth/refresh-token/", json={"refresh_token": refresh_token})
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_hashing_is_refused_once_every_slot_is_taken(monkeypatch):
+    monkeypatch.setattr(security, "_hash_slots", asyncio.Semaphore(1))
+    release = threading.Event()
+    busy = asyncio.ensure_future(security._run_hashing(release.wait))
+    await asyncio.sleep(0)
+
+    with pytest.raises(HTTPException) as refused:
+        await security.get_password_hash_async("secret")
+    assert refused.value.status_code == 503
+    release.set()
+    await busy
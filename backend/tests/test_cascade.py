@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta
+
+import asyncio
+
+import pytest
+from bson import ObjectId
+
+from app.api.studio.channel import cascade
+from app.api.studio.channel.cascade import delete_channel_cascade, sweep_deleted_channel, sweep_orphans
+from app.models.channel import ChannelInfo, SectionOutline, UnitOutline, Lesson
+from app.models.job import Job, JobStatus
+from app.utils import jobs
+from tests.factories import OWNER, create_channel, create_tree
+
+
+async def count(model, **filters):
+    return await model.get_motor_collection().count_documents(filters)
+
+
+@pytest.mark.asyncio
+async def test_delete_removes_the_whole_tree(client):
+    channel_id = await create_channel(OWNER)
+    kept_id = await create_channel(OWNER)
+    await create_tree(client, channel_id)
+    await create_tree(client, kept_id)
+
+    counts = await delete_channel_cascade(channel_id)
+    assert counts["section_outlines"] == 1 and counts["quiz_outlines"] == 1
+    assert await ChannelInfo.get(channel_id) is None
+    assert await count(SectionOutline) == 1 and await count(UnitOutline) == 1
+
+
+@pytest.mark.asyncio
+async def test_sweep_removes_writes_that_raced_with_the_delete(client):
+    channel_id = await create_channel(OWNER)
+    section, *_ = await create_tree(client, channel_id)
+    await delete_channel_cascade(channel_id)
+    # Written by a request that loaded the channel before it was deleted
+    await SectionOutline(channel_id=channel_id, name="late", order=2).insert()
+    await UnitOutline(section_outline_id=section["id"], name="late", order=1).insert()
+
+    counts = await sweep_deleted_channel(channel_id)
+    assert counts["section_outlines"] == 1
+    assert await count(SectionOutline) == 0
+    # The unit's parent was already gone: only the orphan sweep reaches it
+    assert await count(UnitOutline) == 1
+
+
+@pytest.mark.asyncio
+async def test_scheduled_sweep_waits_for_late_writes(client, monkeypatch):
+    monkeypatch.setattr(cascade, "CHANNEL_SWEEP_DELAY", 0.05)
+    channel_id = await create_channel(OWNER)
+    await create_tree(client, channel_id)
+    await delete_channel_cascade(channel_id)
+    job = await cascade.schedule_channel_sweep(channel_id, OWNER)
+    assert job.not_before and jobs._queue.empty()
+
+    # Lands after the delete, before the sweep is due
+    await SectionOutline(channel_id=channel_id, name="late", order=2).insert()
+    job_id = await asyncio.wait_for(jobs._queue.get(), timeout=1)
+    await jobs.run_job(await jobs.claim_job(job_id))
+
+    job = await Job.get(job_id)
+    assert job.status == JobStatus.SUCCEEDED and job.result["section_outlines"] == 1
+    assert await count(SectionOutline) == 0
+
+
+@pytest.mark.asyncio
+async def test_sweep_leaves_a_live_channel_alone(client):
+    channel_id = await create_channel(OWNER)
+    await create_tree(client, channel_id)
+    assert await sweep_deleted_channel(channel_id) == {}
+    assert await count(SectionOutline) == 1
+
+
+@pytest.mark.asyncio
+async def test_orphan_sweep_respects_the_grace_period(db):
+    old = ObjectId.from_datetime(datetime.utcnow() - timedelta(hours=2))
+    missing_parent = str(ObjectId())
+    await UnitOutline.get_motor_collection().insert_many([
+        {"_id": old, "section_outline_id": missing_parent, "name": "old orphan", "order": 1},
+        {"_id": ObjectId(), "section_outline_id": missing_parent, "name": "new orphan", "order": 2},
+    ])
+    await Lesson.get_motor_collection().insert_one({
+        "_id": ObjectId.from_datetime(datetime.utcnow() - timedelta(hours=2)),
+        "lesson_outline_id": "not-an-id", "lesson_type": "text", "order": 1,
+    })
+
+    counts = await sweep_orphans()
+    assert counts["unit_outlines"] == 1 and counts["lessons"] == 0
+    assert [doc["name"] async for doc in UnitOutline.get_motor_collection().find()] == ["new orphan"]
@@ -0,0 +1,59 @@
+import pytest
+
+from app.api.studio.channel.setting import publish_channel, update_channel_info
+from app.models.channel import Channel, ChannelInfo, ChannelInfoRequest, PublishChannel, PublishChannelRequest
+from app.services.channel_repository import check_channel_records
+from tests.factories import OWNER, create_channel
+
+
+async def channel_of(channel_id):
+    return await Channel.find_one({"channel_id": channel_id})
+
+
+@pytest.mark.asyncio
+async def test_settings_changes_are_written_through(db):
+    channel_id = await create_channel(OWNER)
+
+    await update_channel_info(channel_id, ChannelInfoRequest(
+        name="Renamed", description=None, primary_language="fr", target_language="en", avatar_file_id="a"
+    ), OWNER)
+    channel = await channel_of(channel_id)
+    assert (channel.name, channel.description, channel.primary_language, channel.target_language) == ("Renamed", "", "fr", "en")
+    assert channel.avatar_file_id == "a" and channel.cover_image_file_id is None
+
+    await publish_channel(channel_id, PublishChannelRequest(published=True, channel_link="link"), OWNER)
+    channel = await channel_of(channel_id)
+    assert (channel.published, channel.channel_link) == (True, "link")
+
+    await publish_channel(channel_id, PublishChannelRequest(published=False), OWNER)
+    channel = await channel_of(channel_id)
+    assert (channel.published, channel.channel_link) == (False, "link")
+
+
+@pytest.mark.asyncio
+async def test_check_repairs_only_drifted_fields(db):
+    in_sync = await create_channel(OWNER)
+    drifted = await create_channel(OWNER)
+    orphaned = await create_channel(OWNER)
+    # create_channel leaves the Channel's copy of primary_language unset
+    await Channel.get_motor_collection().update_many({}, {"$set": {"primary_language": "en"}})
+    await PublishChannel(user_id=OWNER, channel_id=drifted, published=True, channel_link="link").insert()
+    await Channel.find_one({"channel_id": drifted}).update({"$set": {"name": "Stale", "enrolled_students": 7}})
+    # Left by a failed delete
+    await (await ChannelInfo.get(orphaned)).delete()
+    await Channel.find_one({"channel_id": orphaned}).update({"$set": {"name": "Left behind"}})
+
+    counts = await check_channel_records()
+    assert counts == {"checked": 3, "mismatched": 1, "fixed": 0, "missing_info": 1}
+    assert (await channel_of(drifted)).name == "Stale"
+
+    counts = await check_channel_records(fix=True, batch_size=2)
+    assert counts == {"checked": 3, "mismatched": 1, "fixed": 1, "missing_info": 1}
+    channel = await channel_of(drifted)
+    assert (channel.name, channel.published, channel.channel_link) == ("Channel", True, "link")
+    # Fields that are not copies are left alone
+    assert channel.enrolled_students == 7
+    assert (await channel_of(orphaned)).name == "Left behind"
+    assert (await channel_of(in_sync)).published is False
+
+    assert (await check_channel_records())["mismatched"] == 0
@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.api.studio.channel import clone
+from app.api.studio.channel.clone import clone_channel
+from app.models.channel import (
+    Channel, ChannelInfo, PublishChannel, FreeAccess, Tier, Coupon,
+    SectionOutline, UnitOutline, ActivityOutline, LessonOutline, QuizOutline, Lesson
+)
+from app.utils.outline import CONTENT_TREE
+from tests.factories import OWNER, create_channel, create_tree, post
+
+
+async def count(model, **filters):
+    return await model.get_motor_collection().count_documents(filters)
+
+
+async def published_channel(client):
+    """A published create_tree channel with a lesson, free access, a tier and a coupon."""
+    channel_id = await create_channel(OWNER)
+    _, _, activity, lesson_outline, _ = await create_tree(client, channel_id)
+    await post(client, f"/{channel_id}/lessons/", [
+        {"lesson_outline_id": lesson_outline["id"], "lesson_type": "text", "text": "Hello", "order": 1}
+    ])
+    await PublishChannel(user_id=OWNER, channel_id=channel_id, published=True, channel_link="link").insert()
+    await Channel.find_one({"channel_id": channel_id}).update({"$set": {"published": True, "channel_link": "link"}})
+    await FreeAccess(
+        channel_id=channel_id, percentage=50,
+        free_activities=[activity["id"], "deleted-activity"],
+        precentage_outline={activity["id"]: {"name": "A", "order": 1, "percentage": 100, "count": 2}},
+    ).insert()
+    await Tier(channel_id=channel_id, name="Premium", price=9.99, capacity=10, billing_cycle="Monthly", features=[]).insert()
+    await Coupon(
+        channel_id=channel_id, code="WELCOME", discount_type="Percentage", discount_value=10, max_uses=5,
+        expires_at=datetime.utcnow() + timedelta(days=1), is_active=True,
+    ).insert()
+    return channel_id, activity
+
+
+@pytest.mark.asyncio
+async def test_clone_copies_the_tree_and_settings(client):
+    source_id, activity = await published_channel(client)
+
+    copy_info = await clone_channel(await ChannelInfo.get(source_id), OWNER, batch_size=1)
+    copy_id = str(copy_info.id)
+    assert copy_info.name == "Copy of Channel"
+
+    # Every level is copied once and points at the copied parents
+    [section] = await SectionOutline.find({"channel_id": copy_id}).to_list()
+    [unit] = await UnitOutline.find({"section_outline_id": str(section.id)}).to_list()
+    [copied_activity] = await ActivityOutline.find({"unit_outline_id": str(unit.id)}).to_list()
+    [lesson_outline] = await LessonOutline.find({"activity_outline_id": str(copied_activity.id)}).to_list()
+    assert await count(QuizOutline, activity_outline_id=str(copied_activity.id)) == 1
+    assert [lesson.text for lesson in await Lesson.find({"lesson_outline_id": str(lesson_outline.id)}).to_list()] == ["Hello"]
+    assert str(copied_activity.id) != activity["id"]
+    for model, _, _ in CONTENT_TREE:
+        assert await count(model) in (0, 2)
+
+    # The copy starts unpublished; the source is untouched
+    channel = await Channel.find_one({"channel_id": copy_id})
+    assert (channel.published, channel.channel_link) == (False, None)
+    assert channel.outline_content["sections"][0]["id"] == str(section.id)
+    publish = await PublishChannel.find_one({"channel_id": copy_id})
+    assert (publish.published, publish.channel_link) == (False, None)
+    assert (await Channel.find_one({"channel_id": source_id})).published is True
+
+    # Settings are copied, with free-access activity ids remapped and unknown ones dropped
+    free_access = await FreeAccess.find_one({"channel_id": copy_id})
+    assert free_access.free_activities == [str(copied_activity.id)]
+    assert list(free_access.precentage_outline) == [str(copied_activity.id)]
+    assert free_access.percentage == 50
+    assert await count(Tier, channel_id=copy_id) == 1
+    assert [coupon.code for coupon in await Coupon.find({"channel_id": copy_id}).to_list()] == ["COPY_WELCOME"]
+
+
+@pytest.mark.asyncio
+async def test_failed_clone_discards_the_partial_copy(client, monkeypatch):
+    source_id, _ = await published_channel(client)
+    before = {model: await count(model) for model, _, _ in CONTENT_TREE}
+    insert_batches = clone.insert_batches
+
+    async def fail_on_coupons(model, docs, batch_size=1):
+        # The last batch insert: the whole tree, free access and tiers are copied by then
+        if model is Coupon:
+            raise RuntimeError("write failed")
+        return await insert_batches(model, docs, batch_size)
+
+    monkeypatch.setattr(clone, "insert_batches", fail_on_coupons)
+    with pytest.raises(RuntimeError):
+        await clone_channel(await ChannelInfo.get(source_id), OWNER, batch_size=1)
+
+    # Everything copied before the failure is gone again, as are the copy's own records
+    assert {model: await count(model) for model, _, _ in CONTENT_TREE} == before
+    for model in (ChannelInfo, Channel, PublishChannel, FreeAccess, Tier, Coupon):
+        assert await count(model) == 1
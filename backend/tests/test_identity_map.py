@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+from app.models.channel import Channel
+from app.services.channel_repository import load_channel
+from app.utils.identity_map import IdentityMap, identity_scope, forget
+from tests.factories import OWNER, create_channel
+
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_share_one_query(db):
+    ids = [await create_channel(OWNER) for _ in range(3)]
+    identity_map = IdentityMap()
+    channels = await asyncio.gather(*(identity_map.load(Channel, "channel_id", i) for i in ids + ids[:1]))
+    assert [channel.channel_id for channel in channels] == ids + ids[:1]
+    assert channels[0] is channels[3]
+    assert identity_map.queries == 1
+
+
+@pytest.mark.asyncio
+async def test_repeated_lookups_hit_the_map_and_misses_are_not_kept(db):
+    identity_map = IdentityMap()
+    channel_id = await create_channel(OWNER)
+    first = await identity_map.load(Channel, "channel_id", channel_id)
+    assert await identity_map.load(Channel, "channel_id", channel_id) is first
+    assert identity_map.hits == 1 and identity_map.queries == 1
+
+    assert await identity_map.load(Channel, "channel_id", "later") is None
+    await Channel(user_id=first.user_id, name="Later", channel_id="later", description="").insert()
+    assert (await identity_map.load(Channel, "channel_id", "later")).name == "Later"
+
+    identity_map.forget(Channel, "channel_id", channel_id)
+    assert await identity_map.load(Channel, "channel_id", channel_id) is not first
+
+
+@pytest.mark.asyncio
+async def test_lookups_are_cached_only_inside_a_scope(db):
+    channel_id = await create_channel(OWNER)
+    # Without a scope every lookup queries
+    assert await load_channel(channel_id) is not await load_channel(channel_id)
+
+    async with identity_scope() as identity_map:
+        channel = await load_channel(channel_id)
+        assert await load_channel(channel_id) is channel
+        await Channel.find_one({"channel_id": channel_id}).update({"$set": {"name": "Renamed"}})
+        forget(Channel)
+        assert (await load_channel(channel_id)).name == "Renamed"
+    assert identity_map.queries == 2
+
+
+class FailingModel:
+    @staticmethod
+    def find(query):
+        raise RuntimeError("database down")
+
+
+@pytest.mark.asyncio
+async def test_query_errors_reach_every_lookup_of_the_batch():
+    identity_map = IdentityMap()
+    results = await asyncio.gather(
+        identity_map.load(FailingModel, "_id", 1), identity_map.load(FailingModel, "_id", 2),
+        return_exceptions=True
+    )
+    assert [type(result) for result in results] == [RuntimeError, RuntimeError]
+    assert not identity_map.pending
+
+
+@pytest.mark.asyncio
+async def test_cancelled_lookup_does_not_strand_the_batch():
+    identity_map = IdentityMap()
+    dispatching = asyncio.create_task(identity_map.load(FailingModel, "_id", 1))
+    waiting = asyncio.create_task(identity_map.load(FailingModel, "_id", 2))
+    # Both joined the batch; the first one is about to query for the two of them
+    await asyncio.sleep(0)
+    assert len(identity_map.pending[(FailingModel, "_id")]) == 2
+    dispatching.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await asyncio.wait_for(waiting, timeout=1)
+    assert not identity_map.pending
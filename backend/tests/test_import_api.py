@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+from app.models.channel import Lesson
+from tests.factories import OWNER, create_channel, create_tree, post
+
+
+def lesson(lesson_outline_id, order, **fields):
+    return {"lesson_outline_id": lesson_outline_id, "lesson_type": "text", "text": f"lesson {order}", "order": order, **fields}
+
+
+@pytest.mark.asyncio
+async def test_import_is_idempotent_across_reordered_retries(client):
+    channel_id = await create_channel(OWNER)
+    _, _, _, lesson_outline, _ = await create_tree(client, channel_id)
+    records = [lesson(lesson_outline["id"], order) for order in (1, 2, 3)]
+
+    headers = {"Idempotency-Key": "import-1"}
+    first = await post(client, f"/{channel_id}/lessons/import/", records, headers=headers)
+    assert first["inserted"] == 3 and first["skipped"] == 0
+
+    # A retry with the records in another order, one of them new
+    retry = [records[2], records[0], lesson(lesson_outline["id"], 4), records[1]]
+    second = await post(client, f"/{channel_id}/lessons/import/", retry, headers=headers)
+    assert second["inserted"] == 1 and second["skipped"] == 3
+    assert [i is not None for i in second["ids"]] == [False, False, True, False]
+
+    assert await Lesson.find({"lesson_outline_id": lesson_outline["id"]}).count() == 4
+
+
+@pytest.mark.asyncio
+async def test_import_ndjson_and_record_keys(client):
+    channel_id = await create_channel(OWNER)
+    _, _, _, lesson_outline, _ = await create_tree(client, channel_id)
+    body = "\n".join(json.dumps(lesson(lesson_outline["id"], order, idempotency_key=f"k{order}")) for order in (1, 2)) + "\n"
+    headers = {"Content-Type": "application/x-ndjson"}
+
+    response = await client.post(f"/content/{channel_id}/lessons/import/", content=body, headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["inserted"] == 2
+    response = await client.post(f"/content/{channel_id}/lessons/import/", content=body, headers=headers)
+    assert response.json()["inserted"] == 0
+
+
+@pytest.mark.asyncio
+async def test_import_validates_before_writing_and_checks_the_channel(client):
+    channel_id = await create_channel(OWNER)
+    other_id = await create_channel(OWNER)
+    _, _, _, lesson_outline, _ = await create_tree(client, channel_id)
+    _, _, _, foreign_outline, _ = await create_tree(client, other_id)
+
+    response = await client.post(f"/content/{channel_id}/lessons/import/", json=[
+        lesson(lesson_outline["id"], 1), {"lesson_outline_id": lesson_outline["id"]}
+    ])
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["index"] == 1
+
+    response = await client.post(f"/content/{channel_id}/lessons/import/", json=[
+        lesson(lesson_outline["id"], 1), lesson(foreign_outline["id"], 1)
+    ])
+    assert response.status_code == 404
+    assert await Lesson.find_all().count() == 0
@@ -0,0 +1,113 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+
+from app.api.studio.channel.templates import template_registry
+from app.models.job import Job, JobStatus
+from app.utils import jobs
+from tests.factories import OWNER, OTHER, create_channel, create_tree
+
+
+@pytest_asyncio.fixture
+async def queue(db):
+    """The in-process job queue, emptied around the test."""
+    while not jobs._queue.empty():
+        jobs._queue.get_nowait()
+    yield jobs._queue
+    while not jobs._queue.empty():
+        jobs._queue.get_nowait()
+
+
+@pytest.fixture
+def handlers(monkeypatch):
+    registered = {}
+    monkeypatch.setattr(jobs, "_handlers", registered)
+    return registered
+
+
+@pytest.mark.asyncio
+async def test_a_job_is_claimed_once(queue):
+    job = Job(kind="test", user_id=OWNER)
+    await job.insert()
+    claims = await asyncio.gather(*(jobs.claim_job(job.id) for _ in range(3)))
+    claimed = [claim for claim in claims if claim is not None]
+    assert len(claimed) == 1
+    assert claimed[0].status == JobStatus.RUNNING and claimed[0].lease_until > datetime.utcnow()
+
+
+@pytest.mark.asyncio
+async def test_run_job_stores_the_outcome(queue, handlers):
+    @jobs.job_handler("double")
+    async def double(context):
+        await context.emit(context.params["n"])
+        if context.params["n"] < 0:
+            raise ValueError("negative")
+        return context.params["n"] * 2
+
+    submitted = [await jobs.submit_job("double", OWNER, {"n": n}) for n in (2, -1)]
+    for job in submitted:
+        await jobs.run_job(await jobs.claim_job(await queue.get()))
+
+    done, failed = [await Job.get(job.id) for job in submitted]
+    assert (done.status, done.result, done.items, done.lease_until) == (JobStatus.SUCCEEDED, 4, [2], None)
+    assert (failed.status, failed.error) == (JobStatus.FAILED, "negative")
+
+
+@pytest.mark.asyncio
+async def test_resume_after_a_restart(queue):
+    now = datetime.utcnow()
+    interrupted = Job(kind="test", user_id=OWNER, status=JobStatus.RUNNING, lease_until=now - timedelta(seconds=1))
+    running_elsewhere = Job(kind="test", user_id=OWNER, status=JobStatus.RUNNING, lease_until=now + timedelta(minutes=1))
+    waiting = [Job(kind="test", user_id=OWNER, created_at=now - timedelta(seconds=s)) for s in (1, 2)]
+    for job in [interrupted, running_elsewhere, *waiting]:
+        await job.insert()
+
+    assert await jobs.resume_jobs() == {"failed": 1, "queued": 2}
+    assert (await Job.get(interrupted.id)).status == JobStatus.FAILED
+    assert (await Job.get(running_elsewhere.id)).status == JobStatus.RUNNING
+    # Oldest first
+    assert [queue.get_nowait(), queue.get_nowait()] == [waiting[1].id, waiting[0].id]
+
+
+@pytest.mark.asyncio
+async def test_watching_jobs_of_other_processes_leaves_no_events(queue):
+    finished = Job(kind="test", user_id=OWNER, status=JobStatus.SUCCEEDED, items=[1])
+    elsewhere = Job(kind="test", user_id=OWNER, status=JobStatus.RUNNING, items=[2],
+                    lease_until=datetime.utcnow() + timedelta(minutes=1))
+    for job in (finished, elsewhere):
+        await job.insert()
+
+    assert [event async for event, _ in jobs.watch_job(finished)] == ["item", "done"]
+    stream = jobs.watch_job(elsewhere, poll_seconds=0.01)
+    assert await stream.__anext__() == ("item", 2)
+    await stream.aclose()
+    assert str(finished.id) not in jobs._changed and str(elsewhere.id) not in jobs._changed
+
+
+@pytest.mark.asyncio
+async def test_questions_from_job_only_go_into_the_callers_quiz(client):
+    channel_id = await create_channel(OWNER)
+    foreign_id = await create_channel(OTHER)
+    _, _, _, _, quiz_outline = await create_tree(client, channel_id)
+    client.user["id"] = OTHER
+    _, _, _, _, foreign_quiz = await create_tree(client, foreign_id)
+    client.user["id"] = OWNER
+
+    template_id = template_registry.all()[0].id
+    job = Job(
+        kind="generate_questions", user_id=OWNER, status=JobStatus.SUCCEEDED,
+        params={"template_id": template_id}, items=[{"question": "1 + 1?"}, {"question": "2 + 2?"}]
+    )
+    await job.insert()
+
+    # Someone else's channel, or a quiz of another channel passed with the caller's channel
+    response = await client.post(f"/content/{foreign_id}/questions/from-job/{job.id}/", params={"quiz_outline_id": foreign_quiz["id"]})
+    assert response.status_code == 404
+    response = await client.post(f"/content/{channel_id}/questions/from-job/{job.id}/", params={"quiz_outline_id": foreign_quiz["id"]})
+    assert response.status_code == 404
+
+    response = await client.post(f"/content/{channel_id}/questions/from-job/{job.id}/", params={"quiz_outline_id": quiz_outline["id"]})
+    assert response.status_code == 200, response.text
+    assert [q["order"] for q in response.json()] == [1, 2]
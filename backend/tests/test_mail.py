@@ -0,0 +1,96 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.mail import OutboundEmail, OutboundEmailStatus
+from app.utils import email as mail
+from app.utils.email import MAIL_MAX_ATTEMPTS, claim_next_email, process_email, send_email
+
+
+@pytest.fixture
+def smtp(monkeypatch):
+    """Deliveries recorded instead of sent; set smtp.error to make them fail."""
+    class Smtp:
+        sent = []
+        error = None
+
+    async def deliver_email(to_email, subject, text_content=None):
+        if Smtp.error:
+            raise Smtp.error
+        Smtp.sent.append(text_content)
+
+    monkeypatch.setattr(mail, "deliver_email", deliver_email)
+    return Smtp
+
+
+@pytest.mark.asyncio
+async def test_sent_message_drops_its_body(db, smtp):
+    queued = await send_email("learner@example.com", "Verify", "Your code is: 123456")
+    await process_email(queued)
+    email = await OutboundEmail.get(queued.id)
+    assert smtp.sent == ["Your code is: 123456"]
+    assert email.status == OutboundEmailStatus.SENT
+    assert email.text_content is None and email.expires_at > email.sent_at
+
+
+@pytest.mark.asyncio
+async def test_body_is_kept_for_retries_and_dropped_on_giving_up(db, smtp):
+    smtp.error = RuntimeError("connection refused")
+    queued = await send_email("learner@example.com", "Verify", "Your code is: 123456")
+    queued.attempts = 1
+    await process_email(queued)
+    email = await OutboundEmail.get(queued.id)
+    assert email.status == OutboundEmailStatus.PENDING
+    assert email.text_content and email.expires_at is None
+
+    email.attempts = MAIL_MAX_ATTEMPTS
+    await process_email(email)
+    email = await OutboundEmail.get(queued.id)
+    assert email.status == OutboundEmailStatus.FAILED
+    assert email.text_content is None and email.expires_at is not None
+
+
+@pytest.mark.asyncio
+async def test_expired_lease_on_the_last_attempt_is_given_up(db):
+    expired = datetime.utcnow() - timedelta(seconds=1)
+    hung = OutboundEmail(to_email="a@example.com", subject="Verify", text_content="code",
+                         status=OutboundEmailStatus.SENDING, attempts=MAIL_MAX_ATTEMPTS, next_attempt_at=expired)
+    retried = OutboundEmail(to_email="b@example.com", subject="Verify", text_content="code",
+                            status=OutboundEmailStatus.SENDING, attempts=1, next_attempt_at=expired)
+    await hung.insert()
+    await retried.insert()
+
+    claimed = await claim_next_email()
+    assert claimed.id == retried.id and claimed.attempts == 2
+    assert await claim_next_email() is None
+    hung = await OutboundEmail.get(hung.id)
+    assert hung.status == OutboundEmailStatus.FAILED
+    assert hung.text_content is None and hung.expires_at is not None
+
+
+@pytest.mark.asyncio
+async def test_worker_survives_a_failing_message(db, monkeypatch):
+    processed = asyncio.Event()
+    calls = []
+
+    async def claim_next_email():
+        await asyncio.sleep(0)
+        return OutboundEmail(to_email="learner@example.com", subject="Verify")
+
+    async def process_email(email):
+        await asyncio.sleep(0)
+        calls.append(email)
+        if len(calls) == 1:
+            raise RuntimeError("database down")
+        processed.set()
+
+    monkeypatch.setattr(mail, "claim_next_email", claim_next_email)
+    monkeypatch.setattr(mail, "process_email", process_email)
+    monkeypatch.setattr(mail, "MAIL_ERROR_BACKOFF_SECONDS", 0.01)
+    worker = asyncio.create_task(mail.mail_worker())
+    await asyncio.wait_for(processed.wait(), timeout=1)
+    worker.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await worker
+    assert len(calls) >= 2
@@ -0,0 +1,58 @@
+from app.utils.outline import longest_increasing_run, plan_reorder, activity_percentages
+
+
+def apply(current, changes):
+    orders = dict(current)
+    orders.update(changes)
+    return orders
+
+
+def test_longest_increasing_run():
+    assert longest_increasing_run([]) == set()
+    assert longest_increasing_run([1, 2, 3]) == {0, 1, 2}
+    kept = longest_increasing_run([5, 1, 2, 3, 0])
+    assert kept == {1, 2, 3}
+
+
+def test_plan_reorder_moves_only_the_moved_sibling():
+    current = {"a": 1024, "b": 2048, "c": 3072, "d": 4096}
+    ids = ["a", "d", "b", "c"]
+    changes = plan_reorder(current, ids)
+    assert list(changes) == ["d"]
+    orders = apply(current, changes)
+    assert sorted(ids, key=orders.get) == ids
+
+
+def test_plan_reorder_to_the_end_and_unchanged():
+    current = {"a": 1, "b": 2, "c": 3}
+    assert plan_reorder(current, ["a", "b", "c"]) == {}
+    changes = plan_reorder(current, ["b", "c", "a"], gap=10)
+    assert changes == {"a": 13}
+
+
+def test_plan_reorder_renumbers_when_there_is_no_room():
+    current = {"a": 1, "b": 2, "c": 3}
+    ids = ["a", "c", "b"]
+    changes = plan_reorder(current, ids, gap=10)
+    orders = apply(current, changes)
+    assert [orders[i] for i in ids] == [10, 20, 30]
+
+
+def test_plan_reorder_handles_duplicate_orders():
+    # Legacy siblings often share order values
+    current = {"a": 1, "b": 1, "c": 1}
+    ids = ["c", "a", "b"]
+    orders = apply(current, plan_reorder(current, ids))
+    assert sorted(ids, key=orders.get) == ids
+    assert len(set(orders.values())) == 3
+
+
+def test_activity_percentages():
+    outline = {"sections": [{"units": [{"activities": [
+        {"id": "x", "name": "X", "order": 1, "content": [{"count": 2}, {"count": 1}]},
+        {"id": "y", "name": "Y", "order": 2, "content": [{}]},
+    ]}]}]}
+    percentages = activity_percentages(outline, 4)
+    assert percentages["x"] == {"name": "X", "order": 1, "percentage": 75, "count": 3}
+    assert percentages["y"]["percentage"] == 100
+    assert activity_percentages(outline, 0)["y"]["percentage"] == 0
@@ -0,0 +1,132 @@
+import pytest
+from bson import ObjectId
+
+from app.api.studio.channel import middlewares
+from app.models.channel import OutlineNode, Section
+from app.services import dependencies
+from app.services.outline_repository import NodeOutlineRepository, OutlineRepository
+from scripts import migrate_outline_nodes
+from scripts.migrate_outline_nodes import tree_documents, verify_channel
+from tests.factories import OWNER, create_channel, create_tree, post
+
+
+@pytest.fixture
+def nodes(monkeypatch):
+    """The content API and the outline rebuild on OUTLINE_STORAGE=nodes."""
+    monkeypatch.setattr(dependencies, "outline_repository", NodeOutlineRepository)
+    monkeypatch.setattr(middlewares, "outline_repository", NodeOutlineRepository)
+
+
+async def assert_nodes_match(channel_id):
+    # Checked before load_tree, which would sync a channel without nodes and hide the difference
+    assert await OutlineNode.get_motor_collection().count_documents({"channel_id": channel_id})
+    expected = tree_documents(await OutlineRepository().load_tree(channel_id))
+    assert tree_documents(await NodeOutlineRepository().load_tree(channel_id)) == expected
+    return expected
+
+
+def lesson(lesson_outline_id, order, text="lesson"):
+    return {"lesson_outline_id": lesson_outline_id, "lesson_type": "text", "text": f"{text} {order}", "order": order}
+
+
+def question(quiz_outline_id, order):
+    return {"quiz_outline_id": quiz_outline_id, "template": {"type": "multiple_choice", "question": f"Q{order}"}, "order": order}
+
+
+@pytest.mark.asyncio
+async def test_content_api_writes_are_mirrored_into_nodes(client, nodes):
+    channel_id = await create_channel(OWNER)
+    section, unit, activity, lesson_outline, quiz_outline = await create_tree(client, channel_id)
+    await assert_nodes_match(channel_id)
+
+    # Content documents, items and updates
+    section_content = await post(client, f"/{channel_id}/sections/", {"section_outline_id": section["id"], "name": "S", "description": "first"})
+    await post(client, f"/{channel_id}/sections/?section_id={section_content['id']}", {"section_outline_id": section["id"], "name": "S", "description": "edited"})
+    lessons = await post(client, f"/{channel_id}/lessons/", [lesson(lesson_outline["id"], order) for order in (1, 2, 3)])
+    await post(client, f"/{channel_id}/lessons/?lesson_id={lessons[1]['id']}", [lesson(lesson_outline["id"], 2, "edited")])
+    questions = await post(client, f"/{channel_id}/questions/", [question(quiz_outline["id"], order) for order in (1, 2)])
+    await client.put(f"/content/{channel_id}/sections/outline/{section['id']}/", json={"channel_id": channel_id, "name": "Renamed", "order": 1})
+    documents = await assert_nodes_match(channel_id)
+    assert documents[("Lesson", lessons[1]["id"])]["text"] == "edited 2"
+    assert documents[("Section", section_content["id"])]["description"] == "edited"
+
+    # Deletes of items, content owners and outline nodes
+    assert (await client.delete(f"/content/{channel_id}/lessons/{lessons[0]['id']}/")).status_code == 200
+    assert (await client.delete(f"/content/{channel_id}/questions/{questions[0]['id']}/")).status_code == 200
+    assert (await client.delete(f"/content/{channel_id}/quizzes/outline/{quiz_outline['id']}/")).status_code == 200
+    documents = await assert_nodes_match(channel_id)
+    assert ("Lesson", lessons[0]["id"]) not in documents and ("QuizOutline", quiz_outline["id"]) not in documents
+
+    # Reorder (set_fields) and bulk import (insert_many)
+    units = [unit] + [
+        await post(client, f"/{channel_id}/units/outline/{order}/", {"section_outline_id": section["id"], "name": f"U{order}", "order": order})
+        for order in (2, 3)
+    ]
+    ids = [units[2]["id"], units[0]["id"], units[1]["id"]]
+    await post(client, f"/{channel_id}/outline/reorder/", {"level": "units", "parent_id": section["id"], "ids": ids})
+    await post(client, f"/{channel_id}/lessons/import/", [lesson(lesson_outline["id"], order, "imported") for order in (4, 5)])
+    documents = await assert_nodes_match(channel_id)
+    assert sorted(ids, key=lambda i: documents[("UnitOutline", i)]["order"]) == ids
+
+    # The rebuild reads the nodes
+    channel = await middlewares.get_channel_content_outline_stats(channel_id, OWNER)
+    assert channel.lesson_count == 1 and channel.quiz_count == 0
+    assert [u["id"] for u in channel.outline_content["sections"][0]["units"]] == ids
+
+
+@pytest.mark.asyncio
+async def test_a_second_content_document_does_not_replace_the_first(client, nodes):
+    channel_id = await create_channel(OWNER)
+    section, *_ = await create_tree(client, channel_id)
+    for description in ("first", "second"):
+        await post(client, f"/{channel_id}/sections/", {"section_outline_id": section["id"], "name": "S", "description": description})
+
+    # Nodes hold one content document per outline: the same one the collections layout uses
+    collections = await OutlineRepository().load_tree(channel_id)
+    node_tree = await NodeOutlineRepository().load_tree(channel_id)
+    assert collections.content(Section, section["id"]).description == "first"
+    assert node_tree.content(Section, section["id"]).description == "first"
+
+
+@pytest.mark.asyncio
+async def test_first_section_of_a_channel_syncs_the_existing_tree(client, monkeypatch):
+    channel_id = await create_channel(OWNER)
+    # Written before the switch to nodes
+    _, _, activity, lesson_outline, _ = await create_tree(client, channel_id)
+    await post(client, f"/{channel_id}/lessons/", [lesson(lesson_outline["id"], 1)])
+    assert not await OutlineNode.get_motor_collection().count_documents({})
+
+    monkeypatch.setattr(dependencies, "outline_repository", NodeOutlineRepository)
+    await post(client, f"/{channel_id}/sections/outline/2/", {"channel_id": channel_id, "name": "S2", "order": 2})
+    documents = await assert_nodes_match(channel_id)
+    assert len([key for key in documents if key[0] == "SectionOutline"]) == 2
+
+
+@pytest.mark.asyncio
+async def test_migration_script_writes_and_repairs_nodes(client, monkeypatch):
+    async def init_db():
+        pass
+
+    monkeypatch.setattr(migrate_outline_nodes, "init_db", init_db)
+    channel_ids = [await create_channel(OWNER) for _ in range(2)]
+    for channel_id in channel_ids:
+        _, _, _, lesson_outline, quiz_outline = await create_tree(client, channel_id)
+        await post(client, f"/{channel_id}/lessons/", [lesson(lesson_outline["id"], order) for order in (1, 2)])
+        await post(client, f"/{channel_id}/questions/", [question(quiz_outline["id"], 1)])
+    assert not await verify_channel(channel_ids[0])
+
+    await migrate_outline_nodes.migrate([])
+    for channel_id in channel_ids:
+        assert await verify_channel(channel_id)
+        await assert_nodes_match(channel_id)
+
+    # A node left behind by a write that bypassed the repository is removed on the next run
+    stale_id = ObjectId()
+    stale = {"_id": stale_id, "channel_id": channel_ids[0], "kind": "section", "parent_id": None, "order": 9,
+             "outline": {"_id": stale_id, "channel_id": channel_ids[0], "name": "gone", "order": 9},
+             "content": None, "items": []}
+    await OutlineNode.get_motor_collection().insert_one(stale)
+    assert not await verify_channel(channel_ids[0])
+    await migrate_outline_nodes.migrate([channel_ids[0]])
+    assert await verify_channel(channel_ids[0])
+    assert not await OutlineNode.get_motor_collection().find_one({"_id": stale["_id"]})
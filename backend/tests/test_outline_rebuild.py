@@ -0,0 +1,134 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.api.studio.channel import middlewares
+from app.models.channel import Channel, SectionOutline
+from tests.factories import OWNER, OTHER, create_channel, create_tree, post
+
+
+@pytest.fixture
+def rebuilds(monkeypatch):
+    """Rebuilds recorded instead of run, with a short quiet period."""
+    calls = []
+
+    async def rebuild_outline(channel_id):
+        calls.append(channel_id)
+        await asyncio.sleep(0)
+
+    monkeypatch.setattr(middlewares, "OUTLINE_REBUILD_DELAY", 0.01)
+    monkeypatch.setattr(middlewares, "rebuild_outline", rebuild_outline)
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_writes_in_a_burst_share_one_rebuild(rebuilds):
+    tasks = {middlewares.request_outline_rebuild("c1") for _ in range(5)}
+    assert len(tasks) == 1
+    await tasks.pop()
+    assert rebuilds == ["c1"]
+    assert "c1" not in middlewares._rebuilds
+
+
+@pytest.mark.asyncio
+async def test_a_write_during_the_rebuild_triggers_another(monkeypatch):
+    started, release = asyncio.Event(), asyncio.Event()
+    calls = []
+
+    async def rebuild_outline(channel_id):
+        calls.append(channel_id)
+        started.set()
+        await release.wait()
+
+    monkeypatch.setattr(middlewares, "OUTLINE_REBUILD_DELAY", 0)
+    monkeypatch.setattr(middlewares, "rebuild_outline", rebuild_outline)
+    task = middlewares.request_outline_rebuild("c1")
+    await started.wait()
+    # Never two rebuilds of a channel at once: the running one picks the write up
+    assert middlewares.request_outline_rebuild("c1") is task
+    release.set()
+    await task
+    assert calls == ["c1", "c1"]
+
+
+@pytest.mark.asyncio
+async def test_channels_rebuild_independently(rebuilds):
+    await asyncio.gather(middlewares.request_outline_rebuild("c1"), middlewares.request_outline_rebuild("c2"))
+    assert sorted(rebuilds) == ["c1", "c2"]
+
+
+@pytest.fixture
+def stale_channel(monkeypatch):
+    channel = SimpleNamespace(channel_id="c1", user_id=OWNER, content_revision=3, outline_revision=2, outline_hash="h")
+
+    async def load_channel(channel_id):
+        return channel
+
+    monkeypatch.setattr(middlewares, "load_channel", load_channel)
+    return channel
+
+
+@pytest.mark.asyncio
+async def test_rebuild_runs_as_the_owner(monkeypatch, stale_channel):
+    users = []
+
+    async def stats(channel_id, uid):
+        users.append(uid)
+        return stale_channel
+
+    monkeypatch.setattr(middlewares, "get_channel_content_outline_stats", stats)
+    middlewares._failed["c1"] = 2
+    assert await middlewares.rebuild_outline("c1") is stale_channel
+    assert users == [OWNER]
+    assert "c1" not in middlewares._failed
+
+
+@pytest.mark.asyncio
+async def test_failed_rebuild_is_not_retried_by_readers(monkeypatch, stale_channel):
+    async def stats(channel_id, uid):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(middlewares, "get_channel_content_outline_stats", stats)
+    assert await middlewares.rebuild_outline("c1") is None
+    assert middlewares._failed == {"c1": 3}
+
+    # Served stale without starting a rebuild
+    assert await middlewares.wait_for_outline(stale_channel) is stale_channel
+    assert not middlewares._rebuilds
+
+    # The next write moves the revision on, so readers wait for a rebuild again
+    stale_channel.content_revision = 4
+    monkeypatch.setattr(middlewares, "OUTLINE_REBUILD_DELAY", 0)
+    assert await middlewares.wait_for_outline(stale_channel) is stale_channel
+    assert middlewares._failed == {"c1": 4}
+
+
+@pytest.mark.asyncio
+async def test_outline_catches_up_with_writes(client, monkeypatch):
+    monkeypatch.setattr(middlewares, "OUTLINE_REBUILD_DELAY", 0.01)
+    channel_id = await create_channel(OWNER)
+    await create_tree(client, channel_id)
+
+    channel = await Channel.find_one({"channel_id": channel_id})
+    assert channel.content_revision == 5 and channel.outline_revision < 5
+    channel = await middlewares.wait_for_outline(channel)
+    assert channel.outline_revision == channel.content_revision
+    [section] = channel.outline_content["sections"]
+    assert section["units"][0]["activities"][0]["name"] == "A"
+
+
+@pytest.mark.asyncio
+async def test_only_the_owner_writes_content(client):
+    channel_id = await create_channel(OWNER)
+    section = await post(client, f"/{channel_id}/sections/outline/1/", {"channel_id": channel_id, "name": "S", "order": 1})
+
+    client.user["id"] = OTHER
+    response = await client.post(f"/content/{channel_id}/sections/outline/2/", json={"channel_id": channel_id, "name": "X", "order": 2})
+    assert response.status_code == 404
+    response = await client.delete(f"/content/{channel_id}/sections/outline/{section['id']}/")
+    assert response.status_code == 404
+
+    # Neither write landed nor scheduled a rebuild
+    assert [s.name for s in await SectionOutline.find({"channel_id": channel_id}).to_list()] == ["S"]
+    assert (await Channel.find_one({"channel_id": channel_id})).content_revision == 1
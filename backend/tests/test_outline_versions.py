@@ -0,0 +1,117 @@
+import pytest
+
+from app.api.play.play import subscribe_to_channel, update_user_progress
+from app.api.studio.channel import middlewares
+from app.models.channel import Channel, OutlineVersion, SectionOutline
+from app.models.play import PlayerProgress, ProgressUpdateRequest, SubscribeChannelRequest
+from app.models.user import User
+from app.utils.outline import prune_outline_versions, publish_outline_version
+from tests.factories import OWNER, create_channel, create_tree
+
+
+async def publish(channel, name):
+    channel.outline_content = {"sections": [{"id": "s", "name": name, "order": 1, "units": []}]}
+    return await publish_outline_version(channel)
+
+
+@pytest.mark.asyncio
+async def test_unchanged_outline_is_not_published_again(db):
+    channel = await Channel.find_one({"channel_id": await create_channel(OWNER)})
+    first = await publish(channel, "A")
+    assert (await publish(channel, "A")).id == first.id
+    assert (await publish(channel, "B")).version == 2 == channel.outline_version
+
+
+@pytest.mark.asyncio
+async def test_prune_keeps_the_latest_and_referenced_versions(db):
+    channel_id = await create_channel(OWNER)
+    channel = await Channel.find_one({"channel_id": channel_id})
+    for name in "ABCD":
+        await publish(channel, name)
+    await PlayerProgress(player_id="p", channel_id=channel_id, full_access=True, outline_version=2).insert()
+
+    assert await prune_outline_versions(channel_id) == 2
+    versions = await OutlineVersion.find({"channel_id": channel_id}).to_list()
+    assert sorted(v.version for v in versions) == [2, 4]
+    assert await prune_outline_versions(channel_id) == 0
+
+
+async def behind_latest(channel_id):
+    """A published channel whose own outline_version (1) is older than its latest version (2)."""
+    channel = await Channel.find_one({"channel_id": channel_id})
+    await publish(channel, "A")
+    await Channel.find_one({"channel_id": channel_id}).update({"$set": {
+        "published": True, "outline_version": 1, "outline_content": channel.outline_content
+    }})
+    await publish(channel, "B")
+    return await Channel.find_one({"channel_id": channel_id})
+
+
+@pytest.mark.asyncio
+async def test_prune_keeps_the_channels_version(db):
+    channel_id = await create_channel(OWNER)
+    await behind_latest(channel_id)
+    assert await prune_outline_versions(channel_id) == 0
+    assert await OutlineVersion.find({"channel_id": channel_id}).count() == 2
+
+
+@pytest.mark.asyncio
+async def test_subscribers_start_on_the_channels_version(db):
+    channel_id = await create_channel(OWNER)
+    await behind_latest(channel_id)
+    user = User(email="learner@example.com")
+    await user.insert()
+
+    await subscribe_to_channel(channel_id, SubscribeChannelRequest(full_access=True), str(user.id))
+    progress = await PlayerProgress.find_one({"channel_id": channel_id})
+    assert progress.outline_version == 1
+    assert progress.progress_level["sections"][0]["name"] == "A"
+
+
+@pytest.mark.asyncio
+async def test_superseded_rebuild_withdraws_its_version(client, monkeypatch):
+    channel_id = await create_channel(OWNER)
+    await create_tree(client, channel_id)
+    await Channel.find_one({"channel_id": channel_id}).update({"$set": {"published": True}})
+    publish = middlewares.publish_outline_version
+    calls = []
+
+    async def publish_after_a_newer_rebuild(channel, revision=None):
+        calls.append(revision)
+        if len(calls) == 1:
+            # Another worker writes and rebuilds while this rebuild is still running
+            await SectionOutline(channel_id=channel_id, name="new", order=2).insert()
+            await Channel.find_one({"channel_id": channel_id}).update({"$inc": {"content_revision": 1}})
+            middlewares.forget_channel(channel_id, Channel)
+            await middlewares.get_channel_content_outline_stats(channel_id, OWNER)
+        return await publish(channel, revision)
+
+    monkeypatch.setattr(middlewares, "publish_outline_version", publish_after_a_newer_rebuild)
+    rebuilt = await middlewares.get_channel_content_outline_stats(channel_id, OWNER)
+
+    channel = await Channel.find_one({"channel_id": channel_id})
+    versions = await OutlineVersion.find({"channel_id": channel_id}).to_list()
+    assert [v.version for v in versions] == [channel.outline_version]
+    assert len(channel.outline_content["sections"]) == 2
+    assert rebuilt.outline_version == channel.outline_version
+
+
+@pytest.mark.asyncio
+async def test_progress_from_an_older_tree_is_merged_onto_the_current_version(db):
+    channel_id = await create_channel(OWNER)
+    channel = await Channel.find_one({"channel_id": channel_id})
+    await publish(channel, "A")
+    await PlayerProgress(player_id="p", channel_id=channel_id, full_access=True, outline_version=1).insert()
+    channel.outline_content = {"sections": [{"id": "t", "name": "T", "order": 1, "units": []}]}
+    await publish_outline_version(channel)
+    await channel.set({"published": True, "outline_version": 2, "outline_content": channel.outline_content})
+
+    stale = {"sections": [
+        {"id": "s", "name": "A", "completed": True, "units": []},
+        {"id": "t", "name": "T", "completed": True, "units": []},
+    ]}
+    await update_user_progress(channel_id, ProgressUpdateRequest(content_id="x", progress_level=stale), "p")
+
+    progress = await PlayerProgress.find_one({"channel_id": channel_id})
+    assert progress.outline_version == 2
+    assert progress.progress_level == {"sections": [{"id": "t", "name": "T", "completed": True, "units": []}]}
@@ -0,0 +1,10 @@
+from app.api.studio.channel import prompt_preparation
+from app.api.studio.channel.prompt_preparation import split_batches
+
+
+def test_split_batches(monkeypatch):
+    monkeypatch.setattr(prompt_preparation, "QUESTIONS_PER_REQUEST", 5)
+    assert split_batches(12) == [5, 5, 2]
+    assert split_batches(10) == [5, 5]
+    assert split_batches(3) == [3]
+    assert split_batches(0) == []
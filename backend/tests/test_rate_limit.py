@@ -0,0 +1,76 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.utils import rate_limit
+from app.utils.rate_limit import (
+    RateLimitMiddleware, RateLimitRule, TokenBucketLimiter, MongoWindowLimiter, match_rule
+)
+
+
+def test_first_matching_rule_wins():
+    assert match_rule("POST", "/public/auth/sign-in/").name == "sign_in"
+    assert match_rule("GET", "/public/auth/sign-in/").name == "default"
+    assert match_rule("POST", "/studio/space/file/abc").name == "space_upload"
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: now[0])
+    return now
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_allows_a_burst_then_refills(clock):
+    limiter = TokenBucketLimiter()
+    rule = RateLimitRule("test", per_minute=6, burst=2)
+    assert (await limiter.hit("k", rule))[:2] == (True, 1)
+    assert (await limiter.hit("k", rule))[:2] == (True, 0)
+    allowed, remaining, retry_after = await limiter.hit("k", rule)
+    assert (allowed, remaining) == (False, 0) and retry_after == pytest.approx(10)
+
+    # Other identities have their own bucket
+    assert (await limiter.hit("other", rule))[0]
+
+    clock[0] += 10
+    assert (await limiter.hit("k", rule))[0]
+    assert not (await limiter.hit("k", rule))[0]
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_evicts_the_least_recently_used(clock):
+    limiter = TokenBucketLimiter(max_keys=2)
+    rule = RateLimitRule("test", per_minute=1)
+    for key in ("a", "b", "a", "c"):
+        await limiter.hit(key, rule)
+    assert list(limiter._buckets) == ["a", "c"]
+
+
+@pytest.mark.asyncio
+async def test_mongo_windows_are_shared_between_limiters(db):
+    rule = RateLimitRule("test", per_minute=2)
+    workers = [MongoWindowLimiter(), MongoWindowLimiter()]
+    results = [await workers[i % 2].hit("k", rule) for i in range(3)]
+    assert [allowed for allowed, _, _ in results] == [True, True, False]
+    assert 0 < results[2][2] <= 60
+
+
+@pytest.mark.asyncio
+async def test_middleware_answers_429_with_retry_after(monkeypatch):
+    monkeypatch.setitem(rate_limit.FEATURES, "rate_limiting", True)
+    app = FastAPI()
+
+    @app.post("/public/auth/sign-in/")
+    async def sign_in():
+        return {"ok": True}
+
+    limited = RateLimitMiddleware(app, TokenBucketLimiter())
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=limited), base_url="http://test") as client:
+        responses = [await client.post("/public/auth/sign-in/") for _ in range(11)]
+
+    assert [r.status_code for r in responses] == [200] * 10 + [429]
+    assert responses[0].headers["x-ratelimit-limit"] == "10"
+    rejected = responses[-1]
+    assert int(rejected.headers["retry-after"]) >= 1
+    assert rejected.json()["error"] == "RATE_LIMIT_EXCEEDED"
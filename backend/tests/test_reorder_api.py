@@ -0,0 +1,43 @@
+import pytest
+
+from app.models.channel import Channel
+from tests.factories import OWNER, OTHER, create_channel, post
+
+
+@pytest.mark.asyncio
+async def test_reorder_right_after_creating_the_parent(client):
+    channel_id = await create_channel(OWNER)
+    section = await post(client, f"/{channel_id}/sections/outline/1/", {"channel_id": channel_id, "name": "S", "order": 1})
+    units = [
+        await post(client, f"/{channel_id}/units/outline/{order}/", {"section_outline_id": section["id"], "name": f"U{order}", "order": order})
+        for order in (1024, 2048, 3072)
+    ]
+    # The outline has not been rebuilt yet
+    assert not (await Channel.find_one({"channel_id": channel_id})).outline_content
+
+    ids = [units[2]["id"], units[0]["id"], units[1]["id"]]
+    result = await post(client, f"/{channel_id}/outline/reorder/", {"level": "units", "parent_id": section["id"], "ids": ids})
+    assert result["updated"] == 1
+    assert sorted(ids, key=result["orders"].get) == ids
+
+    # Same order again: nothing to write
+    again = await post(client, f"/{channel_id}/outline/reorder/", {"level": "units", "parent_id": section["id"], "ids": ids})
+    assert again["updated"] == 0
+
+
+@pytest.mark.asyncio
+async def test_reorder_rejects_foreign_parents_and_incomplete_ids(client):
+    channel_id = await create_channel(OWNER)
+    other_id = await create_channel(OWNER)
+    section = await post(client, f"/{other_id}/sections/outline/1/", {"channel_id": other_id, "name": "S", "order": 1})
+    unit = await post(client, f"/{other_id}/units/outline/1/", {"section_outline_id": section["id"], "name": "U", "order": 1})
+
+    response = await client.post(f"/content/{channel_id}/outline/reorder/", json={"level": "units", "parent_id": section["id"], "ids": [unit["id"]]})
+    assert response.status_code == 404
+
+    response = await client.post(f"/content/{other_id}/outline/reorder/", json={"level": "units", "parent_id": section["id"], "ids": []})
+    assert response.status_code == 409
+
+    client.user["id"] = OTHER
+    response = await client.post(f"/content/{other_id}/outline/reorder/", json={"level": "units", "parent_id": section["id"], "ids": [unit["id"]]})
+    assert response.status_code == 404
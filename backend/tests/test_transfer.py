@@ -0,0 +1,257 @@
+import base64
+import io
+import json
+import tarfile
+
+import pytest
+from bson import ObjectId, json_util
+from fastapi import HTTPException
+
+from app.api.studio.channel import transfer
+from app.api.studio.channel.transfer import (
+    EXPORT_FORMAT, EXPORT_VERSION, ByteStream, encode_file_record, export_ndjson, export_tar,
+    import_channel, import_tar
+)
+from app.models.channel import Channel, ChannelInfo, Lesson, LessonOutline, SectionOutline
+from app.models.gallery import File as GalleryFile
+from tests.factories import OWNER, OTHER, create_channel, create_tree, post
+
+
+async def chunked(data: bytes, size: int = 777):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+async def collect(chunks) -> bytes:
+    return b"".join([chunk async for chunk in chunks])
+
+
+class RecordingImporter:
+    def __init__(self):
+        self.header = None
+        self.records = []
+        self.files = {}
+
+    def check_header(self, header):
+        self.header = header
+
+    async def add_record(self, record):
+        self.records.append(record)
+
+    async def add_file(self, file_id, data):
+        # Like ChannelImporter: files whose record did not come first are ignored, unread
+        if file_id in self.files:
+            self.files[file_id] = b"".join([chunk async for chunk in data])
+
+
+def ndjson(*records) -> bytes:
+    return b"".join(json.dumps(record).encode() + b"\n" for record in records)
+
+
+def tar_archive(members, format=tarfile.USTAR_FORMAT) -> bytes:
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w", format=format) as tar:
+        for name, data in members:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+HEADER = {"format": EXPORT_FORMAT, "version": EXPORT_VERSION}
+
+
+@pytest.mark.asyncio
+async def test_byte_stream_reads_across_chunks():
+    stream = ByteStream(chunked(b"first line\nsecond\n" + b"x" * 100, size=3))
+    assert await stream.readline() == b"first line\n"
+    assert await stream.readline(limit=4) == b"seco"
+    assert await stream.read(3) == b"nd\n"
+    await stream.skip(90)
+    assert await stream.read(100) == b"x" * 10
+    assert await stream.read(1) == b""
+
+
+@pytest.mark.asyncio
+async def test_import_tar_drains_unknown_file_members():
+    # Looks like a tar header if it were left in the stream
+    blob = tar_archive([("records/fake.ndjson", b"{}\n")]) * 3
+    archive = tar_archive([
+        ("files/unknown", blob),
+        ("records/00001.ndjson", ndjson(HEADER, {"collection": "lessons", "doc": {"a": 1}})),
+        ("README", b"ignored"),
+    ])
+    importer = RecordingImporter()
+    await import_tar(importer, ByteStream(chunked(archive)))
+    assert importer.header == HEADER
+    assert importer.records == [{"collection": "lessons", "doc": {"a": 1}}]
+
+
+@pytest.mark.asyncio
+async def test_import_tar_reads_pax_members_and_file_contents():
+    long_name = "records/" + "n" * 120 + ".ndjson"
+    data = bytes(range(256)) * 1000
+    archive = tar_archive([
+        (long_name, ndjson(HEADER, {"collection": "lessons", "doc": {"a": 1}})),
+        ("files/f1", data),
+    ], format=tarfile.PAX_FORMAT)
+    importer = RecordingImporter()
+    importer.files["f1"] = None
+    await import_tar(importer, ByteStream(chunked(archive, size=1000)))
+    assert importer.records == [{"collection": "lessons", "doc": {"a": 1}}]
+    assert importer.files["f1"] == data
+
+
+@pytest.mark.asyncio
+async def test_import_tar_without_records_is_rejected():
+    with pytest.raises(HTTPException) as error:
+        await import_tar(RecordingImporter(), ByteStream(chunked(tar_archive([("README", b"x")]))))
+    assert error.value.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_file_record_streams_valid_base64(db):
+    data = bytes(range(256)) * 100 + b"xy"
+    doc = {"_id": ObjectId(), "name": "f"}
+    pieces = [piece async for piece in encode_file_record(doc, chunked(data, size=1000))]
+    line = b"".join(pieces)
+    assert len(pieces) > 2 and line.endswith(b"}}\n") and line.count(b"\n") == 1
+    record = json_util.loads(line)
+    assert record["collection"] == "gallery_files" and record["doc"]["name"] == "f"
+    assert base64.b64decode(record["doc"]["data"]) == data
+
+
+async def exported_channel(client):
+    channel_id = await create_channel(OWNER)
+    section, _, _, lesson_outline, _ = await create_tree(client, channel_id)
+    await post(client, f"/{channel_id}/lessons/import/", [
+        {"lesson_outline_id": lesson_outline["id"], "lesson_type": "text", "text": f"lesson {i}", "order": i}
+        for i in range(1, 4)
+    ])
+    return channel_id, section
+
+
+async def assert_imported(channel_info, source_channel_id, source_section):
+    channel_id = str(channel_info.id)
+    assert channel_id != source_channel_id and channel_info.user_id == OTHER
+    [section] = await SectionOutline.find({"channel_id": channel_id}).to_list()
+    assert section.name == source_section["name"] and str(section.id) != source_section["id"]
+    channel = await Channel.find_one({"channel_id": channel_id})
+    assert str(channel.user_id) == OTHER and not channel.published
+    [activity] = channel.outline_content["sections"][0]["units"][0]["activities"]
+    lesson_outline_id = next(item["id"] for item in activity["content"] if item["type"] == "lesson")
+    assert await LessonOutline.get(lesson_outline_id) is not None
+    assert await Lesson.find({"lesson_outline_id": lesson_outline_id}).count() == 3
+
+
+@pytest.mark.asyncio
+async def test_ndjson_export_imports_under_new_ids(client):
+    channel_id, section = await exported_channel(client)
+    export = await collect(export_ndjson(channel_id, OWNER))
+    header = json_util.loads(export.split(b"\n", 1)[0])
+    assert header["format"] == EXPORT_FORMAT and header["channel_id"] == channel_id
+
+    channel_info = await import_channel(OTHER, chunked(export))
+    await assert_imported(channel_info, channel_id, section)
+    assert await Lesson.find_all().count() == 6
+
+
+@pytest.mark.asyncio
+async def test_tar_export_imports_under_new_ids(client):
+    channel_id, section = await exported_channel(client)
+    export = await collect(export_tar(channel_id, OWNER))
+    with tarfile.open(fileobj=io.BytesIO(export)) as tar:
+        assert all(name.startswith("records/") for name in tar.getnames())
+
+    channel_info = await import_channel(OTHER, chunked(export, size=100), tar=True)
+    await assert_imported(channel_info, channel_id, section)
+
+
+@pytest.mark.asyncio
+async def test_invalid_record_aborts_the_import(client):
+    channel_id, _ = await exported_channel(client)
+    export = await collect(export_ndjson(channel_id, OWNER))
+    lines = export.splitlines(keepends=True)
+    lesson_line = next(i for i, line in enumerate(lines) if b'"collection": "lessons"' in line)
+    record = json_util.loads(lines[lesson_line])
+    record["doc"]["order"] = "first"
+    lines[lesson_line] = json_util.dumps(record).encode() + b"\n"
+
+    channels = await ChannelInfo.find_all().count()
+    with pytest.raises(HTTPException) as error:
+        await import_channel(OTHER, chunked(b"".join(lines)))
+    assert error.value.status_code == 422
+    assert await ChannelInfo.find_all().count() == channels
+    assert await Lesson.find_all().count() == 3
+
+
+class FakeGridOut:
+    def __init__(self, data):
+        self.length = len(data)
+        self._chunks = [data]
+
+    async def readchunk(self):
+        return self._chunks.pop() if self._chunks else b""
+
+
+def fake_gridfs(bucket):
+    async def get_gridfs():
+        return bucket
+    return get_gridfs
+
+
+class FakeGridIn:
+    def __init__(self, files):
+        self._id = ObjectId()
+        self._files = files
+        self._data = b""
+
+    async def write(self, data):
+        self._data += data
+
+    async def close(self):
+        self._files[self._id] = self._data
+
+
+class FakeBucket:
+    def __init__(self, files):
+        self.files = files
+
+    async def open_download_stream(self, grid_id):
+        return FakeGridOut(self.files[grid_id])
+
+    def open_upload_stream(self, filename, metadata=None):
+        return FakeGridIn(self.files)
+
+
+@pytest.mark.asyncio
+async def test_export_only_carries_the_exporting_users_files(client, monkeypatch):
+    own_grid, foreign_grid = ObjectId(), ObjectId()
+    bucket = FakeBucket({own_grid: b"mine", foreign_grid: b"secret"})
+    monkeypatch.setattr(transfer, "get_gridfs", fake_gridfs(bucket))
+    own_file, foreign_file = ObjectId(), ObjectId()
+    await GalleryFile.get_motor_collection().insert_many([
+        {"_id": own_file, "name": "mine.txt", "file_type": "text/plain", "file_format": "txt", "size": 4,
+         "owner": ObjectId(OWNER), "gridfs_file_id": own_grid},
+        {"_id": foreign_file, "name": "secret.txt", "file_type": "text/plain", "file_format": "txt", "size": 6,
+         "owner": ObjectId(OTHER), "gridfs_file_id": foreign_grid},
+    ])
+    channel_id = await create_channel(OWNER)
+    _, _, _, lesson_outline, _ = await create_tree(client, channel_id)
+    await post(client, f"/{channel_id}/lessons/import/", [{
+        "lesson_outline_id": lesson_outline["id"], "lesson_type": "file", "order": 1,
+        "file_ids": [str(own_file), str(foreign_file)]
+    }])
+
+    for export in (export_ndjson(channel_id, OWNER, include_files=True), export_tar(channel_id, OWNER, include_files=True)):
+        data = await collect(export)
+        assert b"mine.txt" in data and b"secret.txt" not in data
+
+    export = await collect(export_ndjson(channel_id, OWNER, include_files=True))
+    await import_channel(OTHER, chunked(export))
+    [imported] = await Lesson.find({"lesson_outline_id": {"$ne": lesson_outline["id"]}}).to_list()
+    # The foreign file id is dropped, not carried over into the new channel
+    [copy] = imported.file_ids
+    assert copy not in (str(own_file), str(foreign_file))
+    copied = await GalleryFile.get(copy)
+    assert copied.owner == ObjectId(OTHER) and bucket.files[copied.gridfs_file_id] == b"mine"
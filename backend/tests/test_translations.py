@@ -0,0 +1,23 @@
+from app import translations
+from app.messages import ERROR_CLASSES, MESSAGE_CLASSES, unwrap_error
+from app.translations import TRANSLATIONS_DIR, load_translations, translate
+
+
+def test_every_message_code_has_an_english_entry():
+    load_translations()
+    codes = [unwrap_error(member).code for cls in ERROR_CLASSES for member in cls.__members__.values()]
+    codes += [message.value for cls in MESSAGE_CLASSES for message in cls]
+    assert not [code for code in codes if code not in translations.translations["en"]]
+    assert translate("USER_NOT_FOUND")["en"] == "User not found"
+    # '---' placeholders fall back to the code
+    assert translate("LOGGED_IN")["en"] == "LOGGED_IN"
+
+
+def test_unknown_codes_are_recorded_without_touching_the_files():
+    load_translations()
+    path = TRANSLATIONS_DIR / "en.yaml"
+    before = path.read_bytes()
+    assert translate("NOT_A_REAL_CODE") == {"en": "NOT_A_REAL_CODE"}
+    assert "NOT_A_REAL_CODE" in translations.missing_codes
+    assert path.read_bytes() == before
+    translations.missing_codes.discard("NOT_A_REAL_CODE")